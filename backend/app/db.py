@@ -1,22 +1,142 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 import os
 
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./aic.db")
 
+# SQLITE_PROFILE=performance: WAL journal, relaxed fsync, mmap and a bigger page cache
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "default")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+
+def sqlite_pragmas(read_only: bool = False) -> list[str]:
+    if SQLITE_PROFILE != "performance":
+        return []
+    pragmas = [
+        f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+    if read_only:
+        # WAL lets these readers run alongside the writer; query_only guards against stray writes
+        return pragmas + ["PRAGMA query_only=ON"]
+    # journal_mode is stored in the file, synchronous is per connection
+    return ["PRAGMA journal_mode=WAL", "PRAGMA synchronous=NORMAL"] + pragmas
+
+
+def pool_options(url: str, prefix: str = "DB") -> dict:
+    """Connection pool sizing from <prefix>_POOL_SIZE etc.; in-memory SQLite keeps its default pool."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "pool_size": int(os.getenv(f"{prefix}_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv(f"{prefix}_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv(f"{prefix}_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv(f"{prefix}_POOL_RECYCLE", "1800")),
+    }
+
+
+def apply_sqlite_profile(target: Engine, read_only: bool = False):
+    """Run the profile's PRAGMAs on every new connection of a (sync or async) SQLite engine."""
+    pragmas = sqlite_pragmas(read_only)
+    if target.dialect.name != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(target, "connect")
+    def _on_connect(dbapi_connection, _record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
 engine = create_engine(
     DATABASE_URL,
     pool_pre_ping=True,
     connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {},
+    **pool_options(DATABASE_URL),
 )
+apply_sqlite_profile(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+def async_url(url: str) -> str:
+    """The same database with its asyncio driver, e.g. postgresql+psycopg2 -> postgresql+asyncpg."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        return url
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_url(DATABASE_URL)
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, pool_pre_ping=True, **pool_options(ASYNC_DATABASE_URL))
+apply_sqlite_profile(async_engine.sync_engine)
+# expire_on_commit=False: rows are serialized after the commit, outside any greenlet
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# Analytics reads get their own pool: READ_DATABASE_URL (e.g. a replica), or read-only
+# connections to the same SQLite file under the performance profile
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL", "")
+if READ_DATABASE_URL or (async_engine.dialect.name == "sqlite" and sqlite_pragmas()):
+    read_url = async_url(READ_DATABASE_URL or DATABASE_URL)
+    async_read_engine = create_async_engine(read_url, pool_pre_ping=True, **pool_options(read_url, "DB_READ"))
+    apply_sqlite_profile(async_read_engine.sync_engine, read_only=True)
+else:
+    async_read_engine = async_engine
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
 class Base(DeclarativeBase):
     pass
 
 
+def add_missing_columns(target: Engine, table) -> list[str]:
+    """Add the model's columns that an existing table lacks; create_all leaves existing tables alone.
+
+    Returns the names of the columns that were added.
+    """
+    existing = {c["name"] for c in inspect(target).get_columns(table.name)}
+    missing = [c for c in table.columns if c.name not in existing]
+    if missing:
+        with target.begin() as conn:
+            for column in missing:
+                ddl = column.type.compile(dialect=target.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {ddl}"))
+    return [c.name for c in missing]
+
+
+def dialect_insert(db):
+    """The dialect's INSERT construct with ON CONFLICT support, or None."""
+    name = db.get_bind().dialect.name
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
+
+
+def insert_ignore(db, table):
+    """INSERT that skips rows whose key already exists, where the dialect supports it."""
+    insert = dialect_insert(db)
+    if insert is None:
+        return table.insert()
+    return insert(table).on_conflict_do_nothing()
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -25,3 +145,12 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_read_db():
+    """Session for read-only analytics queries."""
+    async with AsyncReadSessionLocal() as db:
+        yield db
@@ -2,24 +2,46 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .routers import keywords, posts, alerts
-from .routers import analytics
-from .db import engine
+from .routers import analytics, dashboard, stream
+from .routers import metrics
+from .db import add_missing_columns, async_engine, async_read_engine, engine, SessionLocal
 from . import models
+from .services.window_state import get_window_state
+from .services.bursts import get_burst_tracker
+from .services.scheduler import scheduler
+from .services.graph import get_graph_service
+from .services.ingest import shutdown_post_writer
+from .services.rollups import ensure_rollups
+from .services.hashtags import ensure_post_hashtags
+from .services.profiles import ensure_author_profiles, get_profile_writer
+from .services.nlp import flush_embedding_cache, shutdown_batchers, shutdown_nlp_pool
+from .services.detection import ensure_alert_lifecycle, shutdown_detect_pool
+from .services.response_cache import CACHED_PATHS, ResponseCacheMiddleware
+from .services.metrics import METRICS_ENABLED, MetricsMiddleware
 
 app = FastAPI(title="Cyber Threat Detection: Anti-India Campaigns", version="0.1.0")
 
+# added before CORS so it sits inside it and cached bodies carry no per-origin headers
+app.add_middleware(ResponseCacheMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+if METRICS_ENABLED:
+    # outermost, so cache hits and CORS preflights are timed too
+    app.add_middleware(MetricsMiddleware, known_paths=CACHED_PATHS)
 
 app.include_router(keywords.router, prefix="/api")
 app.include_router(posts.router, prefix="/api")
 app.include_router(alerts.router, prefix="/api")
 app.include_router(analytics.router, prefix="/api")
+app.include_router(dashboard.router, prefix="/api")
+app.include_router(stream.router, prefix="/api")
+app.include_router(metrics.router)
 
 @app.get("/")
 def root():
@@ -30,5 +52,42 @@ def root():
 def on_startup():
     # Create tables if not exist
     models.Base.metadata.create_all(bind=engine)
+    # create_all skips columns and indexes added to tables that already exist
+    add_missing_columns(engine, models.Alert.__table__)
+    db = SessionLocal()
+    try:
+        ensure_alert_lifecycle(db)
+    finally:
+        db.close()
+    for table in (models.Post.__table__, models.Alert.__table__):
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    # Backfill rollups, the hashtag index and author profiles, and warm the detection window and burst detectors from posts already in the database
+    db = SessionLocal()
+    try:
+        ensure_rollups(db)
+        ensure_post_hashtags(db)
+        ensure_author_profiles(db)
+        get_window_state().rebuild(db)
+        get_burst_tracker().rebuild(db)
+    finally:
+        db.close()
+    scheduler.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    scheduler.stop()
+    # queued posts still go to the graph and the window, so this precedes their shutdown
+    shutdown_post_writer()
+    get_profile_writer().close()
+    get_graph_service().close()
+    shutdown_nlp_pool()
+    shutdown_detect_pool()
+    shutdown_batchers()
+    flush_embedding_cache()
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
 
 
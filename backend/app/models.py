@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, ForeignKey, Float, Index
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, ForeignKey, Float, Index, LargeBinary, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -28,9 +28,69 @@ class Post(Base):
     mentions = Column(JSON, default=list)
     meta = Column(JSON, default=dict)  # likes, retweets, etc
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    keyword_matches = relationship("PostKeyword", lazy="selectin", viewonly=True)
 
     __table_args__ = (
         Index("ix_posts_platform_created", "platform", "created_at"),
+        # keyset pages for GET /posts/ filters
+        Index("ix_posts_created_id", "created_at", "id"),
+        Index("ix_posts_stance_created", "stance", "created_at", "id"),
+        Index("ix_posts_language_created", "language", "created_at", "id"),
+        Index("ix_posts_author_handle_created", "author_handle", "created_at", "id"),
+    )
+
+    @property
+    def keywords(self) -> list[str]:
+        return [m.term for m in self.keyword_matches]
+
+
+class PostHashtag(Base):
+    __tablename__ = "post_hashtags"
+    post_id = Column(String(128), ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    tag = Column(String(256), primary_key=True)  # normalized: lowercase, no leading '#'
+    position = Column(Integer, default=0)  # 0 = the post's top hashtag
+    created_at = Column(DateTime, index=True)
+
+    __table_args__ = (
+        Index("ix_post_hashtags_tag_created", "tag", "created_at", "post_id"),
+    )
+
+
+class KeywordVersion(Base):
+    """Single-row counter bumped with every keyword change, so other workers notice and rebuild the matcher."""
+    __tablename__ = "keyword_version"
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+
+
+class WindowFeed(Base):
+    """Posts in commit order, so each worker can pull the posts other workers ingested into its detection window."""
+    __tablename__ = "window_feed"
+    seq = Column(Integer, primary_key=True)
+    post_id = Column(String(128), nullable=False)
+    origin = Column(String(128), nullable=False)  # the worker that wrote it
+    recorded_at = Column(DateTime, nullable=False, index=True)
+
+    # AUTOINCREMENT so SQLite never hands out a seq again after pruning
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+class SchedulerLease(Base):
+    """Time-limited claim on a periodic job, so only one worker runs it."""
+    __tablename__ = "scheduler_leases"
+    name = Column(String(64), primary_key=True)
+    owner = Column(String(128), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+
+class PostKeyword(Base):
+    __tablename__ = "post_keywords"
+    post_id = Column(String(128), ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    term = Column(String(256), primary_key=True)  # Keyword.term that matched
+    created_at = Column(DateTime, index=True)
+
+    __table_args__ = (
+        Index("ix_post_keywords_term_created", "term", "created_at", "post_id"),
     )
 
 
@@ -38,8 +98,73 @@ class Alert(Base):
     __tablename__ = "alerts"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(256), nullable=False)
+    hashtag = Column(String(256), index=True)
+    window_start = Column(DateTime)
+    status = Column(String(16), default="open")  # open, updated, closed
     risk_score = Column(Float, default=0.0)
     details = Column(JSON, default=dict)
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    closed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_alerts_hashtag_window", "hashtag", "window_start", unique=True),
+        # at most one open or updated alert per hashtag, even with several workers evaluating
+        Index(
+            "ux_alerts_active_hashtag", "hashtag", unique=True,
+            sqlite_where=text("status IN ('open', 'updated')"),
+            postgresql_where=text("status IN ('open', 'updated')"),
+        ),
+        Index("ix_alerts_status_updated", "status", "updated_at"),
+        Index("ix_alerts_status_risk", "status", "risk_score"),
+    )
 
 
+class TrendBucket(Base):
+    __tablename__ = "trend_buckets"
+    resolution = Column(Integer, primary_key=True)  # bucket width in seconds
+    bucket_start = Column(DateTime, primary_key=True)
+    platform = Column(String(32), primary_key=True)
+    post_count = Column(Integer, default=0)
+    anti_count = Column(Integer, default=0)
+    pro_count = Column(Integer, default=0)
+    neutral_count = Column(Integer, default=0)
+    toxicity_sum = Column(Float, default=0.0)
+
+
+class AuthorBucket(Base):
+    __tablename__ = "author_buckets"
+    bucket_start = Column(DateTime, primary_key=True)  # hourly
+    author_handle = Column(String(256), primary_key=True)
+    post_count = Column(Integer, default=0)
+    toxicity_sum = Column(Float, default=0.0)
+    anti_count = Column(Integer, default=0)
+    last_seen = Column(DateTime)
+
+
+class AuthorProfile(Base):
+    """Running behavioural statistics per author, folded in shortly after each ingest.
+
+    The *_weight, similarity_sum, gap and active_hours statistics decay with
+    PROFILE_HALF_LIFE_HOURS, measured back from last_seen; the *_count
+    columns are plain totals.
+    """
+    __tablename__ = "author_profiles"
+    author_id = Column(String(128), primary_key=True)
+    author_handle = Column(String(256))
+    post_count = Column(Integer, default=0)
+    first_seen = Column(DateTime)
+    last_seen = Column(DateTime)
+    post_weight = Column(Float, default=0.0)
+    compared_weight = Column(Float, default=0.0)  # weight of posts that had earlier ones to compare with
+    # inter-arrival gaps in seconds (weighted Welford mean and sum of squared deviations)
+    gap_count = Column(Integer, default=0)
+    gap_weight = Column(Float, default=0.0)
+    gap_mean = Column(Float, default=0.0)
+    gap_m2 = Column(Float, default=0.0)
+    centroid = Column(LargeBinary)  # weighted running mean of post embeddings, float64 bytes
+    similarity_sum = Column(Float, default=0.0)  # cosine of each post to the centroid before it
+    near_dup_count = Column(Integer, default=0)
+    near_dup_weight = Column(Float, default=0.0)
+    recent_fingerprints = Column(JSON, default=list)  # sign-bit fingerprints of the last few posts
+    active_hours = Column(JSON)  # decayed posts per UTC hour of day
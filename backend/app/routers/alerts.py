@@ -1,22 +1,52 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
+from datetime import datetime
 
-from ..db import get_db
+from ..db import get_async_db
 from .. import models, schemas
-from ..services.detection import evaluate_alerts, get_campaign_details
+from ..services.detection import get_campaign_details
+from ..services.scheduler import scheduler
 
 router = APIRouter(prefix="/alerts", tags=["alerts"])
 
 
 @router.get("/", response_model=List[schemas.AlertOut])
-def list_alerts(db: Session = Depends(get_db)):
-    evaluate_alerts(db)
-    return db.query(models.Alert).order_by(models.Alert.created_at.desc()).all()
+async def list_alerts(
+    status: str | None = Query(default=None, description="open, updated, closed or active (open + updated)"),
+    since: datetime | None = None,
+    until: datetime | None = None,
+    min_score: float | None = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    query = select(models.Alert)
+    if status == "active":
+        query = query.where(models.Alert.status.in_(("open", "updated")))
+    elif status:
+        query = query.where(models.Alert.status == status)
+    if since:
+        query = query.where(models.Alert.updated_at >= since)
+    if until:
+        query = query.where(models.Alert.updated_at < until)
+    if min_score is not None:
+        query = query.where(models.Alert.risk_score >= min_score)
+    result = await db.scalars(query.order_by(models.Alert.updated_at.desc()).limit(limit))
+    return result.all()
+
+
+@router.post("/evaluate")
+async def evaluate():
+    return await run_in_threadpool(scheduler.run_once)
 
 
 @router.get("/campaign/{campaign_id}")
-def campaign_details(campaign_id: int, db: Session = Depends(get_db)):
-    return get_campaign_details(db, campaign_id)
-
-
+async def campaign_details(
+    campaign_id: int,
+    limit: int = Query(default=200, ge=1, le=1000),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await db.run_sync(get_campaign_details, campaign_id, limit=limit, cursor=cursor)
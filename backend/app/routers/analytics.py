@@ -1,57 +1,83 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..db import get_db
-from .. import models
+from ..db import get_read_db
+from ..services.bursts import KINDS, get_burst_tracker
+from ..services.nlp import embedding_cache_stats, inference_stats
+from ..services.hashtags import top_hashtags
+from ..services.profiles import get_profile
+from ..services.response_cache import get_response_cache
+from ..services.rollups import BUCKET_SIZES, INFLUENCER_SORTS, query_trends, top_authors
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
 
 @router.get("/influencers")
-def influencers(db: Session = Depends(get_db)):
-    since = datetime.utcnow() - timedelta(days=3)
-    q = (
-        db.query(
-            models.Post.author_handle,
-            func.count(models.Post.id).label("posts"),
-            func.avg(models.Post.toxicity).label("toxicity"),
-        )
-        .filter(models.Post.created_at >= since)
-        .group_by(models.Post.author_handle)
-        .order_by(func.count(models.Post.id).desc())
-        .limit(20)
-    )
-    return [
-        {"author": row[0], "posts": row[1], "avg_toxicity": float(row[2] or 0.0)}
-        for row in q.all()
-    ]
+async def influencers(
+    k: int = Query(default=20, ge=1, le=1000),
+    hours: float = Query(default=72.0, gt=0),
+    sort: str = Query(default="posts", description="posts, toxicity or anti_ratio"),
+    min_posts: int = Query(default=1, ge=1),
+    db: AsyncSession = Depends(get_read_db),
+):
+    if sort not in INFLUENCER_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(INFLUENCER_SORTS)}")
+    return await db.run_sync(top_authors, k=k, hours=hours, sort=sort, min_posts=min_posts)
 
 
 @router.get("/trends")
-def trends(db: Session = Depends(get_db)):
-    since = datetime.utcnow() - timedelta(hours=24)
-    buckets = {}
-    for p in (
-        db.query(models.Post)
-        .filter(models.Post.created_at >= since)
-        .order_by(models.Post.created_at.asc())
-        .all()
-    ):
-        key = p.created_at.replace(minute=(p.created_at.minute // 30) * 30, second=0, microsecond=0)
-        buckets.setdefault(key.isoformat(), {"count": 0, "anti": 0, "toxicity": []})
-        buckets[key.isoformat()]["count"] += 1
-        buckets[key.isoformat()]["anti"] += 1 if p.stance == "anti" else 0
-        buckets[key.isoformat()]["toxicity"].append(p.toxicity or 0.0)
-    series = []
-    for t, v in sorted(buckets.items()):
-        series.append({
-            "time": t,
-            "count": v["count"],
-            "anti_ratio": (v["anti"] / max(1, v["count"])),
-            "avg_toxicity": (sum(v["toxicity"]) / max(1, len(v["toxicity"]))),
-        })
-    return series
+async def trends(
+    bucket: str = Query(default="30m", description="1m, 5m, 30m, 1h or 1d"),
+    hours: float = Query(default=24.0, gt=0),
+    platform: str | None = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    if bucket not in BUCKET_SIZES:
+        raise HTTPException(status_code=400, detail=f"bucket must be one of {', '.join(BUCKET_SIZES)}")
+    return await db.run_sync(query_trends, bucket=bucket, hours=hours, platform=platform)
 
 
+@router.get("/hashtags")
+async def hashtags(
+    hours: float = Query(default=24.0, gt=0),
+    limit: int = Query(default=20, ge=1, le=500),
+    db: AsyncSession = Depends(get_read_db),
+):
+    return await db.run_sync(top_hashtags, hours=hours, limit=limit)
+
+
+@router.get("/authors/{author_id}")
+async def author_profile(author_id: str, db: AsyncSession = Depends(get_read_db)):
+    """Behavioural profile of one author and the bot score computed from it."""
+    profile = await db.run_sync(get_profile, author_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Author not found")
+    return profile
+
+
+@router.get("/bursts")
+async def bursts(
+    kind: str | None = Query(default=None, description="hashtag or keyword"),
+    key: str | None = None,
+    active: bool = Query(default=False, description="only streams with an open burst"),
+    limit: int = Query(default=50, ge=1, le=1000),
+):
+    """Streaming burst state per hashtag and keyword, with each stream's recent burst intervals."""
+    if kind is not None and kind not in KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(KINDS)}")
+    return get_burst_tracker().snapshot(kind=kind, key=key, active_only=active, limit=limit)
+
+
+@router.get("/embedding-cache")
+async def embedding_cache():
+    return embedding_cache_stats()
+
+
+@router.get("/inference")
+async def inference():
+    return inference_stats()
+
+
+@router.get("/response-cache")
+async def response_cache():
+    return get_response_cache().stats()
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db import get_read_db
+from ..services.dashboard import build_snapshot
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+
+
+@router.get("/snapshot")
+async def snapshot(
+    hours: float = Query(default=24.0, gt=0),
+    influencer_hours: float = Query(default=72.0, gt=0),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Sidebar stats, alert summary, distributions, trends, influencers and the live feed in one payload."""
+    return await db.run_sync(build_snapshot, hours=hours, influencer_hours=influencer_hours)
@@ -4,6 +4,8 @@ from typing import List
 
 from ..db import get_db
 from .. import models, schemas
+from ..services.matcher import bump_keyword_version, invalidate_matcher
+from ..services.response_cache import bump_data_version
 
 router = APIRouter(prefix="/keywords", tags=["keywords"])
 
@@ -15,8 +17,11 @@ def create_keyword(payload: schemas.KeywordCreate, db: Session = Depends(get_db)
         raise HTTPException(status_code=409, detail="Term already exists")
     kw = models.Keyword(term=payload.term, category=payload.category, description=payload.description)
     db.add(kw)
+    bump_keyword_version(db)
     db.commit()
     db.refresh(kw)
+    invalidate_matcher()
+    bump_data_version()
     return kw
 
 
@@ -35,7 +40,10 @@ def delete_keyword(keyword_id: int, db: Session = Depends(get_db)):
     if not kw:
         raise HTTPException(status_code=404, detail="Not found")
     db.delete(kw)
+    bump_keyword_version(db)
     db.commit()
+    invalidate_matcher()
+    bump_data_version()
     return {"deleted": True}
 
 
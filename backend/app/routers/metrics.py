@@ -0,0 +1,88 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from ..db import async_engine, async_read_engine, engine
+from ..services.bursts import get_burst_tracker
+from ..services.events import get_event_bus
+from ..services.graph import get_graph_service
+from ..services.metrics import gauge_family, render
+from ..services.nlp import embedding_cache_stats, inference_stats
+from ..services.profiles import get_profile_writer
+from ..services.response_cache import get_response_cache
+from ..services.window_state import get_window_state
+
+router = APIRouter(tags=["metrics"])
+
+
+def _pool_samples() -> list[tuple[tuple, dict]]:
+    pools = [("sync", engine.pool), ("async", async_engine.sync_engine.pool)]
+    if async_read_engine is not async_engine:
+        pools.append(("read", async_read_engine.sync_engine.pool))
+    samples = []
+    for name, pool in pools:
+        # only QueuePool-style pools report occupancy
+        if hasattr(pool, "checkedout"):
+            samples.append(((name,), {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+            }))
+    return samples
+
+
+def collect() -> list[str]:
+    """Queue depths, cache hit rates and pool usage, read at scrape time."""
+    lines = []
+
+    graph = get_graph_service().stats()
+    lines += gauge_family("aic_graph_queue_depth", "Posts waiting for the graph writer.", [((), graph["queued"])])
+    lines += gauge_family("aic_graph_written_total", "Posts written to the graph.", [((), graph["written"])], kind="counter")
+    lines += gauge_family("aic_graph_dropped_total", "Posts dropped by the graph writer.", [((), graph["dropped"])], kind="counter")
+    lines += gauge_family("aic_graph_breaker_open", "1 while the graph circuit breaker is open.", [((), int(graph["breaker"] == "open"))])
+
+    profiles = get_profile_writer().stats()
+    lines += gauge_family("aic_profile_queue_depth", "Posts waiting to be folded into author profiles.", [((), profiles["queued"])])
+    lines += gauge_family("aic_profile_written_total", "Posts folded into author profiles.", [((), profiles["written"])], kind="counter")
+    lines += gauge_family("aic_profile_dropped_total", "Posts dropped by the profile writer.", [((), profiles["dropped"])], kind="counter")
+
+    inference = inference_stats()
+    model = ("model",)
+    lines += gauge_family("aic_inference_queue_depth", "Items waiting in a model's micro-batcher.",
+                          [((name,), s["queued"]) for name, s in inference.items()], model)
+    lines += gauge_family("aic_inference_batches_total", "Batches run per model.",
+                          [((name,), s["batches"]) for name, s in inference.items()], model, kind="counter")
+    lines += gauge_family("aic_inference_batch_occupancy", "Mean batch fill over recent batches.",
+                          [((name,), s["occupancy"]) for name, s in inference.items()], model)
+
+    embed = embedding_cache_stats()
+    lines += gauge_family("aic_embedding_cache_hit_ratio", "Embedding cache hit ratio since start.", [((), embed["hit_rate"])])
+    lines += gauge_family("aic_embedding_cache_items", "Vectors in the embedding cache memory tier.", [((), embed["items"])])
+
+    cache = get_response_cache().stats()
+    lines += gauge_family("aic_response_cache_hit_ratio", "Response cache hit ratio since start.", [((), cache["hit_rate"])])
+    lines += gauge_family("aic_response_cache_entries", "Responses held in the response cache.", [((), cache["entries"])])
+    lines += gauge_family("aic_data_version", "Data version used to invalidate cached responses.", [((), cache["data_version"])])
+
+    stream = get_event_bus().stats()
+    lines += gauge_family("aic_stream_subscribers", "Connected live-stream subscribers.", [((), stream["subscribers"])])
+    lines += gauge_family("aic_stream_buffered_events", "Events buffered across subscribers.", [((), stream["buffered"])])
+
+    lines += gauge_family("aic_window_hashtags", "Hashtags in the detection window.", [((), len(get_window_state().groups))])
+
+    bursts = get_burst_tracker().stats()
+    lines += gauge_family("aic_burst_streams", "Hashtags and keywords with a burst detector.", [((), bursts["streams"])])
+    lines += gauge_family("aic_bursts_active", "Streams currently in a burst.",
+                          [((kind,), n) for kind, n in bursts["active"].items()], ("kind",))
+    lines += gauge_family("aic_burst_onsets_total", "Bursts detected since start.", [((), bursts["onsets"])], kind="counter")
+
+    pools = _pool_samples()
+    for key in ("size", "checked_out", "checked_in", "overflow"):
+        lines += gauge_family(f"aic_db_pool_{key}", f"Database connection pool {key.replace('_', ' ')}.",
+                              [(labels, stats[key]) for labels, stats in pools], ("pool",))
+    return lines
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(render(collect()), media_type="text/plain; version=0.0.4; charset=utf-8")
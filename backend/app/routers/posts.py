@@ -1,50 +1,148 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime
+import asyncio
+import json
+import zlib
 
-from ..db import get_db
+from ..db import get_async_db, get_db
 from .. import models, schemas
 from ..services.nlp import analyze_post
-from ..services.graph import GraphService
+from ..services.ingest import BatchWriter, build_row, get_post_writer
+from ..services import posts as post_queries
 
 router = APIRouter(prefix="/posts", tags=["posts"])
 
+BATCH_CHUNK = 5000
+
 
 @router.post("/", response_model=schemas.PostOut)
-def ingest_post(payload: schemas.PostIn, db: Session = Depends(get_db)):
-    created_at = payload.created_at or datetime.utcnow()
-    lang, toxicity, stance = analyze_post(payload.text)
-    post = models.Post(
-        id=payload.id,
-        platform=payload.platform,
-        author_id=payload.author_id or "",
-        author_handle=payload.author_handle or "",
-        text=payload.text,
-        language=lang,
-        toxicity=toxicity,
-        stance=stance,
-        hashtags=payload.hashtags,
-        mentions=payload.mentions,
-        meta=payload.meta,
-        created_at=created_at,
-    )
-    db.merge(post)
-    db.commit()
+async def ingest_post(payload: schemas.PostIn):
+    """Ingest one post; it is committed together with the posts other requests sent meanwhile."""
+    # NLP is CPU-bound: keep it off the event loop
+    analysis = await run_in_threadpool(analyze_post, payload.text)
+    row = build_row(payload, analysis)
+    await asyncio.wrap_future(get_post_writer().submit(row))
+    return row
 
-    GraphService().upsert_post(post)
 
-    return post
+async def _decoded_chunks(request: Request):
+    encoding = request.headers.get("content-encoding", "")
+    if "gzip" not in encoding and request.headers.get("content-type", "") != "application/gzip":
+        async for chunk in request.stream():
+            yield chunk
+        return
+    inflater = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+    async for chunk in request.stream():
+        out = inflater.decompress(chunk)
+        if out:
+            yield out
+    tail = inflater.flush()
+    if tail:
+        yield tail
 
 
-@router.get("/", response_model=List[schemas.PostOut])
-def list_posts(db: Session = Depends(get_db)):
-    return db.query(models.Post).order_by(models.Post.created_at.desc()).limit(200).all()
+async def _ndjson_items(request: Request):
+    buf = b""
+    async for chunk in _decoded_chunks(request):
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buf.strip():
+        yield buf
 
 
-@router.get("/{post_id}", response_model=schemas.PostOut)
-def get_post(post_id: str, db: Session = Depends(get_db)):
-    post = db.query(models.Post).get(post_id)
-    return post
+@router.post("/batch", response_model=schemas.BatchResult)
+async def ingest_batch(request: Request, db: Session = Depends(get_db)):
+    """Bulk ingest from a JSON array or an NDJSON stream (optionally gzip-encoded).
+
+    Items are written and committed in chunks of BATCH_CHUNK, so a failure
+    part-way leaves the earlier chunks stored; posts are upserted by id, so
+    resending the whole batch is safe. The response reports a status per
+    item in request order.
+    """
+    writer = BatchWriter(db)
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        lines = []
+        async for line in _ndjson_items(request):
+            lines.append(line)
+            if len(lines) >= BATCH_CHUNK:
+                await run_in_threadpool(_write_lines, writer, lines)
+                lines = []
+        await run_in_threadpool(_write_lines, writer, lines)
+    else:
+        body = b"".join([chunk async for chunk in _decoded_chunks(request)])
+        try:
+            items = json.loads(body)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of posts")
+        for start in range(0, len(items), BATCH_CHUNK):
+            await run_in_threadpool(_write_items, writer, items[start:start + BATCH_CHUNK])
+    return await run_in_threadpool(writer.commit)
+
+
+def _write_lines(writer: BatchWriter, lines: list[bytes]):
+    for line in lines:
+        try:
+            writer.add(json.loads(line))
+        except ValueError as e:
+            writer.add_error(f"Invalid JSON line: {e}")
+    writer.flush()
 
 
+def _write_items(writer: BatchWriter, items: list):
+    for raw in items:
+        writer.add(raw)
+    writer.flush()
+
+
+@router.get("/", response_model=List[schemas.PostFieldsOut], response_model_exclude_unset=True)
+async def list_posts(
+    response: Response,
+    platform: str | None = None,
+    stance: str | None = None,
+    language: str | None = None,
+    min_toxicity: float | None = Query(default=None, ge=0, le=1),
+    max_toxicity: float | None = Query(default=None, ge=0, le=1),
+    author: str | None = Query(default=None, description="author handle"),
+    hashtag: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    fields: str | None = Query(default=None, description="comma-separated subset of post fields; id and created_at are always included"),
+    limit: int = Query(default=200, ge=1, le=1000),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Newest posts first. When more match, the next page's cursor is in the X-Next-Cursor header."""
+    rows, next_cursor = await db.run_sync(
+        post_queries.list_posts,
+        platform=platform,
+        stance=stance,
+        language=language,
+        min_toxicity=min_toxicity,
+        max_toxicity=max_toxicity,
+        author=author,
+        hashtag=hashtag,
+        since=since,
+        until=until,
+        fields=post_queries.parse_fields(fields),
+        limit=limit,
+        cursor=cursor,
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
+
+@router.get("/{post_id}", response_model=schemas.PostOut)
+async def get_post(post_id: str, db: AsyncSession = Depends(get_async_db)):
+    post = await db.get(models.Post, post_id)
+    return post
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import StreamingResponse
+
+from ..services.events import get_event_bus
+
+router = APIRouter(prefix="/stream", tags=["stream"])
+
+
+@router.get("/events")
+async def events(
+    types: str | None = Query(default=None, description="comma-separated event types: post, alert, burst"),
+    last_event_id: int | None = Header(default=None),
+):
+    """Server-Sent Events: newly ingested posts, alert state changes and burst onsets as they happen.
+
+    Reconnect with Last-Event-ID to replay recent events; a `dropped` event
+    means this client fell behind and should refetch the snapshot.
+    """
+    bus = get_event_bus()
+    wanted = {t.strip() for t in types.split(",") if t.strip()} if types else None
+    sub = bus.subscribe(wanted, last_event_id)
+    return StreamingResponse(
+        bus.stream(sub),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/stats")
+async def stats():
+    return get_event_bus().stats()
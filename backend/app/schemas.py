@@ -43,17 +43,54 @@ class PostOut(BaseModel):
     hashtags: List[str]
     mentions: List[str]
     meta: dict
+    keywords: List[str] = Field(default_factory=list)
     created_at: datetime
 
     model_config = {"from_attributes": True}
 
 
+class PostFieldsOut(BaseModel):
+    """A post as listed by GET /posts/: only the requested fields are present."""
+    id: str
+    platform: Optional[str] = None
+    author_id: Optional[str] = None
+    author_handle: Optional[str] = None
+    text: Optional[str] = None
+    language: Optional[str] = None
+    toxicity: Optional[float] = None
+    stance: Optional[str] = None
+    hashtags: Optional[List[str]] = None
+    mentions: Optional[List[str]] = None
+    meta: Optional[dict] = None
+    keywords: Optional[List[str]] = None
+    created_at: datetime
+
+
+class BatchItemStatus(BaseModel):
+    index: int
+    id: Optional[str] = None
+    status: str  # ok, duplicate, error
+    detail: Optional[str] = None
+
+
+class BatchResult(BaseModel):
+    received: int
+    written: int
+    errors: int
+    items: List[BatchItemStatus]
+
+
 class AlertOut(BaseModel):
     id: int
     name: str
+    hashtag: Optional[str] = None
+    status: Optional[str] = None
+    window_start: Optional[datetime] = None
     risk_score: float
     details: dict
     created_at: datetime
+    updated_at: Optional[datetime] = None
+    closed_at: Optional[datetime] = None
 
     model_config = {"from_attributes": True}
 
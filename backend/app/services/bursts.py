@@ -0,0 +1,271 @@
+import math
+import os
+import threading
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .. import models
+from .hashtags import normalize_tag
+from .window_state import WINDOW
+
+
+# A burst is an arrival rate BURST_RATE_RATIO times the stream's baseline;
+# BURST_THRESHOLD is the log-likelihood the CUSUM must reach before it fires.
+BURST_RATE_RATIO = float(os.getenv("BURST_RATE_RATIO", "3.0"))
+BURST_THRESHOLD = float(os.getenv("BURST_THRESHOLD", "8.0"))
+# gaps needed before a stream has a baseline worth testing against
+BURST_MIN_GAPS = int(os.getenv("BURST_MIN_GAPS", "10"))
+# caps Welford's n so the baseline keeps following slow drift
+BURST_BASELINE_GAPS = int(os.getenv("BURST_BASELINE_GAPS", "500"))
+BURST_HISTORY = int(os.getenv("BURST_HISTORY", "20"))
+BURST_MAX_STREAMS = int(os.getenv("BURST_MAX_STREAMS", "20000"))
+KINDS = ("hashtag", "keyword")
+
+MIN_GAP_SECONDS = 1e-3
+_LOG_RATIO = math.log(BURST_RATE_RATIO)
+
+
+@dataclass
+class BurstInterval:
+    start: datetime
+    end: datetime | None
+    detected_at: datetime  # time of the post that crossed the threshold
+    posts: int
+
+
+class BurstDetector:
+    """Online burst detection for one stream of post timestamps.
+
+    Inter-arrival gaps outside open bursts feed a Welford mean, giving the
+    baseline rate λ0. Each new gap then updates a one-sided CUSUM of the
+    Poisson log-likelihood ratio for rate k·λ0 against λ0:
+
+        S = max(0, S + log k - (k - 1)·λ0·gap)
+
+    A burst opens when S passes BURST_THRESHOLD and closes when S drains
+    back to zero; while open, S is capped at twice the threshold so a long
+    burst does not take as long again to close. Its start is the last time
+    S left zero, the usual CUSUM change-point estimate. Every update is
+    O(1). Posts older than the newest one seen so far count towards the
+    burst but add no gap.
+    """
+
+    __slots__ = ("posts", "n", "mean", "m2", "last", "cusum", "rise_start", "rise_posts", "active", "history")
+
+    def __init__(self):
+        self.posts = 0
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.last: datetime | None = None
+        self.cusum = 0.0
+        self.rise_start: datetime | None = None
+        self.rise_posts = 0
+        self.active: BurstInterval | None = None
+        self.history: deque[BurstInterval] = deque(maxlen=BURST_HISTORY)
+
+    def _drain_rate(self) -> float:
+        # (λ1 - λ0): how fast S falls per second without arrivals
+        return (BURST_RATE_RATIO - 1.0) / max(self.mean, MIN_GAP_SECONDS)
+
+    def observe(self, ts: datetime) -> bool:
+        """Add one post; True when it opens a burst."""
+        self.posts += 1
+        last = self.last
+        if last is None or ts < last:
+            if last is None:
+                self.last = ts
+            if self.cusum > 0:
+                self.rise_posts += 1
+            if self.active is not None:
+                self.active.posts += 1
+            return False
+        gap = (ts - last).total_seconds()
+        self.last = ts
+        onset = False
+        if self.n >= BURST_MIN_GAPS:
+            onset = self._step(gap, last, ts)
+        if self.active is None:
+            self._learn(gap)
+        return onset
+
+    def _learn(self, gap: float):
+        if self.n < BURST_BASELINE_GAPS:
+            self.n += 1
+        else:
+            # past the cap this is an exponentially weighted mean and variance
+            self.m2 *= (self.n - 1) / self.n
+        delta = gap - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (gap - self.mean)
+
+    def _step(self, gap: float, last: datetime, ts: datetime) -> bool:
+        drain = self._drain_rate()
+        prev = self.cusum
+        self.cusum = max(0.0, prev + _LOG_RATIO - drain * gap)
+        if self.active is not None:
+            if self.cusum == 0.0:
+                self._close(last + timedelta(seconds=prev / drain))
+                return False
+            self.active.posts += 1
+            self.cusum = min(self.cusum, 2.0 * BURST_THRESHOLD)
+            return False
+        if self.cusum == 0.0:
+            self.rise_start, self.rise_posts = None, 0
+            return False
+        if prev == 0.0:
+            self.rise_start, self.rise_posts = last, 1
+        self.rise_posts += 1
+        if self.cusum < BURST_THRESHOLD:
+            return False
+        self.active = BurstInterval(self.rise_start, None, ts, self.rise_posts)
+        return True
+
+    def _close(self, end: datetime):
+        self.active.end = end
+        self.history.append(self.active)
+        self.active = None
+        self.cusum, self.rise_start, self.rise_posts = 0.0, None, 0
+
+    def settle(self, now: datetime):
+        """Close an open burst whose CUSUM would have drained by `now` with no further posts."""
+        if self.active is None or self.last is None or now <= self.last:
+            return
+        drain = self._drain_rate()
+        if self.cusum - drain * (now - self.last).total_seconds() <= 0.0:
+            self._close(self.last + timedelta(seconds=self.cusum / drain))
+
+    def state(self) -> dict:
+        rate = 3600.0 / self.mean if self.n and self.mean > 0 else None
+        return {
+            "posts": self.posts,
+            "last_post_at": self.last,
+            "baseline_gap_seconds": self.mean if self.n else None,
+            "baseline_gap_stddev": math.sqrt(self.m2 / self.n) if self.n else None,
+            "baseline_posts_per_hour": rate,
+            "warming_up": self.n < BURST_MIN_GAPS,
+            "cusum": self.cusum,
+            "active": _interval(self.active, self.last) if self.active is not None else None,
+            "recent": [_interval(b, b.end) for b in reversed(self.history)],
+        }
+
+
+def _interval(burst: BurstInterval, end: datetime) -> dict:
+    seconds = (end - burst.start).total_seconds()
+    return {**asdict(burst), "posts_per_hour": burst.posts * 3600.0 / seconds if seconds > 0 else None}
+
+
+class BurstTracker:
+    """Burst detectors for every hashtag and watchlist keyword, fed as posts are committed.
+
+    Streams are kept in least-recently-updated order and the stalest is
+    dropped once there are more than `max_streams`.
+    """
+
+    def __init__(self, max_streams: int = BURST_MAX_STREAMS):
+        self.max_streams = max_streams
+        self.streams: OrderedDict[tuple[str, str], BurstDetector] = OrderedDict()
+        self.lock = threading.Lock()
+        self.onsets = 0
+
+    def _observe(self, kind: str, key: str, ts: datetime) -> bool:
+        detector = self.streams.get((kind, key))
+        if detector is None:
+            detector = self.streams[(kind, key)] = BurstDetector()
+            if len(self.streams) > self.max_streams:
+                self.streams.popitem(last=False)
+        else:
+            self.streams.move_to_end((kind, key))
+        return detector.observe(ts)
+
+    def observe_posts(self, rows) -> list[dict]:
+        """Feed committed posts in time order; returns an event for each burst that opened."""
+        onsets = []
+        with self.lock:
+            for row in sorted(rows, key=lambda r: r["created_at"]):
+                ts = row["created_at"]
+                tags = {normalize_tag(t) for t in row.get("hashtags") or []}
+                keys = [("hashtag", t) for t in tags if t] + [("keyword", k) for k in row.get("keywords") or []]
+                for kind, key in keys:
+                    if self._observe(kind, key, ts):
+                        onsets.append(burst_event(kind, key, self.streams[(kind, key)]))
+            self.onsets += len(onsets)
+        return onsets
+
+    def snapshot(self, kind: str | None = None, key: str | None = None, active_only: bool = False,
+                 limit: int = 50, now: datetime | None = None) -> list[dict]:
+        """Current state of the matching streams, open bursts first, then by CUSUM."""
+        now = now or datetime.utcnow()
+        out = []
+        with self.lock:
+            for (k, name), detector in self.streams.items():
+                if (kind and k != kind) or (key is not None and name != key):
+                    continue
+                detector.settle(now)
+                if active_only and detector.active is None:
+                    continue
+                # without a key, streams that never rose above baseline are left out
+                if key is None and detector.active is None and not detector.history and detector.cusum == 0.0:
+                    continue
+                out.append({"kind": k, "key": name, **detector.state()})
+        out.sort(key=lambda s: (s["active"] is None, -s["cusum"]))
+        return out[:limit]
+
+    def stats(self) -> dict:
+        now = datetime.utcnow()
+        with self.lock:
+            active = {kind: 0 for kind in KINDS}
+            for (kind, _), detector in self.streams.items():
+                detector.settle(now)
+                if detector.active is not None:
+                    active[kind] += 1
+            return {"streams": len(self.streams), "active": active, "onsets": self.onsets}
+
+    def rebuild(self, db: Session):
+        """Replay the last window of posts so baselines survive a restart; no events are published."""
+        since = datetime.utcnow() - WINDOW
+        post, pk = models.Post, models.PostKeyword
+        keywords: dict[str, list[str]] = {}
+        for post_id, term in db.execute(select(pk.post_id, pk.term).where(pk.created_at >= since)):
+            keywords.setdefault(post_id, []).append(term)
+        q = (
+            select(post.id, post.hashtags, post.created_at)
+            .where(post.created_at >= since)
+            .order_by(post.created_at)
+            .execution_options(yield_per=1000)
+        )
+        with self.lock:
+            self.streams.clear()
+        chunk = []
+        for row in db.execute(q):
+            chunk.append({"hashtags": row.hashtags, "keywords": keywords.get(row.id), "created_at": row.created_at})
+            if len(chunk) >= 1000:
+                self.observe_posts(chunk)
+                chunk = []
+        self.observe_posts(chunk)
+        with self.lock:
+            self.onsets = 0
+
+
+def burst_event(kind: str, key: str, detector: BurstDetector) -> dict:
+    burst = detector.active
+    return {
+        "kind": kind,
+        "key": key,
+        "start": burst.start,
+        "detected_at": burst.detected_at,
+        "posts": burst.posts,
+        "cusum": detector.cusum,
+        "baseline_posts_per_hour": 3600.0 / detector.mean if detector.mean > 0 else None,
+    }
+
+
+_tracker = BurstTracker()
+
+
+def get_burst_tracker() -> BurstTracker:
+    return _tracker
@@ -0,0 +1,72 @@
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+from .hashtags import top_hashtags
+from .posts import list_posts
+from .response_cache import data_version
+from .rollups import active_authors, platform_totals, query_trends, top_authors
+
+
+HISTOGRAM_BINS = 20
+HISTOGRAM_SAMPLE = 1000  # most recent posts behind the toxicity histogram
+FEED_FIELDS = ["id", "platform", "author_handle", "text", "stance", "toxicity", "created_at"]
+
+
+def _threat_level(active: int) -> str:
+    if active > 2:
+        return "high"
+    if active > 0:
+        return "medium"
+    return "low"
+
+
+def _toxicity_histogram(db: Session) -> dict[str, list[int]]:
+    rows, _ = list_posts(db, fields=["id", "stance", "toxicity", "created_at"], limit=HISTOGRAM_SAMPLE)
+    hist: dict[str, list[int]] = {}
+    for row in rows:
+        counts = hist.setdefault(row["stance"] or "unknown", [0] * HISTOGRAM_BINS)
+        counts[min(HISTOGRAM_BINS - 1, int((row["toxicity"] or 0.0) * HISTOGRAM_BINS))] += 1
+    return hist
+
+
+def build_snapshot(db: Session, hours: float = 24.0, influencer_hours: float = 72.0) -> dict:
+    """Everything one dashboard render needs, read from rollups and indexes rather than raw posts."""
+    platforms = platform_totals(db, hours)
+    total = sum(p["post_count"] for p in platforms.values())
+    toxicity = sum(p["toxicity_sum"] for p in platforms.values())
+    stance = {
+        "anti": sum(p["anti_count"] for p in platforms.values()),
+        "pro": sum(p["pro_count"] for p in platforms.values()),
+        "neutral": sum(p["neutral_count"] for p in platforms.values()),
+    }
+    alerts = (
+        db.query(models.Alert)
+        .filter(models.Alert.status.in_(("open", "updated")))
+        .order_by(models.Alert.risk_score.desc())
+        .all()
+    )
+    recent, _ = list_posts(db, fields=FEED_FIELDS, limit=5)
+    return {
+        "data_version": data_version(),
+        "hours": hours,
+        "stats": {
+            "total_posts": total,
+            "anti_posts": stance["anti"],
+            "avg_toxicity": toxicity / total if total else 0.0,
+            "active_alerts": len(alerts),
+            "threat_level": _threat_level(len(alerts)),
+        },
+        "alerts": {
+            "high": sum(1 for a in alerts if a.risk_score > 80),
+            "medium": sum(1 for a in alerts if 50 <= a.risk_score <= 80),
+            "low": sum(1 for a in alerts if a.risk_score < 50),
+            "active": [schemas.AlertOut.model_validate(a).model_dump() for a in alerts],
+        },
+        "stance": stance,
+        "platforms": {name: p["post_count"] for name, p in platforms.items()},
+        "toxicity_histogram": _toxicity_histogram(db),
+        "trends": query_trends(db, bucket="30m", hours=hours),
+        "influencers": top_authors(db, k=10, hours=influencer_hours),
+        "network": {"users": active_authors(db, hours), "top_hashtags": top_hashtags(db, hours=hours, limit=10)},
+        "recent_posts": recent,
+    }
@@ -1,69 +1,310 @@
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+import logging
 import math
-from collections import defaultdict
+import multiprocessing
+import os
+import threading
+from collections import Counter
+
+import numpy as np
 
 from .. import models
+from .events import alert_event, get_event_bus
 from .nlp import embed_texts
+from .lsh import NEAR_DUP_THRESHOLD, SimHashIndex, sign_valued
+from .metrics import stage
+from .profiles import author_bot_scores
+from .hashtags import posts_for_tag
+from .window_state import HashtagWindow, WindowState, get_window_state
 
 
-def compute_risk(posts: list[models.Post]) -> float:
-    if not posts:
+logger = logging.getLogger(__name__)
+
+
+def _risk(count: int, toxicity_sum: float, anti_count: int) -> float:
+    if not count:
         return 0.0
-    toxicity = sum(p.toxicity or 0.0 for p in posts) / len(posts)
-    anti_ratio = sum(1.0 if (p.stance == "anti") else 0.0 for p in posts) / len(posts)
-    volume = min(len(posts) / 50.0, 1.0)
+    toxicity = toxicity_sum / count
+    anti_ratio = anti_count / count
+    volume = min(count / 50.0, 1.0)
     return float((0.5 * toxicity + 0.4 * anti_ratio + 0.1 * volume) * 100.0)
 
 
-def evaluate_alerts(db: Session):
-    since = datetime.utcnow() - timedelta(hours=6)
-    recent = (
-        db.query(models.Post)
-        .filter(models.Post.created_at >= since)
-        .all()
+def compute_risk(posts: list[models.Post]) -> float:
+    return _risk(
+        len(posts),
+        sum(p.toxicity or 0.0 for p in posts),
+        sum(1 if (p.stance == "anti") else 0 for p in posts),
     )
 
-    # Group by top hashtag
-    groups: dict[str, list[models.Post]] = {}
-    for p in recent:
-        top = (p.hashtags or ["uncategorized"])[0] if p.hashtags else "uncategorized"
-        groups.setdefault(top, []).append(p)
-
-    for tag, posts in groups.items():
-        risk = compute_risk(posts)
-        burst = burst_score(posts)
-        coord = coordination_score(posts)
-        bot = bot_likelihood(posts)
+
+def score_window(group: HashtagWindow, profiles: dict[str, float]) -> dict:
+    """Detector scores for one hashtag window, cached until the window changes.
+
+    `profiles` maps author ids to their profile bot scores.
+    """
+    if group.scores is None:
+        posts = list(group.posts)
+        with stage("detect.coordination"):
+            coordination = coordination_score(posts)
+        group.scores = _window_scores(group, coordination, profiles)
+    return group.scores
+
+
+def _window_scores(group: HashtagWindow, coordination: float, profiles: dict[str, float]) -> dict:
+    with stage("detect.burst"):
+        burst = _burst(*group.gap_stats()) if group.count > 1 else 0.0
+    with stage("detect.bot"):
+        bot = bot_likelihood(group.posts, profiles)
+    return {
+        "risk": _risk(group.count, group.toxicity_sum, group.anti_count),
+        "burst": burst,
+        "coordination": coordination,
+        "bot": bot,
+    }
+
+
+DETECT_WORKERS = os.getenv("DETECT_WORKERS", "0")
+DETECT_PARALLEL_MIN_POSTS = int(os.getenv("DETECT_PARALLEL_MIN_POSTS", "5000"))
+# small groups are packed together until a task has at least this many posts
+DETECT_TASK_MIN_POSTS = 512
+
+_detect_pool: ProcessPoolExecutor | None = None
+
+
+def detect_workers() -> int:
+    if DETECT_WORKERS == "auto":
+        return os.cpu_count() or 1
+    return int(DETECT_WORKERS)
+
+
+def get_detect_pool() -> ProcessPoolExecutor | None:
+    """Lazily started process pool for group scoring, or None when disabled."""
+    global _detect_pool
+    workers = detect_workers()
+    if workers <= 1:
+        return None
+    if _detect_pool is None:
+        _detect_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _detect_pool
+
+
+def shutdown_detect_pool():
+    global _detect_pool
+    if _detect_pool is not None:
+        _detect_pool.shutdown(wait=False, cancel_futures=True)
+        _detect_pool = None
+
+
+def _score_chunk(chunk: list[tuple]) -> list[float]:
+    # Runs in a pool worker
+    return [_coordination(times, emb) for times, emb in chunk]
+
+
+def _pack(payloads: list[tuple]) -> list[list[tuple]]:
+    chunks, chunk, size = [], [], 0
+    for payload in payloads:
+        chunk.append(payload)
+        size += len(payload[0])
+        if size >= DETECT_TASK_MIN_POSTS:
+            chunks.append(chunk)
+            chunk, size = [], 0
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def score_windows(groups: list[HashtagWindow], profiles: dict[str, float]):
+    """Fill in the scores of every group whose window changed since it was last scored.
+
+    With DETECT_WORKERS > 1 and enough posts to rescore, coordination
+    scores run in the process pool. Embeddings are looked up here, so the
+    cache and any batched model stay in this process, and workers only
+    receive timestamp and embedding arrays. Groups go out largest first so
+    the biggest hashtag starts before the long tail. Scores are identical
+    to score_window's.
+    """
+    stale = [g for g in groups if g.scores is None]
+    pool = get_detect_pool()
+    if pool is None or sum(g.count for g in stale) < DETECT_PARALLEL_MIN_POSTS:
+        for group in stale:
+            score_window(group, profiles)
+        return
+    stale.sort(key=lambda g: g.count, reverse=True)
+    posts = [list(g.posts) for g in stale]
+    with stage("detect.embed"):
+        emb = embed_texts([p.text for group_posts in posts for p in group_posts])
+    payloads = []
+    offset = 0
+    for group_posts in posts:
+        times = np.array([p.created_at.timestamp() for p in group_posts], dtype=np.float64)
+        payloads.append((times, emb[offset:offset + len(group_posts)]))
+        offset += len(group_posts)
+    with stage("detect.parallel"):
+        try:
+            futures = [pool.submit(_score_chunk, chunk) for chunk in _pack(payloads)]
+            results = [score for future in futures for score in future.result()]
+        except BrokenProcessPool:
+            # a worker died; start a fresh pool next time and score this pass here
+            logger.warning("detection pool broke; scoring %d groups serially", len(stale), exc_info=True)
+            shutdown_detect_pool()
+            results = [_coordination(times, group_emb) for times, group_emb in payloads]
+    for group, coordination in zip(stale, results):
+        group.scores = _window_scores(group, coordination, profiles)
+
+
+ALERT_THRESHOLD = 60.0
+ACTIVE_STATUSES = ("open", "updated")
+
+
+# the scheduler thread and POST /alerts/evaluate must not interleave
+_evaluate_lock = threading.Lock()
+
+
+def evaluate_alerts(db: Session, state: WindowState | None = None) -> dict:
+    """Score the current window and upsert one alert per hashtag episode.
+
+    An alert opens when a hashtag crosses the threshold, is updated while it
+    stays above it, and is closed once it drops below or leaves the window.
+    Runs in one process are serialized. Across workers, the scheduler lease
+    lets one worker evaluate at a time, callers sync the window from the
+    feed first so it holds every worker's posts, and a partial unique index
+    allows only one active alert per hashtag.
+    """
+    with _evaluate_lock:
+        return _evaluate_alerts(db, state)
+
+
+def _evaluate_alerts(db: Session, state: WindowState | None) -> dict:
+    state = state or get_window_state()
+    now = datetime.utcnow()
+    # Ingest waits on the state lock, so it is held only to expire posts and
+    # copy the groups touched since the last evaluation; those are scored from
+    # the copies and their scores kept only if the group has not changed since.
+    with state.lock:
+        with stage("detect.advance"):
+            state.advance(now)
+        scored, stale = [], []
+        for tag, group in state.groups.items():
+            if group.scores is None:
+                stale.append((tag, group, group.snapshot()))
+            else:
+                scored.append((tag, group.count, group.scores))
+        window_start = now - state.window
+
+    with stage("detect.profiles"):
+        profiles = author_bot_scores(db, {p.author_id for _, _, copy in stale for p in copy.posts})
+    with stage("detect.score"):
+        score_windows([copy for _, _, copy in stale], profiles)
+    with state.lock:
+        for _, group, copy in stale:
+            if group.version == copy.version:
+                group.scores = copy.scores
+    scored += [(tag, copy.count, copy.scores) for tag, _, copy in stale]
+
+    with stage("detect.query"):
+        active = {
+            a.hashtag: a
+            for a in db.query(models.Alert).filter(models.Alert.status.in_(ACTIVE_STATUSES))
+        }
+    summary = {"opened": 0, "updated": 0, "closed": 0}
+    changed = []
+    for tag, count, scores in scored:
+        risk, burst, coord, bot = scores["risk"], scores["burst"], scores["coordination"], scores["bot"]
         total = min(100.0, 0.5 * risk + 0.2 * burst + 0.2 * coord + 0.1 * bot)
-        if total >= 60:
+        alert = active.pop(tag, None)
+        if total < ALERT_THRESHOLD:
+            if alert is not None:
+                _close_alert(alert, now)
+                summary["closed"] += 1
+                changed.append(alert)
+            continue
+        details = {
+            "hashtag": tag,
+            "count": count,
+            "scores": {"risk": risk, "burst": burst, "coordination": coord, "bot": bot},
+        }
+        if alert is None:
             alert = models.Alert(
                 name=f"Spike around #{tag}",
+                hashtag=tag,
+                window_start=window_start,
+                status="open",
                 risk_score=total,
-                details={
-                    "hashtag": tag,
-                    "count": len(posts),
-                    "scores": {"risk": risk, "burst": burst, "coordination": coord, "bot": bot},
-                },
+                details=details,
+                created_at=now,
+                updated_at=now,
             )
             db.add(alert)
+            summary["opened"] += 1
+            changed.append(alert)
+        elif alert.details != details:
+            alert.status = "updated"
+            alert.risk_score = total
+            alert.details = details
+            alert.updated_at = now
+            summary["updated"] += 1
+            changed.append(alert)
+    # hashtags that left the window entirely
+    for alert in active.values():
+        _close_alert(alert, now)
+        summary["closed"] += 1
+        changed.append(alert)
+    with stage("detect.commit"):
+        try:
+            db.flush()  # assigns ids to new alerts
+        except IntegrityError:
+            # another worker opened an alert for one of these hashtags first; the next run picks it up
+            db.rollback()
+            return {"opened": 0, "updated": 0, "closed": 0}
+        events = [alert_event(a) for a in changed]
+        db.commit()
+    bus = get_event_bus()
+    for event in events:
+        bus.publish("alert", event)
+    return summary
+
+
+def _close_alert(alert: models.Alert, now: datetime):
+    alert.status = "closed"
+    alert.closed_at = now
+    alert.updated_at = now
+
+
+def ensure_alert_lifecycle(db: Session):
+    """Close alerts stored before alerts had a status, and all but the newest active alert per hashtag.
+
+    Runs before the index allowing one active alert per hashtag is created.
+    """
+    now = datetime.utcnow()
+    alert = models.Alert
+    legacy = db.query(alert).filter(alert.status.is_(None))
+    legacy.update({alert.status: "closed", alert.updated_at: alert.created_at, alert.closed_at: alert.created_at}, synchronize_session=False)
+    seen = set()
+    active = (
+        db.query(alert)
+        .filter(alert.status.in_(ACTIVE_STATUSES))
+        .order_by(alert.hashtag, alert.updated_at.desc(), alert.id.desc())
+    )
+    for a in active:
+        if a.hashtag in seen:
+            _close_alert(a, now)
+        seen.add(a.hashtag)
     db.commit()
 
 
-def get_campaign_details(db: Session, campaign_id: int):
+def get_campaign_details(db: Session, campaign_id: int, limit: int = 200, cursor: str | None = None):
     alert = db.query(models.Alert).get(campaign_id)
     if not alert:
         return {"error": "not_found"}
-    tag = alert.details.get("hashtag", "") if alert.details else ""
-    posts = []
+    tag = alert.hashtag or (alert.details.get("hashtag", "") if alert.details else "")
+    posts, next_cursor = [], None
     if tag:
-        posts = (
-            db.query(models.Post)
-            .filter(models.Post.hashtags.contains([tag]))
-            .order_by(models.Post.created_at.desc())
-            .limit(200)
-            .all()
-        )
+        posts, next_cursor = posts_for_tag(db, tag, limit=limit, cursor=cursor)
     return {
         "alert": {
             "id": alert.id,
@@ -81,6 +322,7 @@ def get_campaign_details(db: Session, campaign_id: int):
             }
             for p in posts
         ],
+        "next_cursor": next_cursor,
     }
 
 
@@ -93,66 +335,79 @@ def burst_score(posts: list[models.Post]) -> float:
     intervals = [timestamps[i+1] - timestamps[i] for i in range(len(timestamps)-1)]
     mu = sum(intervals) / len(intervals)
     variance = sum((x - mu)**2 for x in intervals) / len(intervals)
+    return _burst(mu, variance)
+
+
+def _burst(mu: float, variance: float) -> float:
     sigma = math.sqrt(variance) + 1e-6
     z = max(0.0, (3600.0 - mu) / sigma)  # smaller mean interval => higher burst
     return float(min(100.0, 20.0 * z))
 
 
+COORD_WINDOW_SECONDS = 900.0
+COORD_BLOCK_ROWS = 256
+
+
+def _count_windowed_pairs(times: np.ndarray, emb: np.ndarray, window: float, threshold: float) -> int:
+    """Count pairs (i < j) with times[j] - times[i] <= window and dot > threshold.
+
+    `times` must be sorted ascending and `emb` ordered to match. Rows are
+    processed in blocks so each similarity batch is a single matrix product
+    against the posts that can still fall inside the window.
+    """
+    n = len(times)
+    # hi[i] is one past the last post within `window` seconds of post i
+    hi = np.searchsorted(times, times + window, side="right")
+    count = 0
+    for start in range(0, n, COORD_BLOCK_ROWS):
+        stop = min(start + COORD_BLOCK_ROWS, n)
+        end = int(hi[stop - 1])
+        if end <= start + 1:
+            continue
+        sims = emb[start:stop] @ emb[start:end].T
+        cols = np.arange(start, end)
+        rows = np.arange(start, stop)[:, None]
+        mask = (cols > rows) & (cols < hi[start:stop, None])
+        count += int(np.count_nonzero((sims > threshold) & mask))
+    return count
+
+
 def coordination_score(posts: list[models.Post]) -> float:
     if len(posts) < 3:
         return 0.0
-    texts = [p.text for p in posts]
-    emb = embed_texts(texts)
-    if len(emb) < 3:
-        return 0.0
-    
+    emb = embed_texts([p.text for p in posts])
+    times = np.array([p.created_at.timestamp() for p in posts], dtype=np.float64)
+    return _coordination(times, emb)
+
+
+def _coordination(times: np.ndarray, emb: np.ndarray) -> float:
     n = len(emb)
-    # fraction of pairs with similarity > 0.85 within 15 minutes
-    times = [p.created_at.timestamp() for p in posts]
-    coord_pairs = 0
+    if n < 3:
+        return 0.0
+    # fraction of pairs with similarity > threshold within 15 minutes
+    vectors = np.asarray(emb, dtype=np.float64)
+    # a single block is cheaper to brute-force than to index, and the index
+    # only finds every pair when the embeddings are sign-valued
+    if n <= COORD_BLOCK_ROWS or not sign_valued(vectors):
+        order = np.argsort(times, kind="stable")
+        coord_pairs = _count_windowed_pairs(times[order], vectors[order], COORD_WINDOW_SECONDS, NEAR_DUP_THRESHOLD)
+    else:
+        index = SimHashIndex(vectors, NEAR_DUP_THRESHOLD)
+        coord_pairs = index.count_similar_pairs(times, COORD_WINDOW_SECONDS)
     total_pairs = max(1, n * (n - 1) // 2)
-    
-    for i in range(n):
-        for j in range(i + 1, n):
-            # cosine similarity
-            dot = sum(emb[i][k] * emb[j][k] for k in range(len(emb[i])))
-            sim = max(0.0, min(1.0, dot))
-            if sim > 0.85 and abs(times[i] - times[j]) <= 900:
-                coord_pairs += 1
-    
+
     frac = coord_pairs / total_pairs
     return float(min(100.0, 100.0 * frac))
 
 
-def bot_likelihood(posts: list[models.Post]) -> float:
-    if not posts:
-        return 0.0
-    by_user = defaultdict(list)
-    for p in posts:
-        by_user[p.author_id].append(p)
-    # user-level bot score: high frequency and repetitive content (cosine sim mean)
-    user_scores = []
-    for user, uposts in by_user.items():
-        if len(uposts) < 2:
-            continue
-        times = sorted([p.created_at.timestamp() for p in uposts])
-        freq = len(uposts) / max(1.0, (times[-1] - times[0]) / 3600.0)
-        texts = [p.text for p in uposts]
-        emb = embed_texts(texts)
-        if len(emb) >= 2:
-            # calculate pairwise similarity
-            sims = []
-            for i in range(len(emb)):
-                for j in range(i + 1, len(emb)):
-                    dot = sum(emb[i][k] * emb[j][k] for k in range(len(emb[i])))
-                    sims.append(max(0.0, min(1.0, dot)))
-            rep = sum(sims) / len(sims) if sims else 0.0
-        else:
-            rep = 0.0
-        score = min(100.0, 20.0 * freq + 80.0 * rep)
-        user_scores.append(score)
-    if not user_scores:
-        return 0.0
-    return float(sum(user_scores) / len(user_scores))
-
+def bot_likelihood(posts: list[models.Post], profiles: dict[str, float]) -> float:
+    """Mean profile bot score of the authors with at least two posts in the group.
 
+    The per-author work happens at ingest (see services/profiles.py), so
+    this is linear in the group size instead of quadratic per author.
+    """
+    counts = Counter(p.author_id for p in posts)
+    scores = [profiles.get(author, 0.0) for author, n in counts.items() if n >= 2]
+    if not scores:
+        return 0.0
+    return float(sum(scores) / len(scores))
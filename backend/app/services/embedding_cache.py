@@ -0,0 +1,210 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+KEY_BYTES = 16
+MAX_PROBES = 16
+LAYOUT_VERSION = 1
+
+
+def normalize_text(text: str) -> str:
+    return text.lower()
+
+
+def text_digest(text: str) -> bytes:
+    """Stable content address of a text; identical across processes and restarts."""
+    return hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=KEY_BYTES).digest()
+
+
+class DiskTier:
+    """Open-addressed table of float32 vectors in two memory-mapped files.
+
+    `<path>.keys` holds one digest per slot (all zeros = empty) and
+    `<path>.vecs` the matching vectors. A vector is written before its key so
+    readers in other processes never see a key without its vector. Opened
+    read-only, the tier can be shared by any number of workers.
+
+    `<path>.meta` records the layout (version, dimension, slots). Files
+    whose layout does not match are recreated empty, or refused with a
+    ValueError when opened read-only.
+    """
+
+    def __init__(self, path: str, dim: int, slots: int, readonly: bool = False):
+        self.dim = dim
+        self.readonly = readonly
+        keys_path, vecs_path, self.meta_path = f"{path}.keys", f"{path}.vecs", f"{path}.meta"
+        existing = os.path.exists(keys_path) or os.path.exists(vecs_path)
+        stored = self._stored_slots(keys_path, vecs_path)
+        if stored is None and readonly:
+            raise ValueError(f"embedding cache {path} does not hold {dim}-dimensional vectors")
+        if stored is None and existing:
+            logger.warning("embedding cache %s has a different layout; recreating it for %d-dimensional vectors", path, dim)
+        if stored is not None:
+            mode = "r" if readonly else "r+"
+            self.keys = np.memmap(keys_path, dtype=np.uint8, mode=mode).reshape(-1, KEY_BYTES)
+            self.vecs = np.memmap(vecs_path, dtype=np.float32, mode=mode).reshape(-1, dim)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.keys = np.memmap(keys_path, dtype=np.uint8, mode="w+", shape=(slots, KEY_BYTES))
+            self.vecs = np.memmap(vecs_path, dtype=np.float32, mode="w+", shape=(slots, dim))
+        self.slots = len(self.keys)
+        if not readonly:
+            self._write_layout()
+
+    def _layout(self, slots: int) -> dict:
+        return {"version": LAYOUT_VERSION, "dim": self.dim, "slots": slots, "key_bytes": KEY_BYTES, "dtype": "float32"}
+
+    def _stored_slots(self, keys_path: str, vecs_path: str) -> int | None:
+        """Slot count of existing files laid out for this dimension, else None."""
+        if not (os.path.exists(keys_path) and os.path.exists(vecs_path)):
+            return None
+        keys_size, vecs_size = os.path.getsize(keys_path), os.path.getsize(vecs_path)
+        slots = keys_size // KEY_BYTES
+        if not slots or keys_size != slots * KEY_BYTES or vecs_size != slots * self.dim * 4:
+            return None
+        # files written before the header existed are accepted on their sizes alone
+        if os.path.exists(self.meta_path):
+            try:
+                with open(self.meta_path) as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                return None
+            if meta != self._layout(slots):
+                return None
+        return slots
+
+    def _write_layout(self):
+        tmp = f"{self.meta_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._layout(self.slots), f)
+        os.replace(tmp, self.meta_path)
+
+    def _probe(self, key: bytes):
+        start = int.from_bytes(key[:8], "little") % self.slots
+        for i in range(min(MAX_PROBES, self.slots)):
+            yield (start + i) % self.slots
+
+    def get(self, key: bytes):
+        for slot in self._probe(key):
+            stored = self.keys[slot].tobytes()
+            if stored == key:
+                return np.array(self.vecs[slot])
+            if not any(stored):
+                return None
+        return None
+
+    def put(self, key: bytes, vec: np.ndarray) -> bool:
+        if self.readonly:
+            return False
+        for slot in self._probe(key):
+            stored = self.keys[slot].tobytes()
+            if stored == key:
+                return True
+            if not any(stored):
+                self.vecs[slot] = vec
+                self.keys[slot] = np.frombuffer(key, dtype=np.uint8)
+                return True
+        return False  # neighbourhood full; keep the vector in memory only
+
+    def flush(self):
+        if not self.readonly:
+            self.vecs.flush()
+            self.keys.flush()
+
+
+class EmbeddingCache:
+    """Content-addressed embedding cache: in-memory LRU over an optional disk tier."""
+
+    def __init__(self, dim: int, max_bytes: int, disk: DiskTier | None = None):
+        self.dim = dim
+        self.max_items = max(1, max_bytes // (dim * 4))
+        self.disk = disk
+        self._lru: OrderedDict[bytes, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: bytes):
+        with self._lock:
+            vec = self._lru.get(key)
+            if vec is not None:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return vec
+        if self.disk is not None:
+            vec = self.disk.get(key)
+            if vec is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._remember(key, vec)
+                return vec
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: bytes, vec: np.ndarray):
+        vec = np.asarray(vec, dtype=np.float32)
+        with self._lock:
+            self._remember(key, vec)
+        if self.disk is not None:
+            self.disk.put(key, vec)
+
+    def _remember(self, key: bytes, vec: np.ndarray):
+        self._lru[key] = vec
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+            self.evictions += 1
+
+    def flush(self):
+        if self.disk is not None:
+            self.disk.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "items": len(self._lru),
+                "max_items": self.max_items,
+                "bytes": len(self._lru) * self.dim * 4,
+                "disk_slots": self.disk.slots if self.disk is not None else 0,
+            }
+
+
+def build_cache(dim: int, namespace: str | None = None) -> EmbeddingCache:
+    """Cache for one embedding space; `namespace` (model id and dimension) keeps each model's disk files apart."""
+    max_bytes = int(os.getenv("EMBED_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    path = os.getenv("EMBED_CACHE_PATH", "")
+    if path and namespace:
+        path = f"{path}.{re.sub(r'[^A-Za-z0-9_.-]+', '_', namespace)}"
+    readonly = os.getenv("EMBED_CACHE_READONLY", "0") == "1"
+    disk = None
+    if readonly and path and not (os.path.exists(f"{path}.keys") and os.path.exists(f"{path}.vecs")):
+        logger.warning("embedding cache %s not found; running without the read-only disk tier", path)
+    elif path:
+        try:
+            disk = DiskTier(
+                path,
+                dim,
+                slots=int(os.getenv("EMBED_CACHE_DISK_SLOTS", "1048576")),
+                readonly=readonly,
+            )
+        except ValueError:
+            logger.warning("embedding cache %s does not match; running without the read-only disk tier", path, exc_info=True)
+    return EmbeddingCache(dim, max_bytes, disk)
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+
+STREAM_BUFFER = int(os.getenv("STREAM_BUFFER", "1000"))
+STREAM_REPLAY = int(os.getenv("STREAM_REPLAY", "256"))
+STREAM_HEARTBEAT = float(os.getenv("STREAM_HEARTBEAT", "15"))
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class Subscriber:
+    """One stream consumer: a bounded buffer of encoded frames living on an event loop.
+
+    When the consumer falls behind, the oldest frames are dropped and counted
+    instead of blocking publishers; the stream then tells the client so it
+    can resync.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, types: set[str] | None, maxlen: int = STREAM_BUFFER):
+        self.loop = loop
+        self.types = types
+        self.buffer: deque[bytes] = deque(maxlen=maxlen)
+        self.dropped = 0
+        self.ready = asyncio.Event()
+        self._wake_pending = False
+
+    def push(self, frame: bytes):
+        # any thread; only the first push after a drain schedules a wakeup
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append(frame)
+        if not self._wake_pending:
+            self._wake_pending = True
+            self.loop.call_soon_threadsafe(self.ready.set)
+
+    def drain(self) -> list[bytes]:
+        self._wake_pending = False
+        self.ready.clear()
+        frames = []
+        while self.buffer:
+            frames.append(self.buffer.popleft())
+        return frames
+
+
+class EventBus:
+    """In-process pub/sub fan-out for the live stream.
+
+    Each event is encoded once as an SSE frame and appended to every
+    matching subscriber's buffer, so publishing costs the same whether the
+    frame goes to one viewer or fifty. The last STREAM_REPLAY frames are
+    kept so a reconnecting client can resume from Last-Event-ID.
+    """
+
+    def __init__(self, replay: int = STREAM_REPLAY):
+        self.subscribers: set[Subscriber] = set()
+        self.history: deque[tuple[int, str, bytes]] = deque(maxlen=replay)
+        self.seq = 0
+        self.published = 0
+        self._lock = threading.Lock()
+
+    def publish(self, event: str, data: dict):
+        with self._lock:
+            self.seq += 1
+            frame = f"id: {self.seq}\nevent: {event}\ndata: {json.dumps(data, default=_default)}\n\n".encode("utf-8")
+            self.history.append((self.seq, event, frame))
+            self.published += 1
+            for sub in self.subscribers:
+                if sub.types is None or event in sub.types:
+                    sub.push(frame)
+
+    def subscribe(self, types: set[str] | None = None, last_event_id: int | None = None) -> Subscriber:
+        sub = Subscriber(asyncio.get_running_loop(), types)
+        with self._lock:
+            if last_event_id is not None:
+                for seq, event, frame in self.history:
+                    if seq > last_event_id and (types is None or event in types):
+                        sub.push(frame)
+            self.subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        with self._lock:
+            self.subscribers.discard(sub)
+
+    async def stream(self, sub: Subscriber, heartbeat: float = STREAM_HEARTBEAT):
+        """SSE body for one subscriber; heartbeats keep idle connections open."""
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(sub.ready.wait(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+                dropped = sub.dropped
+                frames = sub.drain()
+                if dropped:
+                    sub.dropped -= dropped
+                    yield f"event: dropped\ndata: {json.dumps({'count': dropped})}\n\n".encode("utf-8")
+                for frame in frames:
+                    yield frame
+        finally:
+            self.unsubscribe(sub)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "subscribers": len(self.subscribers),
+                "published": self.published,
+                "buffered": sum(len(s.buffer) for s in self.subscribers),
+                "last_event_id": self.seq,
+            }
+
+
+_bus = EventBus()
+
+
+def get_event_bus() -> EventBus:
+    return _bus
+
+
+def post_event(post) -> dict:
+    text = post.text or ""
+    return {
+        "id": post.id,
+        "platform": post.platform,
+        "author_handle": post.author_handle,
+        "text": text[:280],
+        "stance": post.stance,
+        "toxicity": post.toxicity,
+        "hashtags": post.hashtags or [],
+        "created_at": post.created_at,
+    }
+
+
+def alert_event(alert) -> dict:
+    return {
+        "id": alert.id,
+        "name": alert.name,
+        "hashtag": alert.hashtag,
+        "status": alert.status,
+        "risk_score": alert.risk_score,
+        "updated_at": alert.updated_at,
+    }
@@ -1,5 +1,10 @@
+import logging
 import os
-from .. import models
+import queue
+import threading
+import time
+
+from .metrics import stage
 
 try:
     from neo4j import GraphDatabase
@@ -9,52 +14,262 @@ except ImportError:
     GraphDatabase = None
 
 
-class GraphService:
+logger = logging.getLogger(__name__)
+
+UPSERT_POSTS = """
+UNWIND $rows AS row
+MERGE (u:User {id: row.author_id})
+SET u.handle = row.author_handle
+MERGE (p:Post {id: row.post_id})
+SET p.platform = row.platform, p.text = row.text, p.language = row.language, p.toxicity = row.toxicity, p.stance = row.stance, p.created_at = row.created_at
+MERGE (u)-[:POSTED]->(p)
+FOREACH (h IN row.hashtags | MERGE (t:Hashtag {name: toLower(h)}) MERGE (p)-[:TAGGED]->(t))
+"""
+
+
+def post_row(post) -> dict:
+    return {
+        "author_id": post.author_id,
+        "author_handle": post.author_handle,
+        "post_id": post.id,
+        "platform": post.platform,
+        "text": (post.text or "")[:1000],
+        "language": post.language,
+        "toxicity": post.toxicity,
+        "stance": post.stance,
+        "created_at": post.created_at.isoformat(),
+        "hashtags": post.hashtags or [],
+    }
+
+
+class InMemoryGraphDriver:
+    """Stand-in for a neo4j driver that applies UNWIND post batches to dicts.
+
+    Selected with NEO4J_URI=memory:// for local runs and tests.
+    """
+
     def __init__(self):
-        self.driver = None
-        if NEO4J_AVAILABLE:
-            uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
-            user = os.getenv("NEO4J_USER", "neo4j")
-            password = os.getenv("NEO4J_PASSWORD", "password")
+        self.users: dict[str, dict] = {}
+        self.posts: dict[str, dict] = {}
+        self.posted: set[tuple[str, str]] = set()
+        self.tagged: set[tuple[str, str]] = set()
+        self.transactions = 0
+        self._lock = threading.Lock()
+
+    def session(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_write(self, fn, *args, **kwargs):
+        with self._lock:
+            self.transactions += 1
+            return fn(self, *args, **kwargs)
+
+    def run(self, query: str, rows=None, **params):
+        for row in rows or []:
+            self.users[row["author_id"]] = {"handle": row["author_handle"]}
+            self.posts[row["post_id"]] = {k: row[k] for k in ("platform", "text", "language", "toxicity", "stance", "created_at")}
+            self.posted.add((row["author_id"], row["post_id"]))
+            for h in row["hashtags"]:
+                self.tagged.add((row["post_id"], h.lower()))
+
+    def close(self):
+        pass
+
+
+class CircuitBreaker:
+    """Stops graph calls after repeated failures and retries after a cooldown."""
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        return self.state != "open"
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold or self.opened_at is not None:
+            self.opened_at = time.monotonic()
+
+
+class GraphService:
+    """Process-wide graph writer with a persistent driver and a background queue.
+
+    Callers only enqueue rows. A daemon thread drains the bounded queue and
+    writes up to `batch_size` posts per UNWIND transaction, flushing at least
+    every `flush_interval` seconds. A full queue blocks a producer for at
+    most `enqueue_timeout` seconds per call, however many rows it brings;
+    rows that do not fit by then are dropped, and while the circuit breaker
+    is open nothing is queued at all.
+    """
+
+    def __init__(
+        self,
+        driver=None,
+        batch_size: int = int(os.getenv("GRAPH_BATCH_SIZE", "500")),
+        flush_interval: float = float(os.getenv("GRAPH_FLUSH_INTERVAL", "1.0")),
+        max_buffer: int = int(os.getenv("GRAPH_MAX_BUFFER", "10000")),
+        enqueue_timeout: float = 0.05,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self.driver = driver
+        self.enabled = driver is not None or NEO4J_AVAILABLE or os.getenv("NEO4J_URI", "").startswith("memory://")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.queue: queue.Queue = queue.Queue(maxsize=max_buffer)
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
+        if uri.startswith("memory://"):
+            return InMemoryGraphDriver()
+        user = os.getenv("NEO4J_USER", "neo4j")
+        password = os.getenv("NEO4J_PASSWORD", "password")
+        driver = GraphDatabase.driver(uri, auth=(user, password))
+        try:
+            driver.verify_connectivity()
+        except Exception:
+            driver.close()
+            raise
+        return driver
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._stop.clear()
+                    self._thread = threading.Thread(target=self._run, name="graph-writer", daemon=True)
+                    self._thread.start()
+
+    def _drop(self, n: int):
+        # producers and the writer thread both count drops
+        with self._lock:
+            self.dropped += n
+
+    def upsert_posts(self, posts):
+        if not self.enabled:
+            return
+        posts = list(posts)
+        deadline = time.monotonic() + self.enqueue_timeout
+        for i, post in enumerate(posts):
+            if not self.breaker.allow():
+                self._drop(len(posts) - i)
+                break
             try:
-                self.driver = GraphDatabase.driver(uri, auth=(user, password))
-                # test connection
-                with self.driver.session() as s:
-                    s.run("RETURN 1")
+                self.queue.put(post_row(post), timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                self._drop(len(posts) - i)
+                break
+        self._ensure_worker()
+
+    def upsert_post(self, post):
+        self.upsert_posts([post])
+
+    def _run(self):
+        while not self._stop.is_set() or not self.queue.empty():
+            rows = self._take_batch()
+            if rows:
+                self._write(rows)
+
+    def _take_batch(self) -> list[dict]:
+        rows = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(rows) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (self._stop.is_set() and self.queue.empty()):
+                break
+            try:
+                rows.append(self.queue.get(timeout=min(remaining, 0.1)))
+            except queue.Empty:
+                continue
+        return rows
+
+    def _write(self, rows: list[dict]):
+        try:
+            if not self.breaker.allow():
+                self._drop(len(rows))
+                return
+            try:
+                if self.driver is None:
+                    self.driver = self._connect()
+                with stage("graph.write"), self.driver.session() as session:
+                    session.execute_write(self._upsert_posts_tx, rows)
             except Exception:
-                self.driver = None
+                logger.warning("graph write of %d posts failed", len(rows), exc_info=True)
+                self.breaker.record_failure()
+                self._drop(len(rows))
+                return
+            self.breaker.record_success()
+            self.written += len(rows)
+            self.batches += 1
+        finally:
+            for _ in rows:
+                self.queue.task_done()
+
+    @staticmethod
+    def _upsert_posts_tx(tx, rows: list[dict]):
+        tx.run(UPSERT_POSTS, rows=rows)
+
+    def flush(self, timeout: float = 10.0):
+        """Block until every queued row has been written or dropped."""
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "breaker": self.breaker.state,
+        }
 
     def close(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.flush_interval + 5)
+            self._thread = None
         if self.driver:
             self.driver.close()
+            self.driver = None
 
-    def upsert_post(self, post: models.Post):
-        if not self.driver:
-            return  # Skip graph operations if Neo4j not available
-        with self.driver.session() as session:
-            session.execute_write(self._upsert_post_tx, post)
 
-    @staticmethod
-    def _upsert_post_tx(tx, post: models.Post):
-        tx.run(
-            """
-            MERGE (u:User {id: $author_id})
-            SET u.handle = $author_handle
-            MERGE (p:Post {id: $post_id})
-            SET p.platform = $platform, p.text = $text, p.language=$language, p.toxicity=$toxicity, p.stance=$stance, p.created_at=$created_at
-            MERGE (u)-[:POSTED]->(p)
-            FOREACH (h IN $hashtags | MERGE (t:Hashtag {name: toLower(h)}) MERGE (p)-[:TAGGED]->(t))
-            """,
-            author_id=post.author_id,
-            author_handle=post.author_handle,
-            post_id=post.id,
-            platform=post.platform,
-            text=post.text[:1000],
-            language=post.language,
-            toxicity=post.toxicity,
-            stance=post.stance,
-            created_at=post.created_at.isoformat(),
-            hashtags=post.hashtags or [],
-        )
+_service: GraphService | None = None
+_service_lock = threading.Lock()
 
 
+def get_graph_service() -> GraphService:
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = GraphService()
+    return _service
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..db import insert_ignore
+from .pagination import before_cursor, encode_cursor
+
+
+def normalize_tag(tag: str) -> str:
+    return tag.strip().lstrip("#").lower()
+
+
+def tag_rows(post: dict) -> list[dict]:
+    """post_hashtags rows for one post row, deduplicated after normalization."""
+    rows, seen = [], set()
+    for tag in post.get("hashtags") or []:
+        tag = normalize_tag(tag)
+        if tag and tag not in seen:
+            seen.add(tag)
+            rows.append({"post_id": post["id"], "tag": tag, "position": len(rows), "created_at": post["created_at"]})
+    return rows
+
+
+def apply_post_hashtags(db: Session, added: list[dict], removed: list[dict] = ()):
+    """Replace the hashtag index rows of the incoming posts.
+
+    Rows are deleted by incoming id rather than only for `removed`, so a
+    concurrent first ingest of the same id cannot leave duplicates behind.
+    """
+    table = models.PostHashtag.__table__
+    stale = [row["id"] for row in added]
+    for start in range(0, len(stale), 500):
+        db.execute(table.delete().where(table.c.post_id.in_(stale[start:start + 500])))
+    rows = [r for post in added for r in tag_rows(post)]
+    if rows:
+        db.execute(insert_ignore(db, table), rows)
+
+
+def rebuild_post_hashtags(db: Session):
+    db.query(models.PostHashtag).delete()
+    posts = [
+        row._asdict()
+        for row in db.query(models.Post.id, models.Post.hashtags, models.Post.created_at)
+    ]
+    apply_post_hashtags(db, posts)
+    db.commit()
+
+
+def ensure_post_hashtags(db: Session):
+    """Backfill the hashtag index once for databases that predate it."""
+    if db.query(models.PostHashtag.post_id).first() is None and db.query(models.Post.id).first() is not None:
+        rebuild_post_hashtags(db)
+
+
+def posts_for_tag(db: Session, tag: str, limit: int = 200, cursor: str | None = None) -> tuple[list[models.Post], str | None]:
+    """A page of a tag's posts, newest first, with the cursor for the next page."""
+    ph = models.PostHashtag
+    q = (
+        db.query(models.Post)
+        .join(ph, ph.post_id == models.Post.id)
+        .filter(ph.tag == normalize_tag(tag))
+    )
+    if cursor:
+        q = q.filter(before_cursor(ph.created_at, ph.post_id, cursor))
+    posts = q.order_by(ph.created_at.desc(), ph.post_id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(posts) > limit:
+        posts = posts[:limit]
+        next_cursor = encode_cursor(posts[-1].created_at, posts[-1].id)
+    return posts, next_cursor
+
+
+def top_hashtags(db: Session, hours: float = 24.0, limit: int = 20) -> list[dict]:
+    since = datetime.utcnow() - timedelta(hours=hours)
+    ph = models.PostHashtag
+    q = (
+        db.query(ph.tag, func.count(ph.post_id).label("posts"))
+        .filter(ph.created_at >= since)
+        .group_by(ph.tag)
+        .order_by(func.count(ph.post_id).desc())
+        .limit(limit)
+    )
+    return [{"tag": tag, "posts": posts} for tag, posts in q.all()]
@@ -0,0 +1,173 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Protocol
+
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "32"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "5"))
+INFERENCE_MAX_QUEUE = int(os.getenv("INFERENCE_MAX_QUEUE", "10000"))
+
+
+class InferenceModel(Protocol):
+    """Anything with a batched forward pass: one output per input text, in order."""
+
+    def predict(self, texts: list[str]) -> list: ...
+
+
+class DummyModel:
+    """Deterministic stand-in model that applies `fn` to each text.
+
+    `batch_cost_ms` and `item_cost_ms` make predict() sleep like a real
+    forward pass would (fixed overhead plus per-item cost), so batching
+    behaviour can be exercised offline. `model_id` and `dim` describe the
+    output the way a real embedding model would.
+    """
+
+    def __init__(self, fn: Callable[[str], object], batch_cost_ms: float = 0.0, item_cost_ms: float = 0.0,
+                 model_id: str | None = None, dim: int | None = None):
+        self.fn = fn
+        self.batch_cost_ms = batch_cost_ms
+        self.item_cost_ms = item_cost_ms
+        self.model_id = model_id or getattr(fn, "__qualname__", "dummy")
+        self.dim = dim
+
+    def predict(self, texts: list[str]) -> list:
+        cost = self.batch_cost_ms + self.item_cost_ms * len(texts)
+        if cost > 0:
+            time.sleep(cost / 1000.0)
+        return [self.fn(text) for text in texts]
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class MicroBatcher:
+    """Gathers texts from concurrent callers into batches for one model.
+
+    A daemon thread takes the first queued text, then keeps collecting until
+    the batch holds `max_batch_size` texts or `max_wait_ms` has passed, runs
+    a single predict() and resolves every caller's future. Texts already
+    waiting in the queue are always taken without further delay, so under
+    load batches fill up and under light traffic a caller waits at most
+    `max_wait_ms`. The queue is bounded; a full queue blocks submitters.
+    """
+
+    def __init__(
+        self,
+        model: InferenceModel,
+        max_batch_size: int = INFERENCE_MAX_BATCH,
+        max_wait_ms: float = INFERENCE_MAX_WAIT_MS,
+        max_queue: int = INFERENCE_MAX_QUEUE,
+        name: str = "model",
+        history: int = 256,
+    ):
+        self.model = model
+        self.name = name
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+        self.recent: deque[tuple[int, float, float]] = deque(maxlen=history)  # (size, latency, oldest wait)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._stop.clear()
+                    self._thread = threading.Thread(target=self._run, name=f"inference-{self.name}", daemon=True)
+                    self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        future: Future = Future()
+        self._ensure_worker()
+        self.queue.put((text, future, time.monotonic()))
+        return future
+
+    def predict(self, text: str, timeout: float | None = None):
+        return self.submit(text).result(timeout)
+
+    def predict_many(self, texts: list[str], timeout: float | None = None) -> list:
+        futures = [self.submit(text) for text in texts]
+        return [f.result(timeout) for f in futures]
+
+    def _run(self):
+        while not self._stop.is_set() or not self.queue.empty():
+            try:
+                batch = [self.queue.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: list[tuple[str, Future, float]]):
+        start = time.monotonic()
+        try:
+            outputs = self.model.predict([text for text, _, _ in batch])
+            if len(outputs) != len(batch):
+                raise ValueError(f"{self.name} returned {len(outputs)} outputs for {len(batch)} inputs")
+        except Exception as e:
+            logger.warning("%s inference batch of %d failed", self.name, len(batch), exc_info=True)
+            self.errors += 1
+            for _, future, _ in batch:
+                if not future.cancelled():
+                    future.set_exception(e)
+            return
+        finally:
+            latency = time.monotonic() - start
+            with self._lock:
+                self.batches += 1
+                self.items += len(batch)
+                self.recent.append((len(batch), latency, start - batch[0][2]))
+        for (_, future, _), output in zip(batch, outputs):
+            if not future.cancelled():
+                future.set_result(output)
+
+    def stats(self) -> dict:
+        with self._lock:
+            recent = list(self.recent)
+        sizes = [size for size, _, _ in recent]
+        latencies = [latency * 1000 for _, latency, _ in recent]
+        waits = [wait * 1000 for _, _, wait in recent]
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "errors": self.errors,
+            "queued": self.queue.qsize(),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            # over the last `history` batches
+            "mean_batch_size": sum(sizes) / len(sizes) if sizes else 0.0,
+            "occupancy": sum(sizes) / (len(sizes) * self.max_batch_size) if sizes else 0.0,
+            "latency_ms_p50": _percentile(latencies, 0.5),
+            "latency_ms_p95": _percentile(latencies, 0.95),
+            "latency_ms_max": max(latencies, default=0.0),
+            "queue_wait_ms_p95": _percentile(waits, 0.95),
+        }
+
+    def close(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
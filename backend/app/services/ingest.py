@@ -0,0 +1,278 @@
+import os
+import threading
+from datetime import datetime
+from types import SimpleNamespace
+
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+from ..db import SessionLocal, dialect_insert
+from .bursts import get_burst_tracker
+from .events import get_event_bus, post_event
+from .nlp import analyze_posts
+from .graph import get_graph_service
+from .hashtags import apply_post_hashtags
+from .inference import MicroBatcher
+from .matcher import apply_post_keywords
+from .metrics import stage
+from .profiles import get_profile_writer
+from .response_cache import bump_data_version
+from .rollups import apply_author_rollups, apply_trend_rollups
+from .window_state import as_utc_naive, get_window_state, record_window_feed
+
+
+POST_COLUMNS = [c.name for c in models.Post.__table__.columns]
+LOOKUP_CHUNK = 500
+# single-post ingests arriving together are written and committed as one group
+INGEST_GROUP_MAX = int(os.getenv("INGEST_GROUP_MAX", "256"))
+INGEST_GROUP_WAIT_MS = float(os.getenv("INGEST_GROUP_WAIT_MS", "2"))
+
+
+def build_row(payload: schemas.PostIn, analysis: tuple[str, float, str, list[str]]) -> dict:
+    lang, toxicity, stance, keywords = analysis
+    return {
+        "id": payload.id,
+        "platform": payload.platform,
+        "author_id": payload.author_id or "",
+        "author_handle": payload.author_handle or "",
+        "text": payload.text,
+        "language": lang,
+        "toxicity": toxicity,
+        "stance": stance,
+        "hashtags": payload.hashtags,
+        "mentions": payload.mentions,
+        "meta": payload.meta,
+        "created_at": as_utc_naive(payload.created_at) if payload.created_at else datetime.utcnow(),
+        "keywords": keywords,
+    }
+
+
+def upsert_posts(db: Session, rows: list[dict]):
+    """Insert or replace post rows with one INSERT ... ON CONFLICT statement.
+
+    Rows go through Core rather than the ORM so bulk loads skip per-object
+    bookkeeping. Falls back to per-row merge on dialects without ON CONFLICT.
+    """
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        for row in rows:
+            db.merge(models.Post(**{name: row[name] for name in POST_COLUMNS}))
+        return
+    stmt = insert(models.Post.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["id"],
+        set_={name: stmt.excluded[name] for name in POST_COLUMNS if name != "id"},
+    )
+    db.execute(stmt, [{name: row[name] for name in POST_COLUMNS} for row in rows])
+
+
+def insert_new_posts(db: Session, rows: list[dict]) -> set[str] | None:
+    """Insert the rows whose id is not stored yet and return the ids this statement inserted.
+
+    A concurrent ingest of the same new id waits on the key until the first
+    transaction commits and then conflicts, so only one of them counts the
+    post as new. Returns None on dialects without ON CONFLICT.
+    """
+    insert = dialect_insert(db)
+    if insert is None or not rows:
+        return None
+    table = models.Post.__table__
+    stmt = insert(table).on_conflict_do_nothing(index_elements=["id"]).returning(table.c.id)
+    result = db.execute(stmt, [{name: row[name] for name in POST_COLUMNS} for row in rows])
+    return set(result.scalars())
+
+
+def previous_rows(db: Session, ids: list[str]) -> list[dict]:
+    """The stored versions of posts about to be replaced, for reversing their rollups.
+
+    The rows stay locked until commit, so a concurrent re-ingest of the same
+    post reads this transaction's version rather than reversing the old one twice.
+    """
+    table = models.Post.__table__
+    found = []
+    for start in range(0, len(ids), LOOKUP_CHUNK):
+        chunk = ids[start:start + LOOKUP_CHUNK]
+        q = table.select().where(table.c.id.in_(chunk)).with_for_update()
+        found.extend(r._asdict() for r in db.execute(q))
+    return found
+
+
+def write_rows(db: Session, rows: list[dict]) -> set[str]:
+    """Upsert posts and keep the derived rollup tables in step, in the caller's transaction.
+
+    Author profiles follow after the commit (see after_commit). Returns the
+    ids of the posts that already existed.
+    """
+    if not rows:
+        return set()
+    with stage("ingest.upsert"):
+        inserted = insert_new_posts(db, rows)
+    existing = rows if inserted is None else [row for row in rows if row["id"] not in inserted]
+    with stage("ingest.lookup"):
+        removed = previous_rows(db, [row["id"] for row in existing])
+    with stage("ingest.upsert"):
+        upsert_posts(db, existing)
+    with stage("ingest.rollups"):
+        apply_trend_rollups(db, rows, removed)
+        apply_author_rollups(db, rows, removed)
+        apply_post_hashtags(db, rows, removed)
+        apply_post_keywords(db, rows, removed)
+        record_window_feed(db, rows)
+    return {row["id"] for row in removed}
+
+
+def after_commit(rows: list[dict], replaced: set[str] = frozenset()):
+    """Propagate committed posts to the in-process detection state, burst detectors, author profiles and the graph.
+
+    `replaced` holds the ids that were already stored; retries of those
+    are not new arrivals, so the burst detectors and profiles skip them.
+    """
+    posts = [SimpleNamespace(**row) for row in rows]
+    state = get_window_state()
+    with stage("ingest.window"):
+        for post in posts:
+            state.add(post)
+    new = [row for row in rows if row["id"] not in replaced]
+    with stage("ingest.bursts"):
+        onsets = get_burst_tracker().observe_posts(new)
+    with stage("profiles.enqueue"):
+        get_profile_writer().add(new)
+    with stage("graph.enqueue"):
+        get_graph_service().upsert_posts(posts)
+    bump_data_version()
+    # published whether or not anyone is listening, so late subscribers can replay them
+    bus = get_event_bus()
+    for post in posts:
+        bus.publish("post", post_event(post))
+    for event in onsets:
+        bus.publish("burst", event)
+
+
+class BatchWriter:
+    """Validates posts, then analyses, writes and commits them one chunk at a time.
+
+    Each flush() is its own transaction, so memory and lock time stay
+    bounded by the chunk rather than the whole stream. Items are numbered
+    in arrival order; a later item with the same id supersedes an earlier
+    one, in the same chunk or a later one.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.items: list[schemas.BatchItemStatus] = []
+        self._latest: dict[str, int] = {}  # post id -> index of the item that wins
+        self._pending: dict[str, schemas.PostIn] = {}
+        self._written: set[str] = set()
+
+    def add(self, raw):
+        index = len(self.items)
+        try:
+            payload = schemas.PostIn.model_validate(raw)
+        except ValidationError as e:
+            self.items.append(schemas.BatchItemStatus(
+                index=index,
+                id=raw.get("id") if isinstance(raw, dict) else None,
+                status="error",
+                detail=str(e.errors(include_url=False)),
+            ))
+            return
+        self.items.append(schemas.BatchItemStatus(index=index, id=payload.id, status="ok"))
+        previous = self._latest.get(payload.id)
+        if previous is not None:
+            self.items[previous].status = "duplicate"
+        self._latest[payload.id] = index
+        self._pending[payload.id] = payload
+
+    def add_error(self, detail: str):
+        self.items.append(schemas.BatchItemStatus(index=len(self.items), status="error", detail=detail))
+
+    def flush(self):
+        """Write and commit the pending posts, then hand them to the in-process state."""
+        if not self._pending:
+            return
+        payloads = list(self._pending.values())
+        self._pending.clear()
+        analyses = analyze_posts([p.text for p in payloads])
+        rows = [build_row(p, a) for p, a in zip(payloads, analyses)]
+        replaced = write_rows(self.db, rows)
+        with stage("ingest.commit"):
+            self.db.commit()
+        # ids written by an earlier chunk come back as replaced, so bursts count them once
+        after_commit(rows, replaced)
+        self._written.update(row["id"] for row in rows)
+
+    def commit(self) -> schemas.BatchResult:
+        self.flush()
+        errors = sum(1 for item in self.items if item.status == "error")
+        return schemas.BatchResult(
+            received=len(self.items),
+            written=len(self._written),
+            errors=errors,
+            items=self.items,
+        )
+
+
+def _distinct_runs(rows: list[dict]) -> list[list[dict]]:
+    """Split rows into consecutive runs without a repeated post id, so each run is one write_rows."""
+    runs, seen = [[]], set()
+    for row in rows:
+        if row["id"] in seen:
+            runs.append([])
+            seen.clear()
+        seen.add(row["id"])
+        runs[-1].append(row)
+    return runs
+
+
+class GroupWriter:
+    """Writes a group of single-post ingests in one transaction, for a MicroBatcher.
+
+    predict() returns, for each row, whether the post was already stored.
+    A repeated id later in the group is written after the earlier one, so
+    the last version wins as it would have with separate requests.
+    """
+
+    model_id = "ingest"
+
+    def predict(self, rows: list[dict]) -> list[bool]:
+        runs = _distinct_runs(rows)
+        db = SessionLocal()
+        try:
+            replaced = [write_rows(db, run) for run in runs]
+            with stage("ingest.commit"):
+                db.commit()
+        finally:
+            db.close()
+        for run, ids in zip(runs, replaced):
+            after_commit(run, ids)
+        return [row["id"] in ids for run, ids in zip(runs, replaced) for row in run]
+
+
+_post_writer: MicroBatcher | None = None
+_post_writer_lock = threading.Lock()
+
+
+def get_post_writer() -> MicroBatcher:
+    """Process-wide group-commit writer behind POST /api/posts/."""
+    global _post_writer
+    if _post_writer is None:
+        with _post_writer_lock:
+            if _post_writer is None:
+                _post_writer = MicroBatcher(
+                    GroupWriter(), max_batch_size=INGEST_GROUP_MAX, max_wait_ms=INGEST_GROUP_WAIT_MS, name="ingest",
+                )
+    return _post_writer
+
+
+def shutdown_post_writer():
+    """Write out queued posts and stop the writer thread."""
+    with _post_writer_lock:
+        if _post_writer is not None:
+            _post_writer.close()
@@ -0,0 +1,112 @@
+import math
+import os
+
+import numpy as np
+
+
+PAIR_CHUNK = 1 << 20
+# cosine similarity above which two posts count as near-duplicates
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.85"))
+
+
+def hamming_radius(threshold: float, dim: int) -> int:
+    """Largest sign-bit Hamming distance two vectors can have and still pass `threshold`.
+
+    Exact for sign-valued embeddings (every component +-c), where
+    cos = 1 - 2 * hamming / dim.
+    """
+    return max(0, math.ceil((1.0 - threshold) * dim / 2.0) - 1)
+
+
+def sign_valued(vectors: np.ndarray) -> bool:
+    """True when every component of each vector has the same magnitude, so hamming_radius is exact."""
+    mags = np.abs(vectors)
+    return bool(np.all(mags[:, :1] > 0) and np.allclose(mags, mags[:, :1]))
+
+
+class SimHashIndex:
+    """Banded SimHash index over embedding vectors for near-duplicate search.
+
+    Each vector is fingerprinted by the signs of its components, and the
+    fingerprint is split into `radius + 1` bands. By the pigeonhole principle
+    any two fingerprints within `radius` bits agree on at least one band, so
+    bucketing on band keys yields every near-duplicate pair as a candidate.
+    Candidates are then verified with an exact dot product.
+
+    With dense (non sign-valued) embeddings the band guarantee becomes
+    probabilistic and pairs can be missed; verification still keeps the
+    output free of false positives. Check `sign_valued` before relying on
+    the index for exact counts.
+    """
+
+    def __init__(self, vectors, threshold: float = 0.85):
+        self.vectors = np.asarray(vectors, dtype=np.float64)
+        self.threshold = threshold
+        n = len(self.vectors)
+        dim = self.vectors.shape[1] if n else 0
+        self.n_bands = max(1, min(dim, hamming_radius(threshold, dim) + 1))
+        bits = self.vectors > 0
+        self.keys = np.zeros((n, self.n_bands), dtype=np.int64)
+        for b, cols in enumerate(np.array_split(np.arange(dim), self.n_bands)):
+            weights = np.left_shift(np.int64(1), np.arange(len(cols), dtype=np.int64))
+            self.keys[:, b] = bits[:, cols] @ weights
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def candidate_pairs(self, times=None, window: float | None = None, groups=None):
+        """Yield (i, j) index arrays of candidate pairs, in chunks.
+
+        Pairs are restricted to the same `groups` label when given, and to
+        `abs(times[i] - times[j]) <= window` when `times` and `window` are
+        given. Each pair is emitted once, for the first band it collides on.
+        """
+        n = len(self)
+        if n < 2:
+            return
+        if times is None or window is None:
+            t = np.zeros(n)
+            window = 0.0
+        else:
+            t = np.asarray(times, dtype=np.float64)
+            t = t - t.min()
+        span = float(t.max()) + window + 1.0
+        g = np.zeros(n, dtype=np.int64) if groups is None else np.unique(groups, return_inverse=True)[1]
+
+        for b in range(self.n_bands):
+            # Sort by (group, band key, time) and flatten each bucket onto one
+            # numeric axis so a single searchsorted finds every window end.
+            _, bucket = np.unique(np.stack([g, self.keys[:, b]], axis=1), axis=0, return_inverse=True)
+            bucket = bucket.ravel()
+            order = np.lexsort((t, bucket))
+            pos = bucket[order] * span + t[order]
+            hi = np.searchsorted(pos, pos + window, side="right")
+            counts = hi - np.arange(n) - 1
+            start = 0
+            while start < n:
+                csum = np.cumsum(counts[start:])
+                stop = start + max(1, int(np.searchsorted(csum, PAIR_CHUNK, side="right")))
+                c = counts[start:stop]
+                total = int(c.sum())
+                if total:
+                    left = np.repeat(np.arange(start, stop), c)
+                    offsets = np.arange(total) - np.repeat(np.cumsum(c) - c, c)
+                    i, j = order[left], order[left + 1 + offsets]
+                    if b:
+                        # skip pairs already emitted by an earlier band
+                        first = np.all(self.keys[i, :b] != self.keys[j, :b], axis=1)
+                        i, j = i[first], j[first]
+                    if len(i):
+                        yield i, j
+                start = stop
+
+    def similar_pairs(self, times=None, window: float | None = None, groups=None):
+        """Yield (i, j) index arrays of verified pairs with similarity above the threshold."""
+        for i, j in self.candidate_pairs(times, window, groups):
+            sims = np.einsum("ij,ij->i", self.vectors[i], self.vectors[j])
+            keep = sims > self.threshold
+            if np.any(keep):
+                yield i[keep], j[keep]
+
+    def count_similar_pairs(self, times=None, window: float | None = None, groups=None) -> int:
+        return sum(len(i) for i, _ in self.similar_pairs(times, window, groups))
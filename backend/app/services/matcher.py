@@ -0,0 +1,209 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..db import insert_ignore
+
+
+logger = logging.getLogger(__name__)
+
+MATCHER_REFRESH_SECONDS = float(os.getenv("MATCHER_REFRESH_SECONDS", "60"))
+
+STANCE_MARKERS = {
+    # Anti-India markers
+    "anti": [
+        "break india", "anti-india", "boycott india", "hate india", "destroy india",
+        "india bad", "corrupt india", "fake india", "fascist india", "terrorist india",
+        "against india", "down with india", "stop india", "end india", "ban india",
+        "india enemy", "india threat", "india problem", "india danger", "india evil"
+    ],
+    # Pro-India markers
+    "pro": [
+        "jai hind", "pro-india", "love india", "support india", "incredible india",
+        "proud india", "great india", "strong india", "rising india", "shining india",
+        "india great", "vande mataram", "bharat mata", "india rocks", "go india",
+        "india forever", "india zindabad", "unity in diversity", "digital india"
+    ],
+    # Neutral/discussion markers
+    "neutral": [
+        "discuss india", "debate about india", "india analysis", "india review",
+        "india opinion", "india perspective", "india situation", "india policy"
+    ],
+}
+
+
+class Automaton:
+    """Aho-Corasick automaton over lowercase patterns.
+
+    `search` walks the text once and returns the ids of every pattern that
+    occurs in it, so the cost depends on the text length, not on how many
+    patterns were compiled.
+    """
+
+    def __init__(self, patterns: list[str]):
+        self.patterns = patterns
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.out: list[tuple[int, ...]] = [()]
+        for pid, pattern in enumerate(patterns):
+            state = 0
+            for ch in pattern:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(())
+                state = nxt
+            self.out[state] += (pid,)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] += self.out[self.fail[nxt]]
+
+    def search(self, text: str) -> set[int]:
+        goto, fail, out = self.goto, self.fail, self.out
+        found = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+class KeywordMatcher:
+    """Stance markers and watchlist keywords compiled into one automaton."""
+
+    def __init__(self, keywords: list[str], version: int = 0, signature=None):
+        self.version = version
+        self.signature = signature
+        self.keywords = list(keywords)
+        self.built_at = time.monotonic()
+        labels: dict[str, list[tuple[str, str]]] = {}
+        for stance, markers in STANCE_MARKERS.items():
+            for marker in markers:
+                labels.setdefault(marker, []).append(("stance", stance))
+        for term in keywords:
+            labels.setdefault(term.lower(), []).append(("keyword", term))
+        patterns = [p for p in labels if p]
+        self.labels = [labels[p] for p in patterns]
+        self.automaton = Automaton(patterns)
+
+    def match(self, text: str) -> tuple[str, list[str]]:
+        """Stance label and matched watchlist terms for one text."""
+        counts = {"anti": 0, "pro": 0, "neutral": 0}
+        keywords = []
+        for pid in self.automaton.search(text.lower()):
+            for kind, value in self.labels[pid]:
+                if kind == "stance":
+                    counts[value] += 1
+                else:
+                    keywords.append(value)
+        anti_score, pro_score, neutral_score = counts["anti"], counts["pro"], counts["neutral"]
+        if anti_score > pro_score and anti_score > neutral_score:
+            stance = "anti"
+        elif pro_score > anti_score and pro_score > neutral_score:
+            stance = "pro"
+        else:
+            stance = "neutral"
+        return stance, sorted(keywords)
+
+
+_matcher: KeywordMatcher | None = None
+_version = 0
+_lock = threading.Lock()
+
+
+def invalidate_matcher():
+    """Mark the compiled matcher stale; called when keywords change."""
+    global _version
+    with _lock:
+        _version += 1
+
+
+def bump_keyword_version(db: Session):
+    """Record a keyword change in the caller's transaction."""
+    table = models.KeywordVersion.__table__
+    db.execute(insert_ignore(db, table), {"id": 1, "version": 0})
+    db.execute(table.update().where(table.c.id == 1).values(version=table.c.version + 1))
+
+
+def _keyword_signature(db: Session):
+    # the version catches a delete followed by an add, which count and max id can miss
+    count, max_id = db.query(func.count(models.Keyword.id), func.max(models.Keyword.id)).one()
+    version = db.query(models.KeywordVersion.version).filter(models.KeywordVersion.id == 1).scalar()
+    return count, max_id, version or 0
+
+
+def _load(current: KeywordMatcher | None, version: int) -> KeywordMatcher:
+    from ..db import SessionLocal
+
+    db = SessionLocal()
+    try:
+        signature = tuple(_keyword_signature(db))
+        if current is not None and current.version == version and current.signature == signature:
+            current.built_at = time.monotonic()
+            return current
+        terms = [t for (t,) in db.query(models.Keyword.term)]
+        return KeywordMatcher(terms, version, signature)
+    finally:
+        db.close()
+
+
+def get_matcher() -> KeywordMatcher:
+    """The compiled matcher, rebuilt after keyword changes.
+
+    Changes made in this process bump the version counter; changes made by
+    other workers are picked up by a cheap signature check every
+    MATCHER_REFRESH_SECONDS.
+    """
+    global _matcher
+    matcher = _matcher
+    if (
+        matcher is not None
+        and matcher.version == _version
+        and time.monotonic() - matcher.built_at < MATCHER_REFRESH_SECONDS
+    ):
+        return matcher
+    with _lock:
+        version = _version
+        try:
+            _matcher = _load(_matcher, version)
+        except Exception:
+            # Keyword table unavailable (e.g. before create_all); markers only
+            logger.warning("could not load keywords for the matcher", exc_info=True)
+            if _matcher is None or _matcher.version != version:
+                _matcher = KeywordMatcher([], version)
+            _matcher.built_at = time.monotonic()
+        return _matcher
+
+
+def apply_post_keywords(db: Session, added: list[dict], removed: list[dict] = ()):
+    """Record which watchlist terms matched each post, replacing any rows the incoming ids already have."""
+    table = models.PostKeyword.__table__
+    stale = [row["id"] for row in added]
+    for start in range(0, len(stale), 500):
+        db.execute(table.delete().where(table.c.post_id.in_(stale[start:start + 500])))
+    rows = [
+        {"post_id": post["id"], "term": term, "created_at": post["created_at"]}
+        for post in added
+        for term in dict.fromkeys(post.get("keywords") or [])
+    ]
+    if rows:
+        db.execute(insert_ignore(db, table), rows)
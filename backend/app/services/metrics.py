@@ -0,0 +1,178 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = list(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labelnames, labels)} {_number(v)}" for labels, v in values]
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket histogram per label set, rendered as cumulative Prometheus buckets."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labels -> [count per bucket..., count above the last bucket, sum]
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: tuple = ()):
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[slot] += 1
+            series[-1] += value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            series = [(labels, list(values)) for labels, values in self._series.items()]
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        for labels, values in series:
+            total = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values):
+                total += count
+                lines.append(f"{self.name}_bucket{_labels(names, labels + (_number(bound),))} {total}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(values[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {total}")
+        return lines
+
+
+def gauge_family(name: str, help: str, samples, labelnames: tuple = (), kind: str = "gauge") -> list[str]:
+    """Text lines for values computed at scrape time; samples are (label values, value) pairs."""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    lines += [f"{name}{_labels(labelnames, labels)} {_number(value)}" for labels, value in samples]
+    return lines
+
+
+REQUEST_SECONDS = Histogram("aic_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route"))
+REQUESTS_TOTAL = Counter("aic_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+STAGE_SECONDS = Histogram("aic_stage_duration_seconds", "Time spent in named pipeline stages.", ("stage",))
+
+_registry = [REQUEST_SECONDS, REQUESTS_TOTAL, STAGE_SECONDS]
+
+
+class _Stage:
+    __slots__ = ("labels", "start")
+
+    def __init__(self, name: str):
+        self.labels = (name,)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        STAGE_SECONDS.observe(time.perf_counter() - self.start, self.labels)
+        return False
+
+
+_off = nullcontext()
+
+
+def stage(name: str):
+    """Time a block into aic_stage_duration_seconds{stage=name}; a shared no-op when metrics are off."""
+    if not METRICS_ENABLED:
+        return _off
+    return _Stage(name)
+
+
+def render(extra: list[str] = ()) -> str:
+    lines = []
+    for metric in _registry:
+        lines += metric.render()
+    lines += extra
+    return "\n".join(lines) + "\n"
+
+
+def route_label(path: str, template: str) -> str:
+    """Full route template for a request path.
+
+    Routes from included routers may report their template without the
+    mount prefix, so the prefix is taken from the leading segments of the
+    concrete path.
+    """
+    parts = path.split("/")
+    tail = template.lstrip("/").split("/")
+    return "/".join(parts[:max(1, len(parts) - len(tail))] + tail)
+
+
+class MetricsMiddleware:
+    """Records latency and status per matched route template.
+
+    Labels use the route pattern (e.g. /api/alerts/campaign/{campaign_id})
+    so cardinality stays bounded. Responses produced before routing, such
+    as cache hits, are labelled by path only when it is one of `known_paths`.
+    """
+
+    def __init__(self, app, known_paths=()):
+        self.app = app
+        self.known_paths = set(known_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            template = getattr(scope.get("route"), "path", None)
+            if template is not None:
+                route = route_label(scope["path"], template)
+            else:
+                route = scope["path"] if scope["path"] in self.known_paths else "unmatched"
+            REQUEST_SECONDS.observe(time.perf_counter() - start, (scope["method"], route))
+            REQUESTS_TOTAL.inc((scope["method"], route, str(status)))
@@ -1,7 +1,21 @@
 import os
+from concurrent.futures import ProcessPoolExecutor
 from functools import lru_cache
 import hashlib
 import math
+import multiprocessing
+import re
+import threading
+
+import numpy as np
+
+from .matcher import KeywordMatcher, get_matcher
+from .embedding_cache import EmbeddingCache, build_cache, normalize_text, text_digest
+from .inference import DummyModel, InferenceModel, MicroBatcher
+from .metrics import stage
+
+
+DEVANAGARI = re.compile("[\u0900-\u097F]")
 
 
 @lru_cache(maxsize=1)
@@ -10,81 +24,267 @@ def get_toxicity_dummy():
     return True
 
 
-def classify_toxicity(text: str) -> float:
+def _toxicity_score(text: str) -> float:
     # Simple heuristic placeholder; replace with real transformer in models/
-    h = abs(hash(text)) % 100
+    # (stable digest so every process, including pool workers, agrees)
+    h = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little") % 100
     return float(h) / 100.0
 
 
+def classify_toxicity(text: str) -> float:
+    if INFERENCE_BATCHING:
+        return get_batcher("toxicity").predict(text)
+    return _toxicity_score(text)
+
+
 def classify_stance(text: str) -> str:
-    # Enhanced stance classifier with more keywords
-    lower = text.lower()
-    
-    # Anti-India markers
-    anti_markers = [
-        "break india", "anti-india", "boycott india", "hate india", "destroy india",
-        "india bad", "corrupt india", "fake india", "fascist india", "terrorist india",
-        "against india", "down with india", "stop india", "end india", "ban india",
-        "india enemy", "india threat", "india problem", "india danger", "india evil"
-    ]
-    
-    # Pro-India markers  
-    pro_markers = [
-        "jai hind", "pro-india", "love india", "support india", "incredible india",
-        "proud india", "great india", "strong india", "rising india", "shining india",
-        "india great", "vande mataram", "bharat mata", "india rocks", "go india",
-        "india forever", "india zindabad", "unity in diversity", "digital india"
-    ]
-    
-    # Neutral/discussion markers
-    neutral_markers = [
-        "discuss india", "debate about india", "india analysis", "india review",
-        "india opinion", "india perspective", "india situation", "india policy"
-    ]
-    
-    anti_score = sum(1 for marker in anti_markers if marker in lower)
-    pro_score = sum(1 for marker in pro_markers if marker in lower)
-    neutral_score = sum(1 for marker in neutral_markers if marker in lower)
-    
-    if anti_score > pro_score and anti_score > neutral_score:
-        return "anti"
-    elif pro_score > anti_score and pro_score > neutral_score:
-        return "pro"
-    else:
-        return "neutral"
+    # Stance markers are matched by the compiled keyword automaton
+    return get_matcher().match(text)[0]
 
 
 def detect_language(text: str) -> str:
     # Simple heuristic language detection
-    hindi_chars = sum(1 for c in text if '\u0900' <= c <= '\u097F')
-    total_chars = len([c for c in text if c.isalpha()])
+    hindi_chars = len(DEVANAGARI.findall(text))
+    total_chars = sum(map(str.isalpha, text))
     if total_chars > 0 and hindi_chars / total_chars > 0.3:
         return "hi"
     return "en"
 
 
-def analyze_post(text: str):
+def _analyze(text: str, matcher: KeywordMatcher, toxicity: float | None = None):
     lang = detect_language(text)
-    toxicity = classify_toxicity(text)
-    stance = classify_stance(text)
-    return lang, toxicity, stance
+    if toxicity is None:
+        toxicity = classify_toxicity(text)
+    # one scan yields both the stance and the matched watchlist keywords
+    stance, keywords = matcher.match(text)
+    return lang, toxicity, stance, keywords
+
+
+def analyze_post(text: str):
+    with stage("nlp.analyze_post"):
+        return _analyze(text, get_matcher())
+
+
+NLP_WORKERS = os.getenv("NLP_WORKERS", "0")
+PARALLEL_MIN_TEXTS = int(os.getenv("NLP_PARALLEL_MIN_TEXTS", "2000"))
+MIN_CHUNK, MAX_CHUNK = 256, 8192
+
+_pool: ProcessPoolExecutor | None = None
+_worker_matcher: KeywordMatcher | None = None
+
+
+def nlp_workers() -> int:
+    if NLP_WORKERS == "auto":
+        return os.cpu_count() or 1
+    return int(NLP_WORKERS)
+
+
+def get_nlp_pool() -> ProcessPoolExecutor | None:
+    """Lazily started process pool for batch analysis, or None when disabled."""
+    global _pool
+    workers = nlp_workers()
+    if workers <= 1:
+        return None
+    if _pool is None:
+        # spawn: workers must not inherit the parent's DB pool or threads
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown_nlp_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _analyze_chunk(texts: list[str], keywords: list[str], version, toxicities=None):
+    # Runs in a pool worker; the matcher is rebuilt only when the keyword set changes
+    global _worker_matcher
+    if _worker_matcher is None or _worker_matcher.version != version:
+        _worker_matcher = KeywordMatcher(keywords, version)
+    toxicities = toxicities or [None] * len(texts)
+    return [_analyze(text, _worker_matcher, tox) for text, tox in zip(texts, toxicities)]
+
+
+def analyze_posts(texts: list[str]) -> list[tuple]:
+    """Batch form of analyze_post; results are identical, item for item.
+
+    Small batches run inline. Larger ones are split into chunks sized so
+    each worker gets a few of them (bounded to keep pickling overhead and
+    stragglers in check) and fanned out to the process pool.
+    """
+    with stage("nlp.analyze_posts"):
+        return _analyze_posts(texts)
+
+
+def _analyze_posts(texts: list[str]) -> list[tuple]:
+    matcher = get_matcher()
+    # the model stays in this process behind its batcher; only the cheap heuristics fan out
+    toxicities = get_batcher("toxicity").predict_many(texts) if INFERENCE_BATCHING else [None] * len(texts)
+    pool = get_nlp_pool()
+    if pool is None or len(texts) < PARALLEL_MIN_TEXTS:
+        return [_analyze(text, matcher, tox) for text, tox in zip(texts, toxicities)]
+    workers = nlp_workers()
+    size = min(MAX_CHUNK, max(MIN_CHUNK, math.ceil(len(texts) / (workers * 4))))
+    starts = range(0, len(texts), size)
+    chunks = [texts[i:i + size] for i in starts]
+    tox_chunks = [toxicities[i:i + size] if INFERENCE_BATCHING else None for i in starts]
+    version = (matcher.version, matcher.signature)
+    results = []
+    for part in pool.map(_analyze_chunk, chunks, [matcher.keywords] * len(chunks), [version] * len(chunks), tox_chunks):
+        results.extend(part)
+    return results
+
+
+INFERENCE_BATCHING = os.getenv("INFERENCE_BATCHING", "0") == "1"
+
+_batchers: dict[str, MicroBatcher] = {}
+_batchers_lock = threading.Lock()
+
 
+def _default_model(name: str) -> InferenceModel:
+    if name == "toxicity":
+        return DummyModel(_toxicity_score)
+    if name == "embedding":
+        return DEFAULT_EMBEDDING
+    raise KeyError(name)
 
-def embed_texts(texts: list[str]) -> list[list[float]]:
-    """Placeholder embedding using simple text hashing"""
+
+def get_batcher(name: str) -> MicroBatcher:
+    """Process-wide micro-batcher for a model ("toxicity" or "embedding")."""
+    batcher = _batchers.get(name)
+    if batcher is None:
+        with _batchers_lock:
+            batcher = _batchers.get(name)
+            if batcher is None:
+                batcher = _batchers[name] = MicroBatcher(_default_model(name), name=name)
+    return batcher
+
+
+def set_model(name: str, model: InferenceModel):
+    """Plug a real model in behind a batcher, e.g. at startup.
+
+    Embedding models may set `model_id` and `dim`; otherwise the class name
+    identifies the model and one probe call measures its dimension.
+    """
+    get_batcher(name).model = model
+
+
+def inference_stats() -> dict:
+    return {name: batcher.stats() for name, batcher in list(_batchers.items())}
+
+
+def shutdown_batchers():
+    with _batchers_lock:
+        for batcher in _batchers.values():
+            batcher.close()
+        _batchers.clear()
+
+
+EMBED_DIM = 64
+_BIT_SHIFTS = np.arange(EMBED_DIM, dtype=np.uint64)
+
+
+def _embed_text(text: str) -> np.ndarray:
+    # Simple hash-based embedding for demo; a stable digest keeps vectors
+    # identical across processes so they can be cached on disk
+    h = int.from_bytes(hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=8).digest(), "little")
+    vec = ((np.uint64(h) >> _BIT_SHIFTS) & np.uint64(1)).astype(np.float32) * 2 - 1
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm > 0 else vec
+
+
+DEFAULT_EMBEDDING = DummyModel(_embed_text, model_id="hash-v1", dim=EMBED_DIM)
+
+_embedding_caches: dict[tuple[str, int], EmbeddingCache] = {}
+_probed_dims: dict[str, int] = {}
+_embedding_lock = threading.Lock()
+
+
+def embedding_model() -> InferenceModel:
+    """The model embeddings currently come from."""
+    return get_batcher("embedding").model if INFERENCE_BATCHING else DEFAULT_EMBEDDING
+
+
+def embedding_space(model: InferenceModel | None = None) -> tuple[str, int]:
+    """(model id, dimension) of a model's vectors; vectors from different spaces never share a cache."""
+    model = model or embedding_model()
+    model_id = getattr(model, "model_id", None) or f"{type(model).__module__}.{type(model).__qualname__}"
+    dim = getattr(model, "dim", None)
+    if dim is None:
+        dim = _probed_dims.get(model_id)
+        if dim is None:
+            dim = _probed_dims[model_id] = len(np.asarray(model.predict([""])[0]).reshape(-1))
+    return model_id, int(dim)
+
+
+def get_embedding_cache(space: tuple[str, int] | None = None) -> EmbeddingCache:
+    space = space or embedding_space()
+    cache = _embedding_caches.get(space)
+    if cache is None:
+        with _embedding_lock:
+            cache = _embedding_caches.get(space)
+            if cache is None:
+                model_id, dim = space
+                cache = _embedding_caches[space] = build_cache(dim, namespace=f"{model_id}-{dim}")
+    return cache
+
+
+def clear_embedding_caches():
+    with _embedding_lock:
+        _embedding_caches.clear()
+
+
+def embed_texts(texts: list[str]) -> np.ndarray:
+    """Embeddings of `texts` from the current embedding model, served through its cache."""
     if not texts:
-        return []
-    
-    embeddings = []
-    for text in texts:
-        # Simple hash-based embedding for demo
-        h = abs(hash(text.lower()))
-        vec = [float((h >> i) & 1) * 2 - 1 for i in range(64)]
-        norm = math.sqrt(sum(x*x for x in vec))
-        if norm > 0:
-            vec = [x/norm for x in vec]
-        embeddings.append(vec)
-    
+        return np.zeros((0, embedding_space()[1]), dtype=np.float32)
+    with stage("nlp.embed"):
+        return _embed_cached(texts)
+
+
+def _embed_cached(texts: list[str]) -> np.ndarray:
+    model = embedding_model()
+    space = embedding_space(model)
+    dim = space[1]
+    cache = get_embedding_cache(space)
+    embeddings = np.empty((len(texts), dim), dtype=np.float32)
+    missing: dict[bytes, list[int]] = {}
+    for i, text in enumerate(texts):
+        key = text_digest(text)
+        vec = cache.get(key)
+        if vec is None:
+            missing.setdefault(key, []).append(i)
+        else:
+            embeddings[i] = vec
+
+    if missing:
+        # one model call per distinct uncached text
+        keys = list(missing)
+        batch = [texts[missing[key][0]] for key in keys]
+        if INFERENCE_BATCHING:
+            vecs = get_batcher("embedding").predict_many(batch)
+        else:
+            vecs = model.predict(batch)
+        for key, vec in zip(keys, vecs):
+            vec = np.asarray(vec, dtype=np.float32).reshape(-1)
+            if len(vec) != dim:
+                raise ValueError(f"embedding model {space[0]} returned {len(vec)} dimensions, expected {dim}")
+            cache.put(key, vec)
+            embeddings[missing[key]] = vec
+
     return embeddings
 
 
+def embedding_cache_stats() -> dict:
+    model_id, dim = embedding_space()
+    return {"model": model_id, "dim": dim, **get_embedding_cache((model_id, dim)).stats()}
+
+
+def flush_embedding_cache():
+    """Write the disk tiers' dirty pages back, for every cache built so far."""
+    with _embedding_lock:
+        caches = list(_embedding_caches.values())
+    for cache in caches:
+        cache.flush()
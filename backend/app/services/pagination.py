@@ -0,0 +1,26 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(created_at: datetime, post_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), post_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, post_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(post_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def before_cursor(created_col, id_col, cursor: str):
+    """Filter for rows strictly after `cursor` in (created_at desc, id desc) order."""
+    created_at, post_id = decode_cursor(cursor)
+    return or_(created_col < created_at, and_(created_col == created_at, id_col < post_id))
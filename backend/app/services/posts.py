@@ -0,0 +1,95 @@
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+from .hashtags import normalize_tag
+from .pagination import before_cursor, encode_cursor
+
+
+POST_FIELDS = list(schemas.PostOut.model_fields)
+# always returned: the page cursor is built from them
+KEY_FIELDS = ("id", "created_at")
+
+
+def parse_fields(fields: str | None) -> list[str]:
+    if not fields:
+        return POST_FIELDS
+    wanted = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = wanted - set(POST_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return [f for f in POST_FIELDS if f in wanted or f in KEY_FIELDS]
+
+
+def list_posts(
+    db: Session,
+    platform: str | None = None,
+    stance: str | None = None,
+    language: str | None = None,
+    min_toxicity: float | None = None,
+    max_toxicity: float | None = None,
+    author: str | None = None,
+    hashtag: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    fields: list[str] = POST_FIELDS,
+    limit: int = 200,
+    cursor: str | None = None,
+) -> tuple[list[dict], str | None]:
+    """A page of posts, newest first, with only `fields` loaded, and the cursor for the next page.
+
+    Equality filters each have a (column, created_at) index, so a page costs
+    an index range scan of about `limit` rows. With a hashtag the scan runs
+    on post_hashtags (tag, created_at, post_id) instead.
+    """
+    post = models.Post
+    columns = [post.__table__.c[f] for f in fields if f != "keywords"]
+    q = select(*columns)
+    if hashtag:
+        ph = models.PostHashtag
+        q = q.join(ph, ph.post_id == post.id).where(ph.tag == normalize_tag(hashtag))
+        created_col, id_col = ph.created_at, ph.post_id
+    else:
+        created_col, id_col = post.created_at, post.id
+    if platform:
+        q = q.where(post.platform == platform)
+    if stance:
+        q = q.where(post.stance == stance)
+    if language:
+        q = q.where(post.language == language)
+    if author:
+        q = q.where(post.author_handle == author)
+    if min_toxicity is not None:
+        q = q.where(post.toxicity >= min_toxicity)
+    if max_toxicity is not None:
+        q = q.where(post.toxicity <= max_toxicity)
+    if since:
+        q = q.where(created_col >= since)
+    if until:
+        q = q.where(created_col < until)
+    if cursor:
+        q = q.where(before_cursor(created_col, id_col, cursor))
+    q = q.order_by(created_col.desc(), id_col.desc()).limit(limit + 1)
+
+    rows = [dict(r) for r in db.execute(q).mappings()]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    if "keywords" in fields:
+        _attach_keywords(db, rows)
+    return rows, next_cursor
+
+
+def _attach_keywords(db: Session, rows: list[dict]):
+    by_id = {row["id"]: row for row in rows}
+    for row in rows:
+        row["keywords"] = []
+    if not by_id:
+        return
+    pk = models.PostKeyword
+    for post_id, term in db.execute(select(pk.post_id, pk.term).where(pk.post_id.in_(list(by_id))).order_by(pk.term)):
+        by_id[post_id]["keywords"].append(term)
@@ -0,0 +1,437 @@
+import logging
+import math
+import os
+import queue
+import threading
+import time
+from functools import lru_cache
+
+import numpy as np
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..db import SessionLocal, dialect_insert
+from .lsh import NEAR_DUP_THRESHOLD, hamming_radius
+from .metrics import stage
+from .nlp import embed_texts
+
+
+logger = logging.getLogger(__name__)
+
+# a post is a near-duplicate when it matches one of the author's last few posts
+RECENT_FINGERPRINTS = 8
+LOOKUP_CHUNK = 500
+# a post's weight in the statistics halves every half-life; 0 keeps every post at full weight
+PROFILE_HALF_LIFE_HOURS = float(os.getenv("PROFILE_HALF_LIFE_HOURS", "168"))
+HALF_LIFE_SECONDS = PROFILE_HALF_LIFE_HOURS * 3600.0
+
+PROFILE_COLUMNS = [c.name for c in models.AuthorProfile.__table__.columns]
+SCORE_COLUMNS = (
+    "post_count", "first_seen", "last_seen", "post_weight", "compared_weight",
+    "gap_count", "gap_weight", "gap_mean", "gap_m2", "similarity_sum", "near_dup_weight",
+)
+DECAYED = ("post_weight", "compared_weight", "gap_weight", "gap_m2", "similarity_sum", "near_dup_weight")
+
+
+def fingerprint(vec: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(vec > 0).tobytes(), "big")
+
+
+@lru_cache(maxsize=8)
+def near_dup_radius(dim: int) -> int:
+    return hamming_radius(NEAR_DUP_THRESHOLD, dim)
+
+
+def decay(seconds: float) -> float:
+    """Weight left after `seconds`."""
+    if HALF_LIFE_SECONDS <= 0:
+        return 1.0
+    return 0.5 ** (seconds / HALF_LIFE_SECONDS)
+
+
+def exposure_seconds(span: float) -> float:
+    """Decayed length of a history `span` seconds long: the weight one post per second would reach."""
+    if HALF_LIFE_SECONDS <= 0:
+        return span
+    return HALF_LIFE_SECONDS / math.log(2) * (1.0 - decay(span))
+
+
+def new_profile(author_id: str) -> dict:
+    return {
+        "author_id": author_id,
+        "author_handle": None,
+        "post_count": 0,
+        "first_seen": None,
+        "last_seen": None,
+        "post_weight": 0.0,
+        "compared_weight": 0.0,
+        "gap_count": 0,
+        "gap_weight": 0.0,
+        "gap_mean": 0.0,
+        "gap_m2": 0.0,
+        "centroid": None,
+        "similarity_sum": 0.0,
+        "near_dup_count": 0,
+        "near_dup_weight": 0.0,
+        "recent_fingerprints": [],
+        "active_hours": [0.0] * 24,
+    }
+
+
+def fold(profile: dict, row: dict, vec: np.ndarray):
+    """Add one post to a profile row in O(1): posting gaps, centroid, near-duplicates and active hours.
+
+    Decayed statistics are kept as of last_seen: a newer post first ages
+    them by its distance from last_seen and then adds itself at weight 1,
+    an older one adds itself at its own age. While folding, the centroid
+    is held as a float64 array; it is stored as its raw bytes.
+    """
+    ts = row["created_at"]
+    last = profile["last_seen"]
+    weight = 1.0
+    if last is not None and ts > last:
+        gap = (ts - last).total_seconds()
+        d = decay(gap)
+        for name in DECAYED:
+            profile[name] *= d
+        profile["active_hours"] = [h * d for h in profile["active_hours"]]
+        # weighted Welford: the mean is unchanged by decay, only its weight shrinks
+        profile["gap_count"] += 1
+        profile["gap_weight"] += 1.0
+        delta = gap - profile["gap_mean"]
+        profile["gap_mean"] += delta / profile["gap_weight"]
+        profile["gap_m2"] += delta * (gap - profile["gap_mean"])
+    elif last is not None:
+        weight = decay((last - ts).total_seconds())
+    profile["first_seen"] = ts if profile["first_seen"] is None else min(profile["first_seen"], ts)
+    profile["last_seen"] = ts if last is None else max(last, ts)
+    profile["post_weight"] += weight
+
+    centroid = profile["centroid"]
+    if centroid is None or len(centroid) != len(vec):
+        # first post, or the embedding model changed: earlier vectors are not comparable
+        profile["centroid"] = vec.astype(np.float64)
+        profile["recent_fingerprints"].clear()
+    else:
+        norm = np.linalg.norm(centroid)
+        if norm > 0:
+            profile["similarity_sum"] += weight * float(vec @ centroid) / norm
+        profile["compared_weight"] += weight
+        centroid += (vec - centroid) * (weight / profile["post_weight"])
+
+    fp = fingerprint(vec)
+    recent = profile["recent_fingerprints"]
+    radius = near_dup_radius(len(vec))
+    if any((fp ^ other).bit_count() <= radius for other in recent):
+        profile["near_dup_count"] += 1
+        profile["near_dup_weight"] += weight
+    recent.append(fp)
+    del recent[:-RECENT_FINGERPRINTS]
+
+    profile["active_hours"][ts.hour] += weight
+    profile["post_count"] += 1
+    profile["author_handle"] = row.get("author_handle") or profile["author_handle"]
+
+
+def _claim(db: Session, ids: list[str]):
+    """Insert empty profiles for new authors so _load can lock every row.
+
+    FOR UPDATE cannot lock a row that does not exist yet; with the bare row
+    in place, two concurrent first ingests of one author fold in turn
+    instead of both starting from an empty profile.
+    """
+    insert = dialect_insert(db)
+    if insert is None:
+        return
+    table = models.AuthorProfile.__table__
+    for start in range(0, len(ids), LOOKUP_CHUNK):
+        rows = [new_profile(author_id) for author_id in ids[start:start + LOOKUP_CHUNK]]
+        db.execute(insert(table).on_conflict_do_nothing(index_elements=["author_id"]), rows)
+
+
+def _load(db: Session, ids: list[str]) -> dict[str, dict]:
+    table = models.AuthorProfile.__table__
+    profiles = {}
+    for start in range(0, len(ids), LOOKUP_CHUNK):
+        q = table.select().where(table.c.author_id.in_(ids[start:start + LOOKUP_CHUNK])).with_for_update()
+        for r in db.execute(q):
+            profile = r._asdict()
+            if profile["centroid"] is not None:
+                profile["centroid"] = np.frombuffer(profile["centroid"], dtype=np.float64).copy()
+            # fresh lists: fold mutates them in place
+            profile["recent_fingerprints"] = list(profile["recent_fingerprints"] or [])
+            profile["active_hours"] = list(profile["active_hours"] or [0.0] * 24)
+            profiles[profile["author_id"]] = profile
+    return profiles
+
+
+def _store(db: Session, profiles: list[dict]):
+    rows = [
+        {**p, "centroid": p["centroid"].tobytes() if p["centroid"] is not None else None}
+        for p in profiles
+    ]
+    insert = dialect_insert(db)
+    if insert is None:
+        for row in rows:
+            db.merge(models.AuthorProfile(**row))
+        return
+    stmt = insert(models.AuthorProfile.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["author_id"],
+        set_={name: stmt.excluded[name] for name in PROFILE_COLUMNS if name != "author_id"},
+    )
+    db.execute(stmt, rows)
+
+
+def apply_author_profiles(db: Session, added: list[dict], removed: list[dict] = ()):
+    """Fold newly ingested posts into their authors' profiles, in the caller's transaction.
+
+    `added` rows need id, author_id, author_handle, text and created_at.
+    Each touched profile is read once and written back with one upsert for
+    the whole batch. Re-ingested posts (those in `removed`) were already
+    counted and are skipped.
+    """
+    counted = {row["id"] for row in removed}
+    rows = sorted((r for r in added if r["id"] not in counted and r.get("author_id")), key=lambda r: r["created_at"])
+    if not rows:
+        return
+    vectors = embed_texts([r["text"] or "" for r in rows]).astype(np.float64)
+    ids = list({r["author_id"] for r in rows})
+    _claim(db, ids)
+    profiles = _load(db, ids)
+    for row, vec in zip(rows, vectors):
+        profile = profiles.get(row["author_id"])
+        if profile is None:
+            profile = profiles[row["author_id"]] = new_profile(row["author_id"])
+        fold(profile, row, vec)
+    _store(db, list(profiles.values()))
+
+
+def score_components(profile) -> dict:
+    """Bot signals from the decayed running statistics; `profile` only needs SCORE_COLUMNS."""
+    compared = profile.compared_weight or 0.0
+    if (profile.post_count or 0) < 2 or compared <= 0:
+        return {"posts_per_hour": 0.0, "near_duplicate_ratio": 0.0, "regularity": 0.0, "similarity": 0.0}
+    span = (profile.last_seen - profile.first_seen).total_seconds()
+    regularity = 0.0
+    if profile.gap_count >= 2 and profile.gap_weight > 0 and profile.gap_mean > 0:
+        # evenly spaced posts (low coefficient of variation) look scheduled
+        cv = math.sqrt(max(0.0, profile.gap_m2) / profile.gap_weight) / profile.gap_mean
+        regularity = max(0.0, 1.0 - cv)
+    return {
+        "posts_per_hour": profile.post_weight / max(1.0, exposure_seconds(span) / 3600.0),
+        "near_duplicate_ratio": profile.near_dup_weight / compared,
+        "regularity": regularity,
+        "similarity": max(0.0, profile.similarity_sum / compared),
+    }
+
+
+def bot_score(profile) -> float:
+    c = score_components(profile)
+    score = 20.0 * c["posts_per_hour"] + 50.0 * c["near_duplicate_ratio"] + 15.0 * c["regularity"] + 15.0 * c["similarity"]
+    return float(min(100.0, score))
+
+
+def author_bot_scores(db: Session, author_ids) -> dict[str, float]:
+    """Bot score per author id; authors without a profile are left out."""
+    ids = list(author_ids)
+    ap = models.AuthorProfile
+    columns = [ap.author_id] + [ap.__table__.c[name] for name in SCORE_COLUMNS]
+    scores = {}
+    for start in range(0, len(ids), LOOKUP_CHUNK):
+        for row in db.execute(select(*columns).where(ap.author_id.in_(ids[start:start + LOOKUP_CHUNK]))):
+            scores[row.author_id] = bot_score(row)
+    return scores
+
+
+def get_profile(db: Session, author_id: str) -> dict | None:
+    profile = db.get(models.AuthorProfile, author_id)
+    if profile is None:
+        return None
+    gaps, compared = profile.gap_weight, profile.compared_weight
+    return {
+        "author_id": profile.author_id,
+        "author_handle": profile.author_handle,
+        "post_count": profile.post_count,
+        "post_weight": profile.post_weight,
+        "first_seen": profile.first_seen,
+        "last_seen": profile.last_seen,
+        "mean_gap_seconds": profile.gap_mean if gaps else None,
+        "gap_stddev_seconds": math.sqrt(max(0.0, profile.gap_m2) / gaps) if gaps else None,
+        "centroid_spread": 1.0 - profile.similarity_sum / compared if compared else None,
+        "near_duplicates": profile.near_dup_count,
+        "active_hours": profile.active_hours,
+        "components": score_components(profile),
+        "bot_score": bot_score(profile),
+    }
+
+
+def rebuild_author_profiles(db: Session):
+    """Recompute every profile from the posts table, oldest post first."""
+    db.query(models.AuthorProfile).delete()
+    post = models.Post
+    q = (
+        select(post.id, post.author_id, post.author_handle, post.text, post.created_at)
+        .order_by(post.created_at)
+        .execution_options(yield_per=1000)
+    )
+    chunk = []
+    for row in db.execute(q):
+        chunk.append(row._asdict())
+        if len(chunk) >= 1000:
+            apply_author_profiles(db, chunk)
+            chunk = []
+    apply_author_profiles(db, chunk)
+    db.commit()
+
+
+def ensure_author_profiles(db: Session):
+    """Backfill profiles for databases that predate them or whose profile columns have changed.
+
+    Profiles are derived from the posts table, so a table with other
+    columns is dropped and rebuilt rather than migrated.
+    """
+    table = models.AuthorProfile.__table__
+    bind = db.get_bind()
+    if {c["name"] for c in inspect(bind).get_columns(table.name)} != set(PROFILE_COLUMNS):
+        db.commit()
+        table.drop(bind)
+        table.create(bind)
+    if db.query(models.AuthorProfile.author_id).first() is None and db.query(models.Post.id).first() is not None:
+        rebuild_author_profiles(db)
+
+
+class ProfileWriter:
+    """Folds committed posts into author profiles on a background thread.
+
+    Ingest only enqueues the columns a fold needs. A daemon thread drains
+    the bounded queue and folds up to `batch_size` posts per transaction,
+    at least every `flush_interval` seconds, so embedding and the profile
+    row locks stay out of the ingest commit and a busy author's row is
+    locked once per batch rather than once per request. A full queue
+    blocks a producer for at most `enqueue_timeout` seconds per call; rows
+    that do not fit by then are dropped. Queued posts are lost if the
+    process dies; rebuild_author_profiles recomputes every profile.
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        batch_size: int = int(os.getenv("PROFILE_BATCH_SIZE", "2000")),
+        flush_interval: float = float(os.getenv("PROFILE_FLUSH_INTERVAL", "0.5")),
+        max_buffer: int = int(os.getenv("PROFILE_MAX_BUFFER", "100000")),
+        enqueue_timeout: float = 0.05,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.queue: queue.Queue = queue.Queue(maxsize=max_buffer)
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self._stop = threading.Event()
+        self._flushing = threading.Event()  # write what is queued without waiting for a full batch
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._stop.clear()
+                    self._thread = threading.Thread(target=self._run, name="profile-writer", daemon=True)
+                    self._thread.start()
+
+    def _drop(self, n: int):
+        with self._lock:
+            self.dropped += n
+
+    def add(self, rows):
+        """Queue newly ingested posts; re-ingested ones must be left out, they were counted already."""
+        rows = [
+            {name: row[name] for name in ("id", "author_id", "author_handle", "text", "created_at")}
+            for row in rows if row.get("author_id")
+        ]
+        deadline = time.monotonic() + self.enqueue_timeout
+        for i, row in enumerate(rows):
+            try:
+                self.queue.put(row, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                self._drop(len(rows) - i)
+                break
+        self._ensure_worker()
+
+    def _run(self):
+        while not self._stop.is_set() or not self.queue.empty():
+            rows = self._take_batch()
+            if rows:
+                self._write(rows)
+
+    def _take_batch(self) -> list[dict]:
+        rows = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(rows) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or ((self._stop.is_set() or self._flushing.is_set()) and self.queue.empty()):
+                break
+            try:
+                rows.append(self.queue.get(timeout=min(remaining, 0.1)))
+            except queue.Empty:
+                continue
+        return rows
+
+    def _write(self, rows: list[dict]):
+        db = self.session_factory()
+        try:
+            with stage("profiles.write"):
+                apply_author_profiles(db, rows)
+                db.commit()
+            self.written += len(rows)
+            self.batches += 1
+        except Exception:
+            logger.warning("profile fold of %d posts failed", len(rows), exc_info=True)
+            db.rollback()
+            self._drop(len(rows))
+        finally:
+            db.close()
+            for _ in rows:
+                self.queue.task_done()
+
+    def flush(self, timeout: float = 10.0):
+        """Block until every queued post has been folded or dropped."""
+        deadline = time.monotonic() + timeout
+        self._flushing.set()
+        try:
+            while self.queue.unfinished_tasks and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            self._flushing.clear()
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+        }
+
+    def close(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.flush_interval + 5)
+            self._thread = None
+
+
+_writer: ProfileWriter | None = None
+_writer_lock = threading.Lock()
+
+
+def get_profile_writer() -> ProfileWriter:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = ProfileWriter()
+    return _writer
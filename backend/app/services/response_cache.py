@@ -0,0 +1,177 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.datastructures import Headers
+
+
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+
+# Read endpoints the dashboard polls; their responses only change when the data version does
+CACHED_PATHS = (
+    "/api/posts/",
+    "/api/alerts/",
+    "/api/analytics/trends",
+    "/api/analytics/influencers",
+    "/api/analytics/hashtags",
+    "/api/dashboard/snapshot",
+)
+
+_version = 0
+_version_lock = threading.Lock()
+
+
+def bump_data_version():
+    """Invalidate every cached response; called after ingest, keyword changes and alert updates."""
+    global _version
+    with _version_lock:
+        _version += 1
+
+
+def data_version() -> int:
+    return _version
+
+
+@dataclass
+class CachedResponse:
+    version: int
+    stored_at: float
+    status: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+    etag: bytes
+
+
+class ResponseCache:
+    """LRU of serialized responses keyed by path and normalized query string.
+
+    An entry is served only while the data version it was computed under is
+    current and it is younger than `ttl` seconds. The TTL also bounds how
+    long a worker can miss a version bump made in another process.
+    """
+
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, CachedResponse] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, key: tuple) -> CachedResponse | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != _version or time.monotonic() - entry.stored_at > self.ttl:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: tuple, entry: CachedResponse):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "data_version": _version,
+            }
+
+
+_cache = ResponseCache()
+
+
+def get_response_cache() -> ResponseCache:
+    return _cache
+
+
+def _etag(body: bytes) -> bytes:
+    return b'"' + hashlib.blake2b(body, digest_size=16).hexdigest().encode("ascii") + b'"'
+
+
+def _etag_matches(if_none_match: str | None, etag: bytes) -> bool:
+    if not if_none_match:
+        return False
+    tags = {t.strip() for t in if_none_match.split(",")}
+    return "*" in tags or etag.decode("ascii") in tags
+
+
+class ResponseCacheMiddleware:
+    """Serves cached GET responses for CACHED_PATHS, with strong ETags and 304s.
+
+    Misses are buffered in full (these endpoints return small JSON bodies),
+    stored under the data version seen before the handler ran and tagged
+    with a content hash, so a 304 is possible even after a recompute.
+    """
+
+    def __init__(self, app, paths=CACHED_PATHS, cache: ResponseCache | None = None):
+        self.app = app
+        self.paths = set(paths)
+        self.cache = cache or _cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        query = urlencode(sorted(parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True)))
+        key = (scope["path"], query)
+        if_none_match = Headers(scope=scope).get("if-none-match")
+
+        entry = self.cache.get(key) if self.cache.enabled else None
+        if entry is None:
+            version = _version
+            start: dict = {}
+            chunks: list[bytes] = []
+
+            async def capture(message):
+                if message["type"] == "http.response.start":
+                    start.update(message)
+                elif message["type"] == "http.response.body":
+                    chunks.append(message.get("body", b""))
+
+            await self.app(scope, receive, capture)
+            body = b"".join(chunks)
+            headers = [(k, v) for k, v in start.get("headers", []) if k.lower() not in (b"etag", b"cache-control")]
+            entry = CachedResponse(version, time.monotonic(), start.get("status", 500), headers, body, _etag(body))
+            if entry.status == 200 and self.cache.enabled:
+                self.cache.put(key, entry)
+
+        if entry.status != 200:
+            await send({"type": "http.response.start", "status": entry.status, "headers": entry.headers})
+            await send({"type": "http.response.body", "body": entry.body})
+            return
+        # no-cache: clients may store the body but must revalidate with If-None-Match
+        validators = [(b"etag", entry.etag), (b"cache-control", b"no-cache")]
+        if _etag_matches(if_none_match, entry.etag):
+            self.cache.not_modified += 1
+            await send({"type": "http.response.start", "status": 304, "headers": validators})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send({"type": "http.response.start", "status": 200, "headers": entry.headers + validators})
+        await send({"type": "http.response.body", "body": entry.body})
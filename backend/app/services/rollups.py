@@ -0,0 +1,309 @@
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..db import dialect_insert
+
+
+# Stored resolutions; coarser request sizes are summed from the largest one that divides them
+TREND_RESOLUTIONS = (60, 3600)
+BUCKET_SIZES = {"1m": 60, "5m": 300, "30m": 1800, "1h": 3600, "1d": 86400}
+EPOCH = datetime(1970, 1, 1)
+COUNTERS = ("post_count", "anti_count", "pro_count", "neutral_count", "toxicity_sum")
+AUTHOR_RESOLUTION = 3600
+AUTHOR_COUNTERS = ("post_count", "toxicity_sum", "anti_count")
+INFLUENCER_SORTS = ("posts", "toxicity", "anti_ratio")
+# days of buckets kept per stored resolution, and of hourly author buckets
+TREND_RETENTION_DAYS = {
+    60: float(os.getenv("TREND_MINUTE_RETENTION_DAYS", "7")),
+    3600: float(os.getenv("TREND_HOUR_RETENTION_DAYS", "400")),
+}
+AUTHOR_RETENTION_DAYS = float(os.getenv("AUTHOR_RETENTION_DAYS", "90"))
+
+
+def floor_time(ts: datetime, seconds: int) -> datetime:
+    offset = int((ts - EPOCH).total_seconds()) // seconds * seconds
+    return EPOCH + timedelta(seconds=offset)
+
+
+def ceil_time(ts: datetime, seconds: int) -> datetime:
+    start = floor_time(ts, seconds)
+    return start if start == ts else start + timedelta(seconds=seconds)
+
+
+def _trend_deltas(rows: list[dict], sign: int, deltas: dict):
+    for row in rows:
+        stance = row.get("stance")
+        values = (
+            1,
+            1 if stance == "anti" else 0,
+            1 if stance == "pro" else 0,
+            1 if stance not in ("anti", "pro") else 0,
+            row.get("toxicity") or 0.0,
+        )
+        for resolution in TREND_RESOLUTIONS:
+            key = (resolution, floor_time(row["created_at"], resolution), row.get("platform") or "")
+            acc = deltas[key]
+            for i, v in enumerate(values):
+                acc[i] += sign * v
+
+
+def apply_trend_rollups(db: Session, added: list[dict], removed: list[dict] = ()):
+    """Add `added` posts to the trend buckets and take `removed` (replaced) posts out."""
+    deltas = defaultdict(lambda: [0, 0, 0, 0, 0.0])
+    _trend_deltas(added, 1, deltas)
+    _trend_deltas(list(removed), -1, deltas)
+    _write_trend_deltas(db, deltas)
+
+
+def _write_trend_deltas(db: Session, deltas: dict):
+    rows = [
+        {"resolution": r, "bucket_start": b, "platform": p, **dict(zip(COUNTERS, acc))}
+        for (r, b, p), acc in deltas.items()
+        if any(acc)
+    ]
+    _add_counters(db, models.TrendBucket, rows, COUNTERS)
+
+
+def _author_deltas(rows: list[dict], sign: int, deltas: dict):
+    for row in rows:
+        key = (floor_time(row["created_at"], AUTHOR_RESOLUTION), row.get("author_handle") or "")
+        acc = deltas[key]
+        acc[0] += sign
+        acc[1] += sign * (row.get("toxicity") or 0.0)
+        acc[2] += sign * (1 if row.get("stance") == "anti" else 0)
+        if sign > 0 and (acc[3] is None or row["created_at"] > acc[3]):
+            acc[3] = row["created_at"]
+
+
+def apply_author_rollups(db: Session, added: list[dict], removed: list[dict] = ()):
+    """Maintain hourly per-author counters; last_seen only ever moves forward."""
+    deltas = defaultdict(lambda: [0, 0.0, 0, None])
+    _author_deltas(added, 1, deltas)
+    _author_deltas(list(removed), -1, deltas)
+    _write_author_deltas(db, deltas)
+
+
+def _write_author_deltas(db: Session, deltas: dict):
+    rows = [
+        {"bucket_start": b, "author_handle": a, **dict(zip(AUTHOR_COUNTERS, acc[:3])), "last_seen": acc[3]}
+        for (b, a), acc in deltas.items()
+        if any(acc[:3]) or acc[3] is not None
+    ]
+    _add_counters(db, models.AuthorBucket, rows, AUTHOR_COUNTERS, latest=("last_seen",))
+
+
+def _add_counters(db: Session, model, rows: list[dict], counters: tuple, latest: tuple = ()):
+    """Upsert rollup rows, adding `counters` to existing values and keeping the max of `latest`."""
+    if not rows:
+        return
+    insert = dialect_insert(db)
+    key_names = [c.name for c in model.__table__.primary_key.columns]
+    if insert is None:
+        for row in rows:
+            existing = db.get(model, tuple(row[k] for k in key_names))
+            if existing is None:
+                db.add(model(**row))
+                continue
+            for name in counters:
+                setattr(existing, name, getattr(existing, name) + row[name])
+            for name in latest:
+                if row[name] is not None and (getattr(existing, name) is None or row[name] > getattr(existing, name)):
+                    setattr(existing, name, row[name])
+        return
+    table = model.__table__
+    stmt = insert(table)
+    set_ = {name: table.c[name] + stmt.excluded[name] for name in counters}
+    for name in latest:
+        set_[name] = case(
+            (table.c[name].is_(None), stmt.excluded[name]),
+            (stmt.excluded[name] > table.c[name], stmt.excluded[name]),
+            else_=table.c[name],
+        )
+    db.execute(stmt.on_conflict_do_update(index_elements=key_names, set_=set_), rows)
+
+
+def rebuild_rollups(db: Session):
+    """Recompute every rollup table from the posts table."""
+    db.query(models.TrendBucket).delete()
+    db.query(models.AuthorBucket).delete()
+    trend = defaultdict(lambda: [0, 0, 0, 0, 0.0])
+    author = defaultdict(lambda: [0, 0.0, 0, None])
+    posts = [
+        row._asdict()
+        for row in db.query(
+            models.Post.created_at,
+            models.Post.platform,
+            models.Post.author_handle,
+            models.Post.stance,
+            models.Post.toxicity,
+        )
+    ]
+    _trend_deltas(posts, 1, trend)
+    _author_deltas(posts, 1, author)
+    _write_trend_deltas(db, trend)
+    _write_author_deltas(db, author)
+    db.commit()
+
+
+def ensure_rollups(db: Session):
+    """Backfill the rollup tables once for databases that predate them."""
+    if db.query(models.Post.id).first() is None:
+        return
+    if (
+        db.query(models.TrendBucket.resolution).first() is None
+        or db.query(models.AuthorBucket.author_handle).first() is None
+    ):
+        rebuild_rollups(db)
+
+
+def prune_rollups(db: Session, now: datetime | None = None):
+    """Drop trend and author buckets older than their retention."""
+    now = now or datetime.utcnow()
+    tb, ab = models.TrendBucket, models.AuthorBucket
+    for resolution, days in TREND_RETENTION_DAYS.items():
+        cutoff = now - timedelta(days=days)
+        db.query(tb).filter(tb.resolution == resolution, tb.bucket_start < cutoff).delete(synchronize_session=False)
+    db.query(ab).filter(ab.bucket_start < now - timedelta(days=AUTHOR_RETENTION_DAYS)).delete(synchronize_session=False)
+    db.commit()
+
+
+def _leading_posts(db: Session, since: datetime, until: datetime, platform: str | None = None):
+    """Raw posts in [since, until): the part of the window before the first whole stored bucket."""
+    post = models.Post
+    q = (
+        db.query(post.created_at, post.platform, post.stance, post.toxicity)
+        .filter(post.created_at >= since)
+        .filter(post.created_at < until)
+    )
+    if platform:
+        q = q.filter(post.platform == platform)
+    return q.all()
+
+
+def query_trends(
+    db: Session,
+    bucket: str = "30m",
+    hours: float = 24.0,
+    platform: str | None = None,
+    now: datetime | None = None,
+) -> list[dict]:
+    """Post counts per bucket over exactly the last `hours`.
+
+    Whole stored buckets come from the rollup table; the stretch between
+    the window start and the first of them is counted from the posts
+    table, so the leading bucket only holds posts inside the window.
+    """
+    size = BUCKET_SIZES[bucket]
+    resolution = max(r for r in TREND_RESOLUTIONS if size % r == 0)
+    window_start = (now or datetime.utcnow()) - timedelta(hours=hours)
+    since = ceil_time(window_start, resolution)
+    q = (
+        db.query(
+            models.TrendBucket.bucket_start,
+            func.sum(models.TrendBucket.post_count),
+            func.sum(models.TrendBucket.anti_count),
+            func.sum(models.TrendBucket.toxicity_sum),
+        )
+        .filter(models.TrendBucket.resolution == resolution)
+        .filter(models.TrendBucket.bucket_start >= since)
+    )
+    if platform:
+        q = q.filter(models.TrendBucket.platform == platform)
+    q = q.group_by(models.TrendBucket.bucket_start)
+
+    buckets: dict[datetime, list] = {}
+    for start, count, anti, toxicity in q.all():
+        if not count:
+            continue
+        acc = buckets.setdefault(floor_time(start, size), [0, 0, 0.0])
+        acc[0] += count
+        acc[1] += anti
+        acc[2] += toxicity
+    for created_at, _, stance, toxicity in _leading_posts(db, window_start, since, platform):
+        acc = buckets.setdefault(floor_time(created_at, size), [0, 0, 0.0])
+        acc[0] += 1
+        acc[1] += 1 if stance == "anti" else 0
+        acc[2] += toxicity or 0.0
+    return [
+        {
+            "time": t.isoformat(),
+            "count": count,
+            "anti_ratio": anti / max(1, count),
+            "avg_toxicity": toxicity / max(1, count),
+        }
+        for t, (count, anti, toxicity) in sorted(buckets.items())
+    ]
+
+
+def top_authors(
+    db: Session,
+    k: int = 20,
+    hours: float = 72.0,
+    sort: str = "posts",
+    min_posts: int = 1,
+) -> list[dict]:
+    """Top-K authors over the window from the hourly author rollups."""
+    since = floor_time(datetime.utcnow() - timedelta(hours=hours), AUTHOR_RESOLUTION)
+    posts = func.sum(models.AuthorBucket.post_count)
+    toxicity = func.sum(models.AuthorBucket.toxicity_sum)
+    anti = func.sum(models.AuthorBucket.anti_count)
+    order = {
+        "posts": posts,
+        "toxicity": toxicity / posts,
+        "anti_ratio": anti * 1.0 / posts,
+    }[sort]
+    q = (
+        db.query(models.AuthorBucket.author_handle, posts, toxicity, anti, func.max(models.AuthorBucket.last_seen))
+        .filter(models.AuthorBucket.bucket_start >= since)
+        .group_by(models.AuthorBucket.author_handle)
+        .having(posts >= max(1, min_posts))
+        .order_by(order.desc(), posts.desc())
+        .limit(k)
+    )
+    return [
+        {
+            "author": author,
+            "posts": count,
+            "avg_toxicity": float(tox or 0.0) / count,
+            "anti_ratio": anti_count / count,
+            "last_seen": last_seen,
+        }
+        for author, count, tox, anti_count, last_seen in q.all()
+    ]
+
+
+def platform_totals(db: Session, hours: float = 24.0, now: datetime | None = None) -> dict[str, dict]:
+    """Per-platform counters over exactly the last `hours`, from the hourly trend buckets and the partial hour before them."""
+    window_start = (now or datetime.utcnow()) - timedelta(hours=hours)
+    since = ceil_time(window_start, 3600)
+    tb = models.TrendBucket
+    q = (
+        db.query(tb.platform, *(func.sum(getattr(tb, name)) for name in COUNTERS))
+        .filter(tb.resolution == 3600)
+        .filter(tb.bucket_start >= since)
+        .group_by(tb.platform)
+    )
+    totals = {platform or "": [v or 0 for v in values] for platform, *values in q.all()}
+    deltas = defaultdict(lambda: [0, 0, 0, 0, 0.0])
+    _trend_deltas([row._asdict() for row in _leading_posts(db, window_start, since)], 1, deltas)
+    for (resolution, _, platform), acc in deltas.items():
+        if resolution == 3600:
+            values = totals.setdefault(platform, [0, 0, 0, 0, 0.0])
+            for i, v in enumerate(acc):
+                values[i] += v
+    return {platform or "unknown": dict(zip(COUNTERS, values)) for platform, values in totals.items()}
+
+
+def active_authors(db: Session, hours: float = 24.0) -> int:
+    since = floor_time(datetime.utcnow() - timedelta(hours=hours), AUTHOR_RESOLUTION)
+    return (
+        db.query(func.count(func.distinct(models.AuthorBucket.author_handle)))
+        .filter(models.AuthorBucket.bucket_start >= since)
+        .filter(models.AuthorBucket.post_count > 0)
+        .scalar()
+    ) or 0
@@ -0,0 +1,116 @@
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..db import SessionLocal, insert_ignore
+from .detection import evaluate_alerts
+from .response_cache import bump_data_version
+from .rollups import prune_rollups
+from .window_state import WORKER_ID, get_window_state, prune_window_feed
+
+
+logger = logging.getLogger(__name__)
+
+ALERT_EVAL_INTERVAL = float(os.getenv("ALERT_EVAL_INTERVAL", "30"))
+# a leader that stops renewing is replaced after this many intervals
+ALERT_LEASE_INTERVALS = float(os.getenv("ALERT_LEASE_INTERVALS", "3"))
+EPOCH = datetime(1970, 1, 1)
+
+
+def acquire_lease(db: Session, name: str, owner: str, ttl: timedelta) -> bool:
+    """Take or renew the named lease; True while `owner` holds it."""
+    now = datetime.utcnow()
+    table = models.SchedulerLease.__table__
+    db.execute(insert_ignore(db, table), {"name": name, "owner": "", "expires_at": EPOCH})
+    taken = db.execute(
+        table.update()
+        .where(table.c.name == name)
+        .where((table.c.owner == owner) | (table.c.expires_at < now))
+        .values(owner=owner, expires_at=now + ttl)
+    ).rowcount
+    db.commit()
+    return taken == 1
+
+
+def release_lease(db: Session, name: str, owner: str):
+    table = models.SchedulerLease.__table__
+    db.execute(table.update().where(table.c.name == name).where(table.c.owner == owner).values(expires_at=EPOCH))
+    db.commit()
+
+
+class AlertScheduler:
+    """Runs evaluate_alerts on a fixed interval in a daemon thread.
+
+    With several workers each one runs a scheduler, but only the holder of
+    the "alerts" lease evaluates and prunes old feed and rollup rows; the
+    others keep their windows in sync and expired, ready to take over when
+    the lease lapses.
+    """
+
+    def __init__(self, interval: float = ALERT_EVAL_INTERVAL):
+        self.interval = interval
+        self.leading = False
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        if self.interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="alert-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 5)
+            self._thread = None
+        if self.leading:
+            db = SessionLocal()
+            try:
+                release_lease(db, "alerts", WORKER_ID)
+            finally:
+                db.close()
+            self.leading = False
+
+    def run_once(self) -> dict:
+        db = SessionLocal()
+        try:
+            get_window_state().sync(db)
+            changes = evaluate_alerts(db)
+        finally:
+            db.close()
+        if any(changes.values()):
+            bump_data_version()
+        return changes
+
+    def tick(self):
+        db = SessionLocal()
+        try:
+            self.leading = acquire_lease(db, "alerts", WORKER_ID, timedelta(seconds=self.interval * ALERT_LEASE_INTERVALS))
+            if not self.leading:
+                state = get_window_state()
+                state.sync(db)
+                state.advance()
+                return
+            prune_window_feed(db)
+            prune_rollups(db)
+        finally:
+            db.close()
+        self.run_once()
+
+    def _run(self):
+        while True:
+            try:
+                self.tick()
+            except Exception:
+                logger.exception("alert evaluation failed")
+            if self._stop.wait(self.interval):
+                break
+
+
+scheduler = AlertScheduler()
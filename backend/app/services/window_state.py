@@ -0,0 +1,301 @@
+import bisect
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+
+from .. import models
+from .hashtags import normalize_tag
+
+
+WINDOW = timedelta(hours=6)
+# how long window_feed rows are kept, and how long a seq missing below the
+# newest one read is retried (a transaction that took it may commit late)
+WINDOW_FEED_RETENTION = float(os.getenv("WINDOW_FEED_RETENTION", "3600"))
+WINDOW_FEED_GRACE = float(os.getenv("WINDOW_FEED_GRACE", "60"))
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def as_utc_naive(ts: datetime) -> datetime:
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def top_hashtag(hashtags) -> str:
+    """First tag that survives normalization, i.e. position 0 in post_hashtags."""
+    for tag in hashtags or []:
+        tag = normalize_tag(tag)
+        if tag:
+            return tag
+    return "uncategorized"
+
+
+@dataclass
+class WindowPost:
+    """The fields of a post the detectors need, without the ORM row."""
+    id: str
+    text: str
+    author_id: str
+    toxicity: float
+    stance: str
+    created_at: datetime
+
+    @classmethod
+    def from_post(cls, post: models.Post) -> "WindowPost":
+        return cls(
+            id=post.id,
+            text=post.text or "",
+            author_id=post.author_id or "",
+            toxicity=post.toxicity or 0.0,
+            stance=post.stance or "neutral",
+            created_at=as_utc_naive(post.created_at),
+        )
+
+
+class HashtagWindow:
+    """Running aggregates for the posts of one hashtag inside the window.
+
+    Posts are kept ordered by (created_at, id) next to a parallel list of
+    those keys, so late arrivals, removals and expiry find their position
+    by bisection, and the inter-arrival gap sums are patched locally on
+    every insert or removal. `scores` caches the last detector output and
+    is cleared whenever the window changes; `version` counts the changes.
+    """
+
+    def __init__(self):
+        self.posts: list[WindowPost] = []
+        self.keys: list[tuple[datetime, str]] = []
+        self._at: dict[str, datetime] = {}
+        self.toxicity_sum = 0.0
+        self.anti_count = 0
+        self.gap_sum = 0.0
+        self.gap_sq_sum = 0.0
+        self.authors: Counter = Counter()
+        self.scores: dict | None = None
+        self.version = 0
+
+    @property
+    def count(self) -> int:
+        return len(self.posts)
+
+    def _gap(self, a: WindowPost, b: WindowPost, sign: int):
+        g = (b.created_at - a.created_at).total_seconds()
+        self.gap_sum += sign * g
+        self.gap_sq_sum += sign * g * g
+
+    def _account(self, p: WindowPost, sign: int):
+        self.toxicity_sum += sign * p.toxicity
+        self.anti_count += sign * (1 if p.stance == "anti" else 0)
+        self.authors[p.author_id] += sign
+        if self.authors[p.author_id] <= 0:
+            del self.authors[p.author_id]
+        self.scores = None
+        self.version += 1
+
+    def add(self, p: WindowPost):
+        self._account(p, 1)
+        key = (p.created_at, p.id)
+        self._at[p.id] = p.created_at
+        if not self.keys or key >= self.keys[-1]:
+            if self.posts:
+                self._gap(self.posts[-1], p, 1)
+            self.posts.append(p)
+            self.keys.append(key)
+            return
+        # late arrival: splice it in and patch the neighbouring gaps
+        i = bisect.bisect_right(self.keys, key)
+        if i > 0:
+            self._gap(self.posts[i - 1], self.posts[i], -1)
+            self._gap(self.posts[i - 1], p, 1)
+        self._gap(p, self.posts[i], 1)
+        self.posts.insert(i, p)
+        self.keys.insert(i, key)
+
+    def remove(self, post_id: str) -> bool:
+        created_at = self._at.pop(post_id, None)
+        if created_at is None:
+            return False
+        i = bisect.bisect_left(self.keys, (created_at, post_id))
+        p = self.posts[i]
+        self._account(p, -1)
+        if i > 0:
+            self._gap(self.posts[i - 1], p, -1)
+        if i + 1 < len(self.posts):
+            self._gap(p, self.posts[i + 1], -1)
+            if i > 0:
+                self._gap(self.posts[i - 1], self.posts[i + 1], 1)
+        del self.posts[i]
+        del self.keys[i]
+        return True
+
+    def expire(self, cutoff: datetime) -> list[str]:
+        n = bisect.bisect_left(self.keys, (cutoff,))
+        if not n:
+            return []
+        expired = self.posts[:n]
+        for i, p in enumerate(expired):
+            self._account(p, -1)
+            if i + 1 < len(self.posts):
+                self._gap(p, self.posts[i + 1], -1)
+            del self._at[p.id]
+        del self.posts[:n]
+        del self.keys[:n]
+        return [p.id for p in expired]
+
+    def snapshot(self) -> "HashtagWindow":
+        """A copy to score without holding the state lock."""
+        copy = HashtagWindow()
+        copy.posts = list(self.posts)
+        copy.toxicity_sum, copy.anti_count = self.toxicity_sum, self.anti_count
+        copy.gap_sum, copy.gap_sq_sum = self.gap_sum, self.gap_sq_sum
+        copy.authors = Counter(self.authors)
+        copy.version = self.version
+        return copy
+
+    def gap_stats(self) -> tuple[float, float]:
+        """Mean and population variance of the inter-arrival gaps, in seconds."""
+        m = self.count - 1
+        mu = self.gap_sum / m
+        return mu, max(0.0, self.gap_sq_sum / m - mu * mu)
+
+
+class WindowState:
+    """Per-hashtag sliding-window aggregates maintained on ingest.
+
+    Each worker adds the posts it commits itself and pulls those committed
+    by other workers from window_feed with `sync`, so any worker can score
+    the whole window.
+    """
+
+    def __init__(self, window: timedelta = WINDOW):
+        self.window = window
+        self.groups: dict[str, HashtagWindow] = {}
+        self._tag_of: dict[str, str] = {}
+        self.lock = threading.RLock()
+        self.feed_seq = 0
+        self._feed_gaps: dict[int, float] = {}
+        self._synced_at: float | None = None
+
+    def add(self, post: models.Post, tag: str | None = None):
+        p = WindowPost.from_post(post)
+        tag = tag or top_hashtag(post.hashtags)
+        with self.lock:
+            if p.created_at < datetime.utcnow() - self.window:
+                self.discard(p.id)
+                return
+            self.discard(p.id)  # re-ingest of the same id replaces it
+            self.groups.setdefault(tag, HashtagWindow()).add(p)
+            self._tag_of[p.id] = tag
+
+    def discard(self, post_id: str):
+        with self.lock:
+            tag = self._tag_of.pop(post_id, None)
+            if tag is not None:
+                self.groups[tag].remove(post_id)
+
+    def advance(self, now: datetime | None = None):
+        cutoff = (now or datetime.utcnow()) - self.window
+        with self.lock:
+            for tag in list(self.groups):
+                group = self.groups[tag]
+                for post_id in group.expire(cutoff):
+                    self._tag_of.pop(post_id, None)
+                if not group.count:
+                    del self.groups[tag]
+
+    def clear(self):
+        with self.lock:
+            self.groups.clear()
+            self._tag_of.clear()
+
+    def rebuild(self, db: Session):
+        """Reload the window from the database, e.g. at process start."""
+        now = datetime.utcnow()
+        since = now - self.window
+        feed = models.WindowFeed
+        # feed rows from the last grace period are applied again by the next sync,
+        # in case their transactions were still open while the posts were read
+        seq = db.query(func.max(feed.seq)).filter(feed.recorded_at < now - timedelta(seconds=WINDOW_FEED_GRACE)).scalar()
+        ph = models.PostHashtag
+        rows = (
+            db.query(models.Post, ph.tag)
+            .outerjoin(ph, (ph.post_id == models.Post.id) & (ph.position == 0))
+            .filter(models.Post.created_at >= since)
+            .order_by(models.Post.created_at.asc())
+            .yield_per(1000)
+        )
+        with self.lock:
+            self.clear()
+            for post, tag in rows:
+                self.add(post, tag or "uncategorized")
+            self.feed_seq, self._feed_gaps = seq or 0, {}
+            self._synced_at = time.monotonic()
+
+    def sync(self, db: Session) -> int:
+        """Add the posts other workers committed since the last sync; returns how many.
+
+        Falls back to a rebuild when the feed may have been pruned past the
+        last position read.
+        """
+        if self._synced_at is None or time.monotonic() - self._synced_at > WINDOW_FEED_RETENTION / 2:
+            self.rebuild(db)
+            return 0
+        feed = models.WindowFeed
+        after, now = self.feed_seq, time.monotonic()
+        rows = db.execute(
+            select(feed.seq, feed.post_id, feed.origin)
+            .where(or_(feed.seq > after, feed.seq.in_(list(self._feed_gaps))))
+            .order_by(feed.seq)
+        ).all()
+        seen = {seq for seq, _, _ in rows}
+        newest = max(seen | {after})
+        gaps = {seq: t for seq, t in self._feed_gaps.items() if seq not in seen and now - t < WINDOW_FEED_GRACE}
+        gaps.update((seq, now) for seq in range(after + 1, newest) if seq not in seen)
+        ids = list(dict.fromkeys(post_id for _, post_id, origin in rows if origin != WORKER_ID))
+        ph = models.PostHashtag
+        for start in range(0, len(ids), 500):
+            chunk = (
+                db.query(models.Post, ph.tag)
+                .outerjoin(ph, (ph.post_id == models.Post.id) & (ph.position == 0))
+                .filter(models.Post.id.in_(ids[start:start + 500]))
+                .all()
+            )
+            with self.lock:
+                for post, tag in chunk:
+                    self.add(post, tag or "uncategorized")
+        with self.lock:
+            self.feed_seq, self._feed_gaps = newest, gaps
+            self._synced_at = now
+        return len(ids)
+
+
+def record_window_feed(db: Session, rows: list[dict]):
+    """Append the written posts to window_feed in the caller's transaction."""
+    if rows:
+        now = datetime.utcnow()
+        db.execute(
+            models.WindowFeed.__table__.insert(),
+            [{"post_id": row["id"], "origin": WORKER_ID, "recorded_at": now} for row in rows],
+        )
+
+
+def prune_window_feed(db: Session):
+    cutoff = datetime.utcnow() - timedelta(seconds=WINDOW_FEED_RETENTION)
+    db.query(models.WindowFeed).filter(models.WindowFeed.recorded_at < cutoff).delete(synchronize_session=False)
+    db.commit()
+
+
+_state = WindowState()
+
+
+def get_window_state() -> WindowState:
+    return _state
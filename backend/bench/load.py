@@ -0,0 +1,331 @@
+"""Mixed-traffic HTTP load test: collectors posting while dashboards read.
+
+Run from backend/:
+
+    python -m bench.load --duration 30 --concurrency 16
+    python -m bench.load --mode uvicorn --workers 2 --mix ingest=6,alerts=2,trends=1,influencers=1,snapshot=1
+
+`inprocess` drives the ASGI app directly (client and server share one event
+loop and CPU); `uvicorn` starts a real server in a subprocess against a
+throwaway SQLite database, which is the closer match to production.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import httpx
+
+from .synthetic import CorpusSpec, generate_posts
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+ENDPOINTS = {
+    "ingest": ("POST", "/api/posts/"),
+    "posts": ("GET", "/api/posts/?limit=50"),
+    "alerts": ("GET", "/api/alerts/"),
+    "trends": ("GET", "/api/analytics/trends"),
+    "influencers": ("GET", "/api/analytics/influencers"),
+    "hashtags": ("GET", "/api/analytics/hashtags"),
+    "snapshot": ("GET", "/api/dashboard/snapshot"),
+}
+DEFAULT_MIX = "ingest=6,alerts=2,trends=1,influencers=1,snapshot=1"
+SAMPLE_INTERVAL = 0.5
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise SystemExit(f"unknown endpoint {name!r}; choose from {', '.join(ENDPOINTS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(q * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class ProcessSampler:
+    """Samples CPU % and resident memory of a process and its children.
+
+    Uses psutil when installed and falls back to /proc on Linux; elsewhere
+    it records nothing.
+    """
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.samples: list[tuple[float, float]] = []  # (cpu %, rss MiB)
+        self._ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+        self._page = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    def _pids(self) -> list[int]:
+        pids = [self.pid]
+        try:
+            with open(f"/proc/{self.pid}/task/{self.pid}/children") as f:
+                pids += [int(p) for p in f.read().split()]
+        except OSError:
+            pass
+        return pids
+
+    def _read(self) -> tuple[float, float] | None:
+        """Total CPU seconds and RSS bytes so far."""
+        if psutil is not None:
+            try:
+                procs = [psutil.Process(self.pid)]
+                procs += procs[0].children(recursive=True)
+                cpu = sum(sum(p.cpu_times()[:2]) for p in procs)
+                rss = sum(p.memory_info().rss for p in procs)
+                return cpu, rss
+            except psutil.Error:
+                return None
+        cpu = rss = 0.0
+        for pid in self._pids():
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    fields = f.read().rsplit(")", 1)[1].split()
+                with open(f"/proc/{pid}/statm") as f:
+                    pages = int(f.read().split()[1])
+            except OSError:
+                if pid == self.pid:
+                    return None
+                continue
+            cpu += (int(fields[11]) + int(fields[12])) / self._ticks  # utime + stime
+            rss += pages * self._page
+        return cpu, rss
+
+    async def run(self, stop: asyncio.Event):
+        last = self._read()
+        last_t = time.monotonic()
+        while last is not None and not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), SAMPLE_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            now = self._read()
+            now_t = time.monotonic()
+            if now is None:
+                break
+            self.samples.append((100 * (now[0] - last[0]) / (now_t - last_t), now[1] / 2**20))
+            last, last_t = now, now_t
+
+    def summary(self) -> dict:
+        if not self.samples:
+            return {}
+        cpu = sorted(s[0] for s in self.samples)
+        rss = [s[1] for s in self.samples]
+        return {
+            "cpu_percent_mean": sum(cpu) / len(cpu),
+            "cpu_percent_p95": percentile(cpu, 0.95),
+            "rss_mib_start": rss[0],
+            "rss_mib_max": max(rss),
+            "rss_mib_end": rss[-1],
+        }
+
+
+class LoadRun:
+    def __init__(self, client: httpx.AsyncClient, mix: dict[str, float], seed: int):
+        self.client = client
+        self.names = list(mix)
+        self.weights = list(mix.values())
+        self.rng = random.Random(seed)
+        self.posts = generate_posts(CorpusSpec(posts=10**9, seed=seed, span_hours=1))
+        self.latencies: dict[str, list[float]] = {name: [] for name in mix}
+        self.errors: dict[str, int] = {name: 0 for name in mix}
+
+    async def request(self, name: str):
+        method, path = ENDPOINTS[name]
+        body = next(self.posts) if method == "POST" else None
+        start = time.perf_counter()
+        try:
+            resp = await self.client.request(method, path, json=body)
+            ok = resp.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        elapsed = (time.perf_counter() - start) * 1000
+        if ok:
+            self.latencies[name].append(elapsed)
+        else:
+            self.errors[name] += 1
+
+    async def worker(self, deadline: float):
+        while time.monotonic() < deadline:
+            await self.request(self.rng.choices(self.names, self.weights)[0])
+
+    async def run(self, concurrency: int, duration: float) -> float:
+        start = time.monotonic()
+        deadline = start + duration
+        await asyncio.gather(*(self.worker(deadline) for _ in range(concurrency)))
+        return time.monotonic() - start
+
+    def summary(self, elapsed: float) -> dict:
+        endpoints = {}
+        for name in self.names:
+            values = sorted(self.latencies[name])
+            endpoints[name] = {
+                "requests": len(values),
+                "errors": self.errors[name],
+                "rps": len(values) / elapsed,
+                "p50_ms": percentile(values, 0.50),
+                "p95_ms": percentile(values, 0.95),
+                "p99_ms": percentile(values, 0.99),
+                "max_ms": values[-1] if values else 0.0,
+            }
+        total = sum(e["requests"] for e in endpoints.values())
+        return {"elapsed_s": elapsed, "total_rps": total / elapsed, "endpoints": endpoints}
+
+
+async def preload(client: httpx.AsyncClient, posts: int, seed: int):
+    """Fill the database through the batch endpoint so reads have something to aggregate."""
+    chunk = []
+    # a different seed than the load phase, so its post ids don't collide
+    for payload in generate_posts(CorpusSpec(posts=posts, seed=seed + 1)):
+        chunk.append(payload)
+        if len(chunk) == 1000:
+            (await client.post("/api/posts/batch", json=chunk)).raise_for_status()
+            chunk = []
+    if chunk:
+        (await client.post("/api/posts/batch", json=chunk)).raise_for_status()
+    (await client.post("/api/alerts/evaluate")).raise_for_status()
+
+
+def _env(tmpdir: str) -> dict:
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir, 'load.db')}"
+    env.setdefault("ALERT_EVAL_INTERVAL", "10")
+    env.setdefault("NEO4J_URI", "memory://")
+    return env
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _drive(client: httpx.AsyncClient, pid: int, args) -> dict:
+    if args.preload:
+        print(f"preloading {args.preload} posts", file=sys.stderr)
+        await preload(client, args.preload, args.seed)
+    load = LoadRun(client, parse_mix(args.mix), args.seed)
+    sampler = ProcessSampler(pid)
+    stop = asyncio.Event()
+    sampling = asyncio.create_task(sampler.run(stop))
+    print(f"running {args.concurrency} clients for {args.duration:g}s", file=sys.stderr)
+    elapsed = await load.run(args.concurrency, args.duration)
+    stop.set()
+    await sampling
+    result = load.summary(elapsed)
+    result["server"] = sampler.summary()
+    return result
+
+
+async def run_inprocess(args, tmpdir: str) -> dict:
+    os.environ.update(_env(tmpdir))
+    from app.main import app
+
+    lifespan = app.router.lifespan_context(app)
+    await lifespan.__aenter__()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            return await _drive(client, os.getpid(), args)
+    finally:
+        await lifespan.__aexit__(None, None, None)
+
+
+async def run_uvicorn(args, tmpdir: str) -> dict:
+    port = _free_port()
+    cmd = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port), "--workers", str(args.workers), "--log-level", "warning",
+    ]
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    server = subprocess.Popen(cmd, cwd=backend, env=_env(tmpdir))
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60, limits=limits) as client:
+            for _ in range(300):
+                try:
+                    if (await client.get("/")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if server.poll() is not None:
+                    raise SystemExit("uvicorn exited during startup")
+                await asyncio.sleep(0.1)
+            else:
+                raise SystemExit("uvicorn did not become ready")
+            return await _drive(client, server.pid, args)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def report(result: dict):
+    print(f"{'endpoint':12s} {'req':>7} {'err':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}", file=sys.stderr)
+    for name, e in result["endpoints"].items():
+        print(
+            f"{name:12s} {e['requests']:7d} {e['errors']:5d} {e['rps']:8.1f} "
+            f"{e['p50_ms']:8.1f} {e['p95_ms']:8.1f} {e['p99_ms']:8.1f} {e['max_ms']:8.1f}",
+            file=sys.stderr,
+        )
+    print(f"total {result['total_rps']:.1f} req/s over {result['elapsed_s']:.1f}s", file=sys.stderr)
+    server = result.get("server")
+    if server:
+        print(
+            f"server cpu {server['cpu_percent_mean']:.0f}% mean, {server['cpu_percent_p95']:.0f}% p95; "
+            f"rss {server['rss_mib_start']:.0f} -> {server['rss_mib_end']:.0f} MiB (max {server['rss_mib_max']:.0f})",
+            file=sys.stderr,
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("inprocess", "uvicorn"), default="inprocess")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"endpoint=weight list from: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--preload", type=int, default=5000, help="posts written before the timed phase")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    tmpdir = tempfile.mkdtemp(prefix="aic-load-")
+    runner = run_uvicorn if args.mode == "uvicorn" else run_inprocess
+    result = asyncio.run(runner(args, tmpdir))
+    result["meta"] = {
+        "started_at": datetime.utcnow().isoformat(),
+        "mode": args.mode,
+        "workers": args.workers if args.mode == "uvicorn" else None,
+        "mix": parse_mix(args.mix),
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "preload": args.preload,
+        "cpu_count": os.cpu_count(),
+    }
+    report(result)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
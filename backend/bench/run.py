@@ -0,0 +1,289 @@
+"""Benchmark the detection and analytics hot paths on a synthetic corpus.
+
+Run from backend/:
+
+    python -m bench.run --posts 1000,10000,100000 --out bench-main.json
+    python -m bench.run --compare bench-main.json bench-branch.json --threshold 0.15
+
+Each volume gets a fresh SQLite database in a temp directory and empty
+in-process caches (embeddings, responses, burst detectors). The same seed
+and corpus parameters give the same posts on every commit, so two result
+files can be compared directly.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from .synthetic import CorpusSpec, generate_posts
+
+
+INGEST_CHUNK = 1000
+ANALYZE_SAMPLE = 1000
+
+
+def timed(fn, repeat: int, warmup: int = 1) -> dict:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "n": len(samples),
+        "min_ms": min(samples),
+        "median_ms": statistics.median(samples),
+        "mean_ms": statistics.fmean(samples),
+        "max_ms": max(samples),
+    }
+
+
+def _git_rev() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _configure(tmpdir: str):
+    # must run before the app is imported: engines and caches read the environment at import time
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    os.environ.setdefault("ALERT_EVAL_INTERVAL", "0")
+    os.environ.setdefault("NEO4J_URI", "memory://")
+    os.environ.setdefault("RESPONSE_CACHE_TTL", "0")  # time the handlers, not cache hits
+    os.environ.setdefault("EMBED_CACHE_PATH", "")  # memory tier only, so runs don't share warm vectors
+
+
+def run_volume(spec: CorpusSpec, repeat: int) -> dict:
+    from fastapi.testclient import TestClient
+
+    from app import models
+    from app.db import SessionLocal, async_engine, async_read_engine, engine
+    from app.main import app
+    from app.services.bursts import BurstTracker, get_burst_tracker
+    from app.services.detection import bot_likelihood, burst_score, coordination_score, evaluate_alerts
+    from app.services.ingest import BatchWriter
+    from app.services.nlp import analyze_post, analyze_posts, clear_embedding_caches
+    from app.services.profiles import author_bot_scores, get_profile_writer
+    from app.services.rollups import query_trends, top_authors
+    from app.services.response_cache import get_response_cache
+    from app.services.window_state import get_window_state
+
+    # a new file rather than drop_all, so page layout and indexes start clean too;
+    # every pool is emptied first so no connection still points at the old file
+    engine.dispose()
+    for pool_engine in {async_engine, async_read_engine}:
+        asyncio.run(pool_engine.dispose())
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(engine.url.database + suffix):
+            os.remove(engine.url.database + suffix)
+    models.Base.metadata.create_all(bind=engine)
+    clear_embedding_caches()
+    get_response_cache().clear()
+    with get_burst_tracker().lock:
+        get_burst_tracker().streams.clear()
+    state = get_window_state()
+    state.clear()
+
+    timings: dict[str, dict] = {}
+    texts: list[str] = []
+
+    def ingest():
+        chunk = []
+        for payload in generate_posts(spec):
+            if len(texts) < ANALYZE_SAMPLE:
+                texts.append(payload["text"])
+            chunk.append(payload)
+            if len(chunk) == INGEST_CHUNK:
+                _write(chunk)
+                chunk = []
+        if chunk:
+            _write(chunk)
+
+    def _write(chunk):
+        db = SessionLocal()
+        try:
+            writer = BatchWriter(db)
+            for payload in chunk:
+                writer.add(payload)
+            writer.commit()
+        finally:
+            db.close()
+
+    timings["ingest"] = timed(ingest, 1, warmup=0)
+    timings["ingest"]["posts_per_s"] = spec.posts / (timings["ingest"]["median_ms"] / 1000)
+    # profiles are folded in the background; what is still queued once ingest returns
+    timings["profile_backlog"] = timed(lambda: get_profile_writer().flush(timeout=600), 1, warmup=0)
+
+    timings["analyze_post"] = timed(lambda: [analyze_post(t) for t in texts], repeat)
+    timings["analyze_posts"] = timed(lambda: analyze_posts(texts), repeat)
+
+    def rebuild():
+        db = SessionLocal()
+        try:
+            state.rebuild(db)
+        finally:
+            db.close()
+
+    timings["window_rebuild"] = timed(rebuild, repeat)
+
+    def replay_bursts():
+        # every post in the window through a fresh set of streaming detectors
+        db = SessionLocal()
+        try:
+            BurstTracker().rebuild(db)
+        finally:
+            db.close()
+
+    timings["burst_replay"] = timed(replay_bursts, repeat)
+
+    def evaluate(cold: bool):
+        if cold:
+            with state.lock:
+                for group in state.groups.values():
+                    group.scores = None
+        db = SessionLocal()
+        try:
+            evaluate_alerts(db, state)
+        finally:
+            db.close()
+
+    timings["evaluate_alerts_cold"] = timed(lambda: evaluate(True), repeat)
+    timings["evaluate_alerts_warm"] = timed(lambda: evaluate(False), repeat)
+
+    # the single biggest hashtag group is the worst case for the pairwise detectors
+    with state.lock:
+        largest = max(state.groups.values(), key=lambda g: g.count, default=None)
+        posts = list(largest.posts) if largest else []
+    timings["burst_score"] = timed(lambda: burst_score(posts), repeat)
+    timings["coordination_score"] = timed(lambda: coordination_score(posts), repeat)
+    with SessionLocal() as db:
+        profiles = author_bot_scores(db, {p.author_id for p in posts})
+    timings["bot_likelihood"] = timed(lambda: bot_likelihood(posts, profiles), repeat)
+
+    def in_session(fn, **kw):
+        db = SessionLocal()
+        try:
+            return fn(db, **kw)
+        finally:
+            db.close()
+
+    timings["query_trends"] = timed(lambda: in_session(query_trends, bucket="5m", hours=24), repeat)
+    timings["top_authors"] = timed(lambda: in_session(top_authors, k=20, hours=72), repeat)
+
+    client = TestClient(app)
+    for name, path in (
+        ("GET /api/analytics/trends", "/api/analytics/trends?bucket=5m"),
+        ("GET /api/analytics/influencers", "/api/analytics/influencers"),
+        ("GET /api/posts/", "/api/posts/?stance=anti&limit=200"),
+        ("GET /api/dashboard/snapshot", "/api/dashboard/snapshot"),
+    ):
+        timings[name] = timed(lambda: client.get(path).raise_for_status(), repeat)
+
+    with SessionLocal() as db:
+        alerts = db.query(models.Alert).count()
+    return {
+        "spec": spec.to_dict(),
+        "counts": {"groups": len(state.groups), "largest_group": len(posts), "alerts": alerts},
+        "timings": timings,
+    }
+
+
+def run(args) -> dict:
+    volumes = [int(v) for v in args.posts.split(",")]
+    tmpdir = tempfile.mkdtemp(prefix="aic-bench-")
+    _configure(tmpdir)
+    results = {
+        "meta": {
+            "git_rev": _git_rev(),
+            "started_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat,
+        },
+        "runs": [],
+    }
+    for posts in volumes:
+        spec = CorpusSpec(
+            posts=posts,
+            seed=args.seed,
+            hashtags=args.hashtags,
+            skew=args.skew,
+            authors=args.authors,
+            bot_ratio=args.bot_ratio,
+            hindi_ratio=args.hindi_ratio,
+        )
+        print(f"-- {posts} posts", file=sys.stderr)
+        result = run_volume(spec, args.repeat)
+        for name, t in result["timings"].items():
+            print(f"{name:36s} {t['median_ms']:10.2f} ms", file=sys.stderr)
+        results["runs"].append(result)
+    return results
+
+
+def compare(old: dict, new: dict, threshold: float) -> int:
+    """Print median changes per (volume, measurement); returns the number of regressions."""
+    def by_key(results):
+        return {
+            (r["spec"]["posts"], name): t["median_ms"]
+            for r in results["runs"]
+            for name, t in r["timings"].items()
+        }
+
+    before, after = by_key(old), by_key(new)
+    regressions = 0
+    print(f"{'posts':>8}  {'measurement':36s} {'old ms':>10} {'new ms':>10} {'change':>8}")
+    for key in sorted(before.keys() & after.keys()):
+        a, b = before[key], after[key]
+        change = (b - a) / a if a else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{key[0]:>8}  {key[1]:36s} {a:10.2f} {b:10.2f} {change:+8.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", default="1000,10000", help="comma-separated corpus sizes")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--hashtags", type=int, default=200)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of hashtag popularity")
+    parser.add_argument("--authors", type=int, default=2000)
+    parser.add_argument("--bot-ratio", type=float, default=0.1)
+    parser.add_argument("--hindi-ratio", type=float, default=0.3)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    parser.add_argument("--threshold", type=float, default=0.15, help="median slowdown that counts as a regression")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            old = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        sys.exit(1 if compare(old, new, args.threshold) else 0)
+
+    results = run(args)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Seeded synthetic post corpus for benchmarks.
+
+The same seed and parameters always produce the same posts, so runs on
+different commits measure the same workload.
+"""
+import random
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Iterator
+
+
+PLATFORMS = ("twitter", "reddit", "youtube")
+
+EN_PHRASES = [
+    "boycott india", "break india", "india threat", "fake india", "jai hind", "incredible india",
+    "india policy", "india analysis", "digital india", "proud india", "ban india", "india review",
+]
+EN_WORDS = [
+    "the", "people", "government", "election", "economy", "border", "news", "today", "again",
+    "watch", "share", "truth", "media", "report", "protest", "support", "against", "why",
+]
+HI_WORDS = [
+    "भारत", "सरकार", "लोग", "चुनाव", "खबर", "आज", "सच", "देश", "विरोध", "समर्थन", "मीडिया", "जय", "हिंद",
+]
+
+
+@dataclass
+class CorpusSpec:
+    posts: int = 10_000
+    seed: int = 42
+    hashtags: int = 200
+    skew: float = 1.1  # Zipf exponent of hashtag popularity; 0 = uniform
+    authors: int = 2_000
+    bot_ratio: float = 0.1  # share of posts from bot accounts reposting near-duplicates
+    bot_accounts: int = 50
+    hindi_ratio: float = 0.3
+    span_hours: float = 5.0  # posts are spread over this many hours ending now; keep inside the 6 h window
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _text(rng: random.Random, hindi: bool) -> str:
+    words = HI_WORDS if hindi else EN_WORDS
+    body = [rng.choice(words) for _ in range(rng.randint(6, 20))]
+    if rng.random() < 0.6:
+        body.insert(rng.randrange(len(body) + 1), rng.choice(EN_PHRASES))
+    return " ".join(body)
+
+
+def generate_posts(spec: CorpusSpec, now: datetime | None = None) -> Iterator[dict]:
+    """Yield `spec.posts` ingest payloads (the POST /api/posts/ schema), oldest first.
+
+    Organic posts pick a hashtag by Zipf rank and an author uniformly.
+    Bot posts come from a small pool of accounts that repost a few template
+    texts with one word changed, in tight bursts on a handful of hashtags,
+    which is what the coordination and bot detectors look for.
+    """
+    rng = random.Random(spec.seed)
+    now = now or datetime.utcnow()
+    start = now - timedelta(hours=spec.span_hours)
+    step = spec.span_hours * 3600 / max(1, spec.posts)
+
+    tags = [f"tag{i}" for i in range(spec.hashtags)]
+    weights = [1.0 / (rank + 1) ** spec.skew for rank in range(spec.hashtags)]
+    cumulative = []
+    total = 0.0
+    for w in weights:
+        total += w
+        cumulative.append(total)
+
+    campaigns = [
+        {
+            "tag": rng.choice(tags[: max(1, spec.hashtags // 10)]),
+            "template": _text(rng, rng.random() < spec.hindi_ratio).split(),
+        }
+        for _ in range(5)
+    ]
+
+    for i in range(spec.posts):
+        created_at = start + timedelta(seconds=i * step + rng.random() * step)
+        if rng.random() < spec.bot_ratio:
+            campaign = rng.choice(campaigns)
+            words = list(campaign["template"])
+            words[rng.randrange(len(words))] = rng.choice(EN_WORDS)
+            author = f"bot{rng.randrange(spec.bot_accounts)}"
+            text = " ".join(words)
+            hashtags = [campaign["tag"]]
+        else:
+            author = f"user{rng.randrange(spec.authors)}"
+            text = _text(rng, rng.random() < spec.hindi_ratio)
+            hashtags = [tags[_bisect(cumulative, rng.random() * total)]]
+            if rng.random() < 0.3:
+                hashtags.append(rng.choice(tags))
+        yield {
+            "id": f"syn_{spec.seed}_{i}",
+            "platform": PLATFORMS[i % len(PLATFORMS)],
+            "author_id": author,
+            "author_handle": f"@{author}",
+            "text": text,
+            "hashtags": hashtags,
+            "mentions": [],
+            "meta": {"likes": rng.randrange(1000)},
+            "created_at": created_at.isoformat(),
+        }
+
+
+def _bisect(cumulative: list[float], x: float) -> int:
+    lo, hi = 0, len(cumulative) - 1
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if cumulative[mid] < x:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
@@ -0,0 +1,30 @@
+import os
+import tempfile
+
+import pytest
+
+# the app reads these at import time, so they are set before any test module imports it
+_tmp = tempfile.mkdtemp(prefix="aic-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/test.db")
+os.environ.setdefault("ALERT_EVAL_INTERVAL", "0")
+os.environ.setdefault("NEO4J_URI", "memory://")
+
+
+@pytest.fixture
+def db():
+    """A session on freshly created, empty tables."""
+    from app import models
+    from app.db import SessionLocal, engine
+    from app.services.matcher import invalidate_matcher
+    from app.services.profiles import get_profile_writer
+
+    # folds queued by an earlier test would land in the fresh tables
+    get_profile_writer().flush()
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    invalidate_matcher()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
@@ -0,0 +1,103 @@
+import random
+from datetime import datetime, timedelta
+
+from app.services.bursts import BURST_THRESHOLD, BurstDetector, BurstTracker
+
+T0 = datetime(2024, 1, 1)
+
+
+def feed(detector: BurstDetector, start: datetime, gap: float, n: int) -> tuple[datetime, list[datetime]]:
+    """Observe n posts `gap` seconds apart after `start`; returns the last time and the onset times."""
+    onsets, ts = [], start
+    for _ in range(n):
+        ts += timedelta(seconds=gap)
+        if detector.observe(ts):
+            onsets.append(ts)
+    return ts, onsets
+
+
+def test_a_steady_stream_never_bursts():
+    # with every gap above a third of the mean S can only fall
+    rng = random.Random(7)
+    detector, ts = BurstDetector(), T0
+    for _ in range(2000):
+        ts += timedelta(seconds=rng.uniform(45, 75))
+        assert not detector.observe(ts)
+    assert detector.active is None and not detector.history
+    assert abs(detector.state()["baseline_gap_seconds"] - 60) < 10
+
+
+def test_a_rate_jump_opens_a_burst_starting_at_the_change_point():
+    detector = BurstDetector()
+    change, onsets = feed(detector, T0, 60, 50)
+    assert not onsets
+    end, onsets = feed(detector, change, 6, 30)
+    assert len(onsets) == 1
+    burst = detector.active
+    assert burst.start == change
+    # each fast gap adds log 3 - 0.2 to S, so it crosses the threshold within a dozen posts
+    assert onsets[0] <= change + timedelta(seconds=6 * 12)
+    assert burst.detected_at == onsets[0]
+    # the post at the change point opens the burst interval
+    assert burst.posts == 31
+    assert detector.cusum == 2 * BURST_THRESHOLD
+    # gaps inside an open burst do not move the baseline
+    mean = detector.mean
+    feed(detector, end, 6, 10)
+    assert detector.mean == mean
+
+
+def test_the_burst_closes_once_the_rate_returns_to_baseline():
+    detector = BurstDetector()
+    change, _ = feed(detector, T0, 60, 50)
+    end, _ = feed(detector, change, 6, 30)
+    _, onsets = feed(detector, end, 60, 30)
+    assert not onsets
+    assert detector.active is None
+    (burst,) = detector.history
+    assert burst.start == change
+    assert end < burst.end < end + timedelta(minutes=30)
+    # a second jump opens a new burst
+    _, onsets = feed(detector, detector.last, 6, 30)
+    assert len(onsets) == 1 and len(detector.history) == 1
+
+
+def test_settle_closes_a_burst_that_went_quiet():
+    detector = BurstDetector()
+    change, _ = feed(detector, T0, 60, 50)
+    end, _ = feed(detector, change, 6, 30)
+    # S = 16 drains at (k - 1)·λ0 per second with no posts
+    drained = end + timedelta(seconds=detector.cusum / detector._drain_rate())
+    detector.settle(drained - timedelta(seconds=10))
+    assert detector.active is not None
+    detector.settle(drained + timedelta(seconds=10))
+    assert detector.active is None
+    assert detector.history[-1].end == drained
+
+
+def test_out_of_order_posts_count_but_add_no_gap():
+    detector = BurstDetector()
+    change, _ = feed(detector, T0, 60, 50)
+    n, mean = detector.n, detector.mean
+    assert not detector.observe(change - timedelta(minutes=5))
+    assert detector.posts == 51 and detector.n == n and detector.mean == mean and detector.last == change
+
+
+def test_tracker_reports_onsets_per_normalized_tag_and_keyword():
+    tracker = BurstTracker()
+    rows, ts = [], T0
+    for i in range(80):
+        ts += timedelta(seconds=60 if i < 50 else 6)
+        rows.append({"created_at": ts, "hashtags": ["#Storm", "#storm"], "keywords": ["flood"] if i >= 50 else []})
+    random.Random(1).shuffle(rows)
+    onsets = tracker.observe_posts(rows)
+    assert [(e["kind"], e["key"]) for e in onsets] == [("hashtag", "storm")]
+    assert onsets[0]["start"] == T0 + timedelta(seconds=60 * 50)
+    assert 60 <= onsets[0]["baseline_posts_per_hour"] < 3600 / 6
+    # the keyword stream only exists since the jump, so its fast rate is its baseline
+    (kw,) = tracker.snapshot(kind="keyword", key="flood", now=ts)
+    assert not kw["warming_up"] and kw["active"] is None and kw["baseline_gap_seconds"] == 6
+    (tag,) = tracker.snapshot(active_only=True, now=ts)
+    assert tag["key"] == "storm"
+    # stats settle against the wall clock, long after these posts
+    assert tracker.stats() == {"streams": 2, "active": {"hashtag": 0, "keyword": 0}, "onsets": 1}
@@ -0,0 +1,64 @@
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services.detection import COORD_BLOCK_ROWS, _count_windowed_pairs, coordination_score
+from app.services.nlp import embed_texts
+
+
+def coordination_loop(posts) -> float:
+    """The original pure-Python triple loop that coordination_score replaced."""
+    emb = embed_texts([p.text for p in posts]).tolist()
+    n = len(emb)
+    times = [p.created_at.timestamp() for p in posts]
+    coord_pairs = 0
+    for i in range(n):
+        for j in range(i + 1, n):
+            dot = sum(emb[i][k] * emb[j][k] for k in range(len(emb[i])))
+            sim = max(0.0, min(1.0, dot))
+            if sim > 0.85 and abs(times[i] - times[j]) <= 900:
+                coord_pairs += 1
+    return float(min(100.0, 100.0 * coord_pairs / max(1, n * (n - 1) // 2)))
+
+
+def random_posts(rng: random.Random, n: int) -> list[SimpleNamespace]:
+    # a small vocabulary so identical texts land close together; some timestamps repeat
+    texts = [f"campaign message {k}" for k in range(12)]
+    start = datetime(2024, 1, 1)
+    return [
+        SimpleNamespace(text=rng.choice(texts), created_at=start + timedelta(seconds=rng.choice([0, rng.randrange(7200)])))
+        for _ in range(n)
+    ]
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_coordination_score_matches_the_loop(seed):
+    rng = random.Random(seed)
+    for n in (3, 17, 120):
+        posts = random_posts(rng, n)
+        assert coordination_score(posts) == pytest.approx(coordination_loop(posts))
+
+
+def test_fewer_than_three_posts_score_zero():
+    posts = random_posts(random.Random(0), 2)
+    assert coordination_score(posts) == 0.0
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_blocked_pair_count_matches_all_pairs(seed):
+    rng = np.random.default_rng(seed)
+    n = 3 * COORD_BLOCK_ROWS + 17
+    times = np.sort(rng.choice(np.arange(0, 20000, 5.0), size=n))
+    vectors = rng.normal(size=(8, 32))[rng.integers(8, size=n)] + rng.normal(scale=0.3, size=(n, 32))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    sims = vectors @ vectors.T
+    expected = sum(
+        1
+        for i in range(n)
+        for j in range(i + 1, n)
+        if times[j] - times[i] <= 900 and sims[i, j] > 0.85
+    )
+    assert _count_windowed_pairs(times, vectors, 900.0, 0.85) == expected
@@ -0,0 +1,95 @@
+import os
+
+import numpy as np
+import pytest
+
+from app.services.embedding_cache import DiskTier, text_digest
+
+
+def test_vectors_survive_a_reopen(tmp_path):
+    path = str(tmp_path / "emb")
+    vec = np.arange(8, dtype=np.float32)
+    tier = DiskTier(path, dim=8, slots=64)
+    assert tier.put(text_digest("hello"), vec)
+    tier.flush()
+    reopened = DiskTier(path, dim=8, slots=64, readonly=True)
+    np.testing.assert_array_equal(reopened.get(text_digest("HELLO")), vec)
+    assert reopened.get(text_digest("other")) is None
+
+
+def test_a_different_dimension_recreates_the_files(tmp_path):
+    path = str(tmp_path / "emb")
+    tier = DiskTier(path, dim=8, slots=64)
+    tier.put(text_digest("hello"), np.ones(8, dtype=np.float32))
+    tier.flush()
+    with pytest.raises(ValueError):
+        DiskTier(path, dim=16, slots=64, readonly=True)
+    tier = DiskTier(path, dim=16, slots=32)
+    assert tier.slots == 32
+    assert tier.get(text_digest("hello")) is None
+    assert os.path.getsize(f"{path}.vecs") == 32 * 16 * 4
+
+
+def test_a_header_that_does_not_match_is_refused(tmp_path):
+    path = str(tmp_path / "emb")
+    DiskTier(path, dim=8, slots=64).flush()
+    with open(f"{path}.meta", "w") as f:
+        f.write('{"version": 0}')
+    with pytest.raises(ValueError):
+        DiskTier(path, dim=8, slots=64, readonly=True)
+
+
+def test_files_without_a_header_are_checked_by_size(tmp_path):
+    path = str(tmp_path / "emb")
+    tier = DiskTier(path, dim=8, slots=64)
+    tier.put(text_digest("hello"), np.ones(8, dtype=np.float32))
+    tier.flush()
+    os.remove(f"{path}.meta")
+    assert DiskTier(path, dim=8, slots=64, readonly=True).get(text_digest("hello")) is not None
+    with pytest.raises(ValueError):
+        DiskTier(path, dim=4, slots=64, readonly=True)
+
+
+class WideModel:
+    """Stand-in for a real embedding model; its dimension is only known from its output."""
+
+    def predict(self, texts):
+        return [np.full(384, len(text), dtype=np.float32) for text in texts]
+
+
+@pytest.fixture
+def batched_nlp(monkeypatch, tmp_path):
+    from app.services import nlp
+    monkeypatch.setenv("EMBED_CACHE_PATH", str(tmp_path / "emb"))
+    monkeypatch.setattr(nlp, "INFERENCE_BATCHING", True)
+    nlp.clear_embedding_caches()
+    yield nlp
+    nlp.shutdown_batchers()
+    nlp.clear_embedding_caches()
+
+
+def test_embeddings_take_the_model_dimension_and_cache_per_model(batched_nlp):
+    nlp = batched_nlp
+    default = nlp.embed_texts(["a", "bb"])
+    assert default.shape == (2, nlp.EMBED_DIM)
+
+    nlp.set_model("embedding", WideModel())
+    wide = nlp.embed_texts(["a", "bb", "a"])
+    assert wide.shape == (3, 384)
+    np.testing.assert_array_equal(wide[:, 0], [1, 2, 1])
+    model_id, dim = nlp.embedding_space()
+    assert dim == 384 and model_id.endswith("WideModel")
+    # the same texts from another model are separate cache entries and files
+    assert nlp.get_embedding_cache().stats()["items"] == 2
+    assert nlp.get_embedding_cache(("hash-v1", nlp.EMBED_DIM)) is not nlp.get_embedding_cache()
+    nlp.flush_embedding_cache()
+    meta = sorted(p for p in os.listdir(os.path.dirname(os.environ["EMBED_CACHE_PATH"])) if p.endswith(".meta"))
+    assert meta == ["emb.hash-v1-64.meta", f"emb.{model_id}-384.meta"]
+
+
+def test_a_model_returning_the_wrong_dimension_is_an_error(batched_nlp):
+    from app.services.inference import DummyModel
+    nlp = batched_nlp
+    nlp.set_model("embedding", DummyModel(lambda text: np.zeros(8), model_id="liar", dim=16))
+    with pytest.raises(ValueError):
+        nlp.embed_texts(["text"])
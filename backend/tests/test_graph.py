@@ -0,0 +1,139 @@
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.services import graph
+from app.services.graph import CircuitBreaker, GraphService, InMemoryGraphDriver
+
+
+def make_posts(n: int, tag: str = "test") -> list[SimpleNamespace]:
+    return [
+        SimpleNamespace(
+            id=f"p{i}",
+            author_id=f"u{i % 3}",
+            author_handle=f"user{i % 3}",
+            platform="x",
+            text=f"post {i}",
+            language="en",
+            toxicity=0.1,
+            stance="neutral",
+            created_at=datetime(2024, 1, 1),
+            hashtags=[f"#{tag}"],
+        )
+        for i in range(n)
+    ]
+
+
+class FailingDriver(InMemoryGraphDriver):
+    def execute_write(self, fn, *args, **kwargs):
+        self.transactions += 1
+        raise ConnectionError("graph unreachable")
+
+
+def test_posts_are_written_in_batches():
+    driver = InMemoryGraphDriver()
+    service = GraphService(driver=driver, batch_size=10, flush_interval=0.05)
+    try:
+        service.upsert_posts(make_posts(25))
+        service.flush()
+        assert service.stats()["written"] == 25
+        assert service.stats()["dropped"] == 0
+        assert len(driver.posts) == 25
+        assert ("p0", "#test") in driver.tagged
+        assert len(driver.users) == 3
+    finally:
+        service.close()
+
+
+def test_failed_writes_open_the_breaker_and_drop_rows():
+    driver = FailingDriver()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60.0)
+    service = GraphService(driver=driver, batch_size=1, flush_interval=0.05, breaker=breaker)
+    try:
+        service.upsert_posts(make_posts(2))
+        service.flush()
+        assert breaker.state == "open"
+        assert service.stats()["dropped"] == 2
+
+        # with the breaker open nothing is queued or sent to the driver
+        calls = driver.transactions
+        service.upsert_posts(make_posts(100))
+        assert service.stats()["queued"] == 0
+        assert service.stats()["dropped"] == 102
+        service.flush()
+        assert driver.transactions == calls
+    finally:
+        service.close()
+
+
+def test_breaker_half_opens_after_the_cooldown():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    # a failed probe reopens it, a successful one closes it
+    breaker.record_failure()
+    assert breaker.state == "open"
+    time.sleep(0.06)
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_full_buffer_waits_once_per_call_then_drops_the_rest():
+    service = GraphService(driver=InMemoryGraphDriver(), max_buffer=5, enqueue_timeout=0.1, flush_interval=0.05)
+    try:
+        start = time.monotonic()
+        service.upsert_posts(make_posts(1000))
+        elapsed = time.monotonic() - start
+        assert elapsed < 0.5
+        assert service.stats()["dropped"] == 995
+        service.flush()
+        assert service.stats()["written"] == 5
+    finally:
+        service.close()
+
+
+class UnreachableDriver:
+    instances = []
+
+    def __init__(self, uri, auth=None):
+        self.closed = False
+        UnreachableDriver.instances.append(self)
+
+    def verify_connectivity(self):
+        raise ConnectionError("graph unreachable")
+
+    def close(self):
+        self.closed = True
+
+
+def test_failed_connect_closes_the_driver(monkeypatch):
+    monkeypatch.setenv("NEO4J_URI", "bolt://unreachable:7687")
+    monkeypatch.setattr(graph, "GraphDatabase", SimpleNamespace(driver=UnreachableDriver))
+    service = GraphService(batch_size=1, flush_interval=0.05)
+    service.enabled = True
+    try:
+        service.upsert_posts(make_posts(1))
+        service.flush()
+        assert service.driver is None
+        assert service.stats()["dropped"] == 1
+        assert UnreachableDriver.instances and all(d.closed for d in UnreachableDriver.instances)
+    finally:
+        service.close()
+
+
+def test_concurrent_drops_are_all_counted():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60.0)
+    breaker.record_failure()
+    service = GraphService(driver=InMemoryGraphDriver(), breaker=breaker)
+    posts = make_posts(10)
+    threads = [threading.Thread(target=lambda: [service.upsert_posts(posts) for _ in range(200)]) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert service.stats()["dropped"] == 8 * 200 * 10
+    service.close()
@@ -0,0 +1,81 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import models
+from app.services.hashtags import normalize_tag, posts_for_tag, rebuild_post_hashtags, tag_rows, top_hashtags
+from app.services.ingest import write_rows
+
+
+def post_row(i: int, created_at: datetime, hashtags: list[str]) -> dict:
+    return {
+        "id": f"p{i:03d}", "platform": "x", "author_id": "a", "author_handle": "a", "text": f"post {i}",
+        "language": "en", "toxicity": 0.0, "stance": "neutral", "hashtags": hashtags, "mentions": [], "meta": {},
+        "created_at": created_at, "keywords": [],
+    }
+
+
+@pytest.fixture
+def posts(db):
+    rng = random.Random(8)
+    start = datetime.utcnow() - timedelta(hours=2)
+    spellings = ["#Modi", "modi", " #MODI ", "#cricket", "#Cricket", "#", "#farmers", ""]
+    rows = [
+        post_row(i, start + timedelta(seconds=rng.choice([0, 60, 120])), rng.sample(spellings, k=rng.randrange(0, 4)))
+        for i in range(300)
+    ]
+    write_rows(db, rows)
+    db.commit()
+    return db, rows
+
+
+def tagged(rows, tag: str) -> list[str]:
+    ordered = sorted(
+        (r for r in rows if tag in {normalize_tag(t) for t in r["hashtags"]}),
+        key=lambda r: (r["created_at"], r["id"]),
+        reverse=True,
+    )
+    return [r["id"] for r in ordered]
+
+
+def test_tag_rows_normalize_and_deduplicate():
+    rows = tag_rows(post_row(1, datetime(2024, 1, 1), ["#", "#Modi", "modi", "#cricket"]))
+    assert [(r["tag"], r["position"]) for r in rows] == [("modi", 0), ("cricket", 1)]
+
+
+@pytest.mark.parametrize("limit", [1, 9, 500])
+@pytest.mark.parametrize("tag", ["#MODI", "cricket", "farmers"])
+def test_tag_pages_cover_every_tagged_post_once(posts, tag, limit):
+    db, rows = posts
+    ids, cursor = [], None
+    while True:
+        page, cursor = posts_for_tag(db, tag, limit=limit, cursor=cursor)
+        ids += [p.id for p in page]
+        if cursor is None:
+            break
+    assert ids == tagged(rows, normalize_tag(tag))
+
+
+def test_reingest_moves_a_post_between_tags(posts):
+    db, rows = posts
+    row = dict(rows[0], hashtags=["#brandnew"])
+    write_rows(db, [row])
+    db.commit()
+    assert [p.id for p in posts_for_tag(db, "brandnew")[0]] == [row["id"]]
+    for tag in ("modi", "cricket", "farmers"):
+        assert row["id"] not in [p.id for p in posts_for_tag(db, tag, limit=1000)[0]]
+
+
+def test_rebuild_matches_incremental_index(posts):
+    db, _ = posts
+    ph = models.PostHashtag
+    before = sorted(db.query(ph.post_id, ph.tag, ph.position, ph.created_at).all())
+    rebuild_post_hashtags(db)
+    assert sorted(db.query(ph.post_id, ph.tag, ph.position, ph.created_at).all()) == before
+
+
+def test_top_hashtags_count_posts_per_tag(posts):
+    db, rows = posts
+    counts = {tag: len(tagged(rows, tag)) for tag in ("modi", "cricket", "farmers")}
+    assert {t["tag"]: t["posts"] for t in top_hashtags(db, hours=24)} == counts
@@ -0,0 +1,65 @@
+from concurrent.futures import wait
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app import models
+from app.db import SessionLocal
+from app.services.ingest import BatchWriter, GroupWriter, get_post_writer
+
+NOW = datetime.utcnow().replace(microsecond=0)
+
+
+def payload(i: int, text: str | None = None) -> dict:
+    return {
+        "id": f"p{i}", "platform": "x", "author_id": f"a{i % 3}", "author_handle": f"user{i % 3}",
+        "text": text or f"post {i}", "hashtags": ["#t"], "created_at": (NOW - timedelta(seconds=i)).isoformat(),
+    }
+
+
+def row(i: int, text: str | None = None) -> dict:
+    p = payload(i, text)
+    return {**p, "language": "en", "toxicity": 0.1, "stance": "neutral", "mentions": [], "meta": {},
+            "created_at": NOW - timedelta(seconds=i), "keywords": []}
+
+
+def stored(db):
+    posts = db.execute(select(func.count()).select_from(models.Post)).scalar()
+    counted = db.execute(
+        select(func.sum(models.TrendBucket.post_count)).where(models.TrendBucket.resolution == 60)
+    ).scalar()
+    return posts, counted
+
+
+def test_each_flush_commits_its_chunk(db):
+    writer = BatchWriter(db)
+    for i in range(5):
+        writer.add(payload(i))
+    writer.flush()
+    with SessionLocal() as other:
+        assert stored(other) == (5, 5)
+    # a later chunk resends p0: it supersedes the stored post without counting it twice
+    writer.add(payload(0, "edited"))
+    writer.add(payload(5))
+    result = writer.commit()
+    assert result.written == 6 and result.received == 7
+    with SessionLocal() as other:
+        assert stored(other) == (6, 6)
+        assert other.get(models.Post, "p0").text == "edited"
+
+
+def test_a_group_writes_repeated_ids_in_order(db):
+    replaced = GroupWriter().predict([row(1), row(2, "first"), row(2, "second"), row(3)])
+    assert replaced == [False, False, True, False]
+    assert stored(db) == (3, 3)
+    assert db.get(models.Post, "p2").text == "second"
+
+
+def test_concurrent_single_posts_share_commits(db):
+    writer = get_post_writer()
+    batches = writer.stats()["batches"]
+    futures = [writer.submit(row(i)) for i in range(200)]
+    wait(futures)
+    assert not any(f.result() for f in futures)
+    assert stored(db) == (200, 200)
+    assert writer.stats()["batches"] - batches < 200
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from app.services.detection import COORD_WINDOW_SECONDS, _coordination
+from app.services.lsh import NEAR_DUP_THRESHOLD, SimHashIndex, hamming_radius, sign_valued
+
+
+def sign_vectors(rng, n: int, dim: int = 64, families: int = 20, flips: int = 6) -> np.ndarray:
+    """Sign-valued unit vectors in families of near-duplicates a few flipped bits apart."""
+    bases = rng.choice([-1.0, 1.0], size=(families, dim))
+    vecs = bases[rng.integers(families, size=n)]
+    for row in vecs:
+        row[rng.choice(dim, size=rng.integers(flips + 1), replace=False)] *= -1
+    return vecs / np.sqrt(dim)
+
+
+def all_pairs(vectors, times=None, window=None, threshold=NEAR_DUP_THRESHOLD) -> set[tuple[int, int]]:
+    sims = vectors @ vectors.T
+    pairs = set()
+    for i in range(len(vectors)):
+        for j in range(i + 1, len(vectors)):
+            if sims[i, j] > threshold and (times is None or abs(times[i] - times[j]) <= window):
+                pairs.add((i, j))
+    return pairs
+
+
+def index_pairs(index, times=None, window=None) -> set[tuple[int, int]]:
+    return {(min(a, b), max(a, b)) for i, j in index.similar_pairs(times, window) for a, b in zip(i.tolist(), j.tolist())}
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_index_finds_every_pair_of_sign_valued_vectors(seed):
+    rng = np.random.default_rng(seed)
+    vectors = sign_vectors(rng, 400)
+    times = np.sort(rng.uniform(0, 7200, size=400))
+    index = SimHashIndex(vectors, NEAR_DUP_THRESHOLD)
+    assert index_pairs(index) == all_pairs(vectors)
+    assert index_pairs(index, times, COORD_WINDOW_SECONDS) == all_pairs(vectors, times, COORD_WINDOW_SECONDS)
+    # no pair is emitted twice across bands
+    assert index.count_similar_pairs() == len(all_pairs(vectors))
+
+
+def test_hamming_radius_matches_the_cosine_threshold():
+    dim = 64
+    radius = hamming_radius(NEAR_DUP_THRESHOLD, dim)
+    assert 1 - 2 * radius / dim > NEAR_DUP_THRESHOLD
+    assert 1 - 2 * (radius + 1) / dim <= NEAR_DUP_THRESHOLD
+
+
+def coordination_reference(times, vectors) -> float:
+    n = len(vectors)
+    pairs = all_pairs(vectors, times, COORD_WINDOW_SECONDS)
+    return min(100.0, 100.0 * len(pairs) / max(1, n * (n - 1) // 2))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_coordination_is_exact_for_dense_embeddings(seed):
+    rng = np.random.default_rng(seed)
+    # dense unit vectors around a few centres: sign bits no longer bound the cosine
+    centres = rng.normal(size=(15, 64))
+    vectors = centres[rng.integers(15, size=600)] + rng.normal(scale=0.25, size=(600, 64))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    times = rng.uniform(0, 7200, size=600)
+    assert not sign_valued(vectors)
+    assert _coordination(times, vectors) == pytest.approx(coordination_reference(times, vectors))
+
+
+def test_coordination_uses_the_index_for_large_sign_valued_groups():
+    rng = np.random.default_rng(11)
+    vectors = sign_vectors(rng, 600)
+    times = rng.uniform(0, 7200, size=600)
+    assert sign_valued(vectors)
+    assert _coordination(times, vectors) == pytest.approx(coordination_reference(times, vectors))
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from app import models
+from app.services import matcher
+from app.services.matcher import STANCE_MARKERS, Automaton, KeywordMatcher, bump_keyword_version
+
+ALPHABET = "abn ि"
+
+
+def random_patterns(rng: random.Random, n: int) -> list[str]:
+    # a tiny alphabet makes prefixes, suffixes, infixes and repeats of one another common
+    return list(dict.fromkeys("".join(rng.choice(ALPHABET) for _ in range(rng.randrange(1, 6))) for _ in range(n)))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_automaton_finds_exactly_the_substring_matches(seed):
+    rng = random.Random(seed)
+    patterns = random_patterns(rng, 40)
+    automaton = Automaton(patterns)
+    for _ in range(50):
+        text = "".join(rng.choice(ALPHABET) for _ in range(rng.randrange(0, 40)))
+        assert automaton.search(text) == {i for i, p in enumerate(patterns) if p in text}
+
+
+def naive_match(text: str, keywords: list[str]) -> tuple[str, list[str]]:
+    """The substring loops the automaton replaced."""
+    lowered = text.lower()
+    counts = {stance: sum(1 for m in markers if m in lowered) for stance, markers in STANCE_MARKERS.items()}
+    if counts["anti"] > counts["pro"] and counts["anti"] > counts["neutral"]:
+        stance = "anti"
+    elif counts["pro"] > counts["anti"] and counts["pro"] > counts["neutral"]:
+        stance = "pro"
+    else:
+        stance = "neutral"
+    return stance, sorted(k for k in keywords if k and k.lower() in lowered)
+
+
+def test_matcher_agrees_with_naive_matching_on_overlapping_terms():
+    rng = random.Random(1)
+    keywords = ["India", "boycott", "boycott india", "dia", "india great", "Hind", "jai hind", "भारत", "भा"]
+    words = ["boycott", "india", "great", "jai", "hind", "break", "love", "भारत", "माता", "pro-india", "x"]
+    m = KeywordMatcher(keywords)
+    for _ in range(500):
+        text = " ".join(rng.choice(words) for _ in range(rng.randrange(0, 10)))
+        text = "".join(c.upper() if rng.random() < 0.2 else c for c in text)
+        assert m.match(text) == naive_match(text, keywords)
+
+
+def test_a_delete_and_add_still_changes_the_signature(db):
+    db.add(models.Keyword(term="first"))
+    bump_keyword_version(db)
+    db.commit()
+    before = matcher._keyword_signature(db)
+    db.delete(db.query(models.Keyword).filter_by(term="first").one())
+    db.add(models.Keyword(term="second"))
+    bump_keyword_version(db)
+    db.commit()
+    after = matcher._keyword_signature(db)
+    assert after[0] == before[0]
+    assert after[2] == before[2] + 1
@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+from app import models
+from app.services import nlp
+from app.services.matcher import invalidate_matcher
+
+
+WORDS = [
+    "boycott", "india", "boycott india", "jai hind", "love india", "break india", "india great",
+    "discuss india", "cricket", "भारत", "माता", "Boycott India", "hindi", "news", "  ",
+]
+# overlapping terms: one is a prefix, suffix or infix of another
+KEYWORDS = ["boycott", "boycott india", "india", "dia", "cott", "भारत"]
+
+
+def random_texts(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randrange(0, 12))) for _ in range(n)]
+
+
+@pytest.fixture
+def keywords(db):
+    db.add_all(models.Keyword(term=term) for term in KEYWORDS)
+    db.commit()
+    invalidate_matcher()
+
+
+def test_batch_analysis_matches_single_posts(keywords):
+    texts = random_texts(500)
+    assert nlp.analyze_posts(texts) == [nlp.analyze_post(text) for text in texts]
+
+
+def test_process_pool_matches_inline_analysis(keywords, monkeypatch):
+    texts = random_texts(700, seed=1)
+    expected = [nlp.analyze_post(text) for text in texts]
+    monkeypatch.setattr(nlp, "NLP_WORKERS", "2")
+    monkeypatch.setattr(nlp, "PARALLEL_MIN_TEXTS", 1)
+    try:
+        assert nlp.get_nlp_pool() is not None
+        assert nlp.analyze_posts(texts) == expected
+    finally:
+        nlp.shutdown_nlp_pool()
+
+
+def test_micro_batched_inference_matches_direct_calls(keywords, monkeypatch):
+    texts = random_texts(300, seed=2)
+    expected = [nlp.analyze_post(text) for text in texts]
+    direct = nlp.embed_texts(texts)
+    monkeypatch.setattr(nlp, "INFERENCE_BATCHING", True)
+    try:
+        assert nlp.analyze_posts(texts) == expected
+        assert (nlp.embed_texts(texts) == direct).all()
+    finally:
+        nlp.shutdown_batchers()
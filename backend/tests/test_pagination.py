@@ -0,0 +1,110 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.ingest import write_rows
+from app.services.pagination import decode_cursor, encode_cursor
+from app.services.posts import list_posts
+
+START = datetime(2024, 5, 1)
+
+
+def post_row(i: int, created_at: datetime, rng: random.Random) -> dict:
+    return {
+        "id": f"p{i:04d}" if i % 3 else f"q{i}",  # ids that do not sort like the numbers
+        "platform": rng.choice(["twitter", "reddit"]),
+        "author_id": f"a{i % 5}",
+        "author_handle": f"user{i % 5}",
+        "text": f"post {i}",
+        "language": rng.choice(["en", "hi"]),
+        "toxicity": round(rng.random(), 2),
+        "stance": rng.choice(["anti", "pro", "neutral"]),
+        "hashtags": rng.sample(["#Alpha", "#beta", "gamma"], k=rng.randrange(0, 3)),
+        "mentions": [],
+        "meta": {},
+        "created_at": created_at,
+        "keywords": [],
+    }
+
+
+@pytest.fixture
+def posts(db):
+    rng = random.Random(5)
+    # few distinct timestamps, so pages keep splitting runs of equal created_at
+    times = [START + timedelta(minutes=m) for m in range(12)]
+    rows = [post_row(i, rng.choice(times), rng) for i in range(400)]
+    write_rows(db, rows)
+    db.commit()
+    return db, rows
+
+
+def walk(db, limit: int, **filters) -> list[dict]:
+    out, cursor, pages = [], None, 0
+    while True:
+        page, cursor = list_posts(db, limit=limit, cursor=cursor, **filters)
+        assert len(page) <= limit
+        out += page
+        pages += 1
+        if cursor is None:
+            return out
+        assert len(page) == limit
+        assert pages < 1000
+
+
+def expected(rows, predicate=lambda r: True) -> list[str]:
+    ordered = sorted((r for r in rows if predicate(r)), key=lambda r: (r["created_at"], r["id"]), reverse=True)
+    return [r["id"] for r in ordered]
+
+
+@pytest.mark.parametrize("limit", [1, 7, 50, 399, 400, 401])
+def test_pages_cover_every_post_once_in_order(posts, limit):
+    db, rows = posts
+    assert [r["id"] for r in walk(db, limit)] == expected(rows)
+
+
+@pytest.mark.parametrize("filters, predicate", [
+    ({"stance": "anti"}, lambda r: r["stance"] == "anti"),
+    ({"platform": "reddit", "language": "hi"}, lambda r: r["platform"] == "reddit" and r["language"] == "hi"),
+    ({"author": "user3"}, lambda r: r["author_handle"] == "user3"),
+    ({"min_toxicity": 0.25, "max_toxicity": 0.5}, lambda r: 0.25 <= r["toxicity"] <= 0.5),
+    ({"since": START + timedelta(minutes=3), "until": START + timedelta(minutes=9)},
+     lambda r: START + timedelta(minutes=3) <= r["created_at"] < START + timedelta(minutes=9)),
+    ({"hashtag": "#ALPHA"}, lambda r: "#Alpha" in r["hashtags"]),
+    ({"hashtag": "gamma", "stance": "pro"}, lambda r: "gamma" in r["hashtags"] and r["stance"] == "pro"),
+])
+def test_filtered_pages_match_the_filtered_list(posts, filters, predicate):
+    db, rows = posts
+    assert [r["id"] for r in walk(db, 13, **filters)] == expected(rows, predicate)
+
+
+def test_a_page_ending_inside_a_run_of_equal_timestamps(posts):
+    db, rows = posts
+    newest = max(r["created_at"] for r in rows)
+    run = expected(rows, lambda r: r["created_at"] == newest)
+    assert len(run) > 3
+    first, cursor = list_posts(db, limit=2)
+    assert [r["id"] for r in first] == run[:2]
+    second, _ = list_posts(db, limit=len(run), cursor=cursor)
+    assert [r["id"] for r in second][:len(run) - 2] == run[2:]
+
+
+def test_cursor_round_trip():
+    ts = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(ts, "id/with+odd=chars")) == (ts, "id/with+odd=chars")
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "e30", encode_cursor(datetime(2024, 1, 1), "x")[:-3]])
+def test_a_bad_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor)
+    assert exc.value.status_code == 400
+
+
+def test_fields_keep_the_cursor_keys(posts):
+    db, rows = posts
+    page, cursor = list_posts(db, limit=5, fields=["id", "created_at", "stance"])
+    assert set(page[0]) == {"id", "created_at", "stance"}
+    rest = walk(db, 50)
+    assert [r["id"] for r in page] + [r["id"] for r in list_posts(db, limit=1000, cursor=cursor)[0]] == [r["id"] for r in rest]
@@ -0,0 +1,65 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services import detection
+from app.services.window_state import HashtagWindow, WindowPost
+
+
+def random_groups(seed: int) -> list[HashtagWindow]:
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    groups = []
+    for g in range(12):
+        group = HashtagWindow()
+        # one large group so it crosses COORD_BLOCK_ROWS, plus a long tail of small ones
+        for i in range(600 if g == 0 else rng.randrange(1, 80)):
+            group.add(WindowPost(
+                id=f"g{g}p{i}",
+                text=f"message {rng.randrange(10)} for #{g}",
+                author_id=f"a{rng.randrange(15)}",
+                toxicity=rng.random(),
+                stance=rng.choice(["anti", "pro", "neutral"]),
+                created_at=start + timedelta(seconds=rng.randrange(6 * 3600)),
+            ))
+        groups.append(group)
+    return groups
+
+
+@pytest.mark.parametrize("seed", range(2))
+def test_pool_scores_equal_serial_scores(seed, monkeypatch):
+    profiles = {f"a{i}": float(i * 6) for i in range(15)}
+    serial = random_groups(seed)
+    for group in serial:
+        detection.score_window(group, profiles)
+
+    monkeypatch.setattr(detection, "DETECT_WORKERS", "2")
+    monkeypatch.setattr(detection, "DETECT_PARALLEL_MIN_POSTS", 1)
+    monkeypatch.setattr(detection, "DETECT_TASK_MIN_POSTS", 100)
+    parallel = random_groups(seed)
+    try:
+        assert detection.get_detect_pool() is not None
+        detection.score_windows(parallel, profiles)
+    finally:
+        detection.shutdown_detect_pool()
+    assert [g.scores for g in parallel] == [g.scores for g in serial]
+    assert any(g.scores["coordination"] > 0 for g in serial)
+
+
+def test_a_broken_pool_falls_back_to_serial_scores(monkeypatch):
+    class BrokenPool:
+        def submit(self, *args, **kwargs):
+            raise detection.BrokenProcessPool("worker died")
+
+        def shutdown(self, *args, **kwargs):
+            pass
+
+    serial = random_groups(5)
+    for group in serial:
+        detection.score_window(group, {})
+    monkeypatch.setattr(detection, "DETECT_PARALLEL_MIN_POSTS", 1)
+    monkeypatch.setattr(detection, "get_detect_pool", lambda: BrokenPool())
+    parallel = random_groups(5)
+    detection.score_windows(parallel, {})
+    assert [g.scores for g in parallel] == [g.scores for g in serial]
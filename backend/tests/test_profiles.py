@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from sqlalchemy import inspect, text
+
+from app import models
+from app.db import SessionLocal, engine
+from app.services import profiles
+from app.services.ingest import after_commit, write_rows
+from app.services.profiles import (
+    PROFILE_COLUMNS, ProfileWriter, ensure_author_profiles, fold, new_profile, score_components,
+)
+
+T0 = datetime(2024, 1, 1)
+DIM = 64
+
+
+def vector(seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal(DIM)
+
+
+def post(i: int, ts: datetime, author: str = "a1", text: str | None = None) -> dict:
+    return {
+        "id": f"p{i}", "platform": "x", "author_id": author, "author_handle": author, "text": text or f"post {i}",
+        "language": "en", "toxicity": 0.1, "stance": "neutral", "hashtags": [], "mentions": [], "meta": {},
+        "created_at": ts, "keywords": [],
+    }
+
+
+def components(profile: dict) -> dict:
+    return score_components(SimpleNamespace(**profile))
+
+
+def test_without_decay_the_weights_are_plain_counts(monkeypatch):
+    monkeypatch.setattr(profiles, "HALF_LIFE_SECONDS", 0.0)
+    profile = new_profile("a1")
+    vectors = [vector(i % 4) for i in range(12)]
+    for i, vec in enumerate(vectors):
+        fold(profile, {"created_at": T0 + timedelta(minutes=10 * i)}, vec)
+    assert profile["post_weight"] == 12 and profile["compared_weight"] == 11
+    assert profile["gap_weight"] == profile["gap_count"] == 11
+    # repeats of the first four vectors are near-duplicates
+    assert profile["near_dup_weight"] == profile["near_dup_count"] == 8
+    assert np.allclose(profile["centroid"], np.mean(vectors, axis=0))
+    c = components(profile)
+    assert c["posts_per_hour"] == pytest.approx(12 / (110 / 60))
+    assert c["near_duplicate_ratio"] == pytest.approx(8 / 11)
+    assert c["regularity"] == pytest.approx(1.0)
+
+
+def test_old_behaviour_fades_after_a_few_half_lives(monkeypatch):
+    monkeypatch.setattr(profiles, "HALF_LIFE_SECONDS", 3600.0)
+    profile = new_profile("a1")
+    ts = T0
+    # a spammy morning: the same post every minute
+    for _ in range(30):
+        fold(profile, {"created_at": ts}, vector(0))
+        ts += timedelta(minutes=1)
+    spam = components(profile)
+    # then, from the evening on, one distinct post an hour
+    ts += timedelta(hours=8)
+    for i in range(12):
+        fold(profile, {"created_at": ts}, vector(100 + i))
+        ts += timedelta(hours=1)
+    later = components(profile)
+    assert spam["near_duplicate_ratio"] == pytest.approx(1.0)
+    assert later["near_duplicate_ratio"] < 0.01
+    assert later["posts_per_hour"] < 2 < spam["posts_per_hour"]
+    # the plain totals still cover everything
+    assert profile["post_count"] == 42 and profile["near_dup_count"] == 29
+
+
+def test_an_out_of_order_post_counts_at_its_age(monkeypatch):
+    monkeypatch.setattr(profiles, "HALF_LIFE_SECONDS", 3600.0)
+    profile = new_profile("a1")
+    fold(profile, {"created_at": T0 + timedelta(hours=2)}, vector(1))
+    fold(profile, {"created_at": T0}, vector(2))
+    assert profile["post_weight"] == pytest.approx(1.25)
+    assert profile["first_seen"] == T0 and profile["last_seen"] == T0 + timedelta(hours=2)
+    assert profile["gap_count"] == 0
+    assert profile["active_hours"][0] == pytest.approx(0.25) and profile["active_hours"][2] == 1.0
+
+
+def test_profiles_are_folded_after_commit_and_once_per_post(db):
+    rows = [post(i, T0 + timedelta(minutes=i)) for i in range(5)]
+    writer = profiles.get_profile_writer()
+    replaced = write_rows(db, rows)
+    db.commit()
+    # write_rows no longer touches profiles; after_commit queues them
+    assert db.get(models.AuthorProfile, "a1") is None
+    after_commit(rows, replaced)
+    writer.flush()
+    db.expire_all()
+    assert db.get(models.AuthorProfile, "a1").post_count == 5
+    # a retry of stored posts is not folded again
+    replaced = write_rows(db, rows[:2])
+    db.commit()
+    after_commit(rows[:2], replaced)
+    writer.flush()
+    db.expire_all()
+    assert db.get(models.AuthorProfile, "a1").post_count == 5
+
+
+def test_a_failed_fold_is_counted_as_dropped():
+    def broken_session():
+        session = SessionLocal()
+        session.execute = lambda *a, **kw: (_ for _ in ()).throw(RuntimeError("db down"))
+        return session
+
+    writer = ProfileWriter(session_factory=broken_session, flush_interval=0.05)
+    try:
+        writer.add([post(i, T0) for i in range(3)] + [{**post(9, T0), "author_id": ""}])
+        writer.flush()
+        assert writer.stats() == {"queued": 0, "written": 0, "dropped": 3, "batches": 0}
+    finally:
+        writer.close()
+
+
+def test_a_profiles_table_with_other_columns_is_rebuilt(db):
+    write_rows(db, [post(i, T0 + timedelta(minutes=i)) for i in range(4)])
+    db.commit()
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE author_profiles"))
+        conn.execute(text("CREATE TABLE author_profiles (author_id VARCHAR(128) PRIMARY KEY, post_count INTEGER)"))
+        conn.execute(text("INSERT INTO author_profiles VALUES ('a1', 99)"))
+    ensure_author_profiles(db)
+    assert {c["name"] for c in inspect(engine).get_columns("author_profiles")} == set(PROFILE_COLUMNS)
+    assert db.get(models.AuthorProfile, "a1").post_count == 4
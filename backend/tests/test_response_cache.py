@@ -0,0 +1,86 @@
+import time
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.response_cache import CachedResponse, ResponseCache, bump_data_version, get_response_cache
+
+
+@pytest.fixture
+def client(db):
+    from app.main import app
+    get_response_cache().clear()
+    with TestClient(app) as client:
+        yield client
+
+
+def ingest(client, post_id: str):
+    r = client.post("/api/posts/", json={
+        "id": post_id, "platform": "x", "author_id": "a", "author_handle": "a",
+        "text": f"text of {post_id}", "hashtags": ["#t"], "created_at": datetime.utcnow().isoformat(),
+    })
+    assert r.status_code == 200
+
+
+def test_repeat_reads_are_served_from_the_cache_with_one_etag(client):
+    ingest(client, "p1")
+    cache = get_response_cache()
+    first = client.get("/api/posts/", params={"limit": 5, "stance": "neutral"})
+    hits = cache.stats()["hits"]
+    # the same query in another parameter order is the same entry
+    second = client.get("/api/posts/", params={"stance": "neutral", "limit": 5})
+    assert first.status_code == second.status_code == 200
+    assert cache.stats()["hits"] == hits + 1
+    assert first.content == second.content
+    assert first.headers["etag"] == second.headers["etag"]
+    assert first.headers["cache-control"] == "no-cache"
+
+
+def test_a_matching_if_none_match_gets_a_304(client):
+    ingest(client, "p1")
+    etag = client.get("/api/alerts/").headers["etag"]
+    for header in (etag, f'"other", {etag}', "*"):
+        r = client.get("/api/alerts/", headers={"If-None-Match": header})
+        assert r.status_code == 304
+        assert r.content == b""
+        assert r.headers["etag"] == etag
+    assert client.get("/api/alerts/", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_ingest_invalidates_cached_responses(client):
+    ingest(client, "p1")
+    before = client.get("/api/posts/")
+    ingest(client, "p2")
+    after = client.get("/api/posts/", headers={"If-None-Match": before.headers["etag"]})
+    assert after.status_code == 200
+    assert after.headers["etag"] != before.headers["etag"]
+    assert [p["id"] for p in after.json()] == ["p2", "p1"]
+
+
+def test_unchanged_body_revalidates_after_a_version_bump(client):
+    etag = client.get("/api/alerts/").headers["etag"]
+    bump_data_version()
+    # recomputed, but the content hash is the same, so the client's copy is still good
+    assert client.get("/api/alerts/", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_errors_are_not_cached(client):
+    assert client.get("/api/posts/", params={"cursor": "bad!"}).status_code == 400
+    entries = get_response_cache().stats()["entries"]
+    assert client.get("/api/posts/", params={"cursor": "bad!"}).status_code == 400
+    assert get_response_cache().stats()["entries"] == entries
+
+
+def test_entries_expire_after_the_ttl():
+    cache = ResponseCache(ttl=0.05, max_entries=2)
+    entry = lambda: CachedResponse(get_response_cache().stats()["data_version"], time.monotonic(), 200, [], b"x", b'"x"')
+    cache.put(("a", ""), entry())
+    assert cache.get(("a", "")) is not None
+    time.sleep(0.06)
+    assert cache.get(("a", "")) is None
+    # and the LRU keeps at most max_entries
+    for key in ("b", "c", "d"):
+        cache.put((key, ""), entry())
+    assert cache.stats()["entries"] == 2
+    assert cache.get(("b", "")) is None
@@ -0,0 +1,57 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.window_state import HashtagWindow, WindowPost, top_hashtag
+
+
+def window_post(i: int, created_at: datetime) -> WindowPost:
+    return WindowPost(id=f"p{i}", text="", author_id=f"u{i % 7}", toxicity=(i % 10) / 10,
+                      stance="anti" if i % 3 == 0 else "neutral", created_at=created_at)
+
+
+def assert_matches_recompute(group: HashtagWindow, live: dict):
+    posts = sorted(live.values(), key=lambda p: (p.created_at, p.id))
+    assert [p.id for p in group.posts] == [p.id for p in posts]
+    assert group.keys == [(p.created_at, p.id) for p in posts]
+    gaps = [(b.created_at - a.created_at).total_seconds() for a, b in zip(posts, posts[1:])]
+    assert group.gap_sum == pytest.approx(sum(gaps))
+    assert group.gap_sq_sum == pytest.approx(sum(g * g for g in gaps))
+    assert group.toxicity_sum == pytest.approx(sum(p.toxicity for p in posts))
+    assert group.anti_count == sum(p.stance == "anti" for p in posts)
+    assert sum(group.authors.values()) == len(posts)
+
+
+def test_incremental_window_matches_a_recompute():
+    rng = random.Random(7)
+    start = datetime(2024, 1, 1)
+    group, live = HashtagWindow(), {}
+    for i in range(2000):
+        op = rng.random()
+        if op < 0.6 or not live:
+            # mostly in order, some late and some on the same second
+            offset = i * 10 - (rng.randrange(5000) if rng.random() < 0.2 else 0)
+            p = window_post(i, start + timedelta(seconds=max(0, offset)))
+            group.add(p)
+            live[p.id] = p
+        elif op < 0.85:
+            post_id = rng.choice(list(live))
+            assert group.remove(post_id)
+            del live[post_id]
+        else:
+            cutoff = start + timedelta(seconds=rng.randrange(max(1, i * 10)))
+            expired = set(group.expire(cutoff))
+            assert expired == {k for k, p in live.items() if p.created_at < cutoff}
+            for k in expired:
+                del live[k]
+        if i % 100 == 0:
+            assert_matches_recompute(group, live)
+    assert_matches_recompute(group, live)
+    assert not group.remove("missing")
+
+
+def test_top_hashtag_skips_tags_that_normalize_to_nothing():
+    assert top_hashtag(["#", " #Boycott "]) == "boycott"
+    assert top_hashtag(["#"]) == "uncategorized"
+    assert top_hashtag(None) == "uncategorized"
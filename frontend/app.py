@@ -4,9 +4,13 @@ import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
-import time
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 API_BASE = os.getenv("API_BASE_URL", "http://localhost:8000") + "/api"
+# seconds a fetched response is reused across reruns before the API is asked again
+CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "10"))
 
 st.set_page_config(
     page_title="🛡️ Cyber Threat Detection", 
@@ -64,6 +68,82 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def _etag_store():
+    # last ETag and body per request, shared across reruns
+    return {}
+
+
+def _get(store, path, params):
+    key = (path, params)
+    headers = {"If-None-Match": store[key][0]} if key in store else {}
+    r = requests.get(f"{API_BASE}{path}", params=dict(params), headers=headers, timeout=5)
+    if r.status_code == 304:
+        return store[key][1]
+    if not r.ok:
+        return None
+    body = r.json()
+    if "ETag" in r.headers:
+        store[key] = (r.headers["ETag"], body)
+    return body
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def fetch_all(calls):
+    """GET several (path, params) pairs concurrently; params is a tuple of (key, value) pairs."""
+    store = _etag_store()
+    with ThreadPoolExecutor(max_workers=len(calls)) as pool:
+        return list(pool.map(lambda call: _get(store, *call), calls))
+
+
+def fetch(path, **params):
+    return fetch_all(((path, tuple(sorted(params.items()))),))[0]
+
+
+def sse_events(url, params):
+    """Yield (event, data) pairs from a Server-Sent Events stream."""
+    with requests.get(url, params=params, stream=True, timeout=(5, 60)) as r:
+        event, data = "message", []
+        for line in r.iter_lines(decode_unicode=True):
+            if line == "":
+                if data:
+                    yield event, json.loads("\n".join(data))
+                event, data = "message", []
+            elif line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                data.append(line[5:].strip())
+
+
+def render_feed(placeholder, posts):
+    with placeholder.container():
+        if not posts:
+            st.info("📡 Waiting for detections...")
+            return
+        st.markdown("**Recent Detections:**")
+        for post in posts:
+            platform_emoji = {"twitter": "🐦", "reddit": "🤖", "youtube": "📺"}.get(post['platform'], "📱")
+            stance_emoji = {"anti": "🔴", "pro": "🟢", "neutral": "🟡"}.get(post['stance'], "⚪")
+            created = str(post.get('created_at', ''))[11:19]
+            text = post.get('text') or ''
+            st.markdown(f"""
+            **{created}** | {platform_emoji} **{post['platform'].title()}** | {stance_emoji} **{post['stance'].upper()}**
+            
+            📝 *{text[:150]}{'...' if len(text) > 150 else ''}*
+            
+            🧪 Toxicity: **{post.get('toxicity', 0):.2f}** | 👤 Author: **{post['author_handle']}**
+            """)
+            st.markdown("---")
+
+
+# One round-trip for everything the tabs share, plus the keyword list alongside it
+try:
+    snapshot, kws = fetch_all((("/dashboard/snapshot", ()), ("/keywords/", ())))
+except requests.RequestException:
+    snapshot, kws = None, None
+snapshot = snapshot or {}
+stats = snapshot.get("stats", {})
+
 # Header
 st.markdown('<div class="main-header">🛡️ Cyber Threat Detection: Anti-India Campaign Monitor</div>', unsafe_allow_html=True)
 
@@ -71,39 +151,23 @@ st.markdown('<div class="main-header">🛡️ Cyber Threat Detection: Anti-India
 with st.sidebar:
     st.markdown("### 📊 Real-Time Stats")
     
-    # Get live stats
-    try:
-        posts_r = requests.get(f"{API_BASE}/posts/", timeout=5)
-        alerts_r = requests.get(f"{API_BASE}/alerts/", timeout=5)
-        posts = posts_r.json() if posts_r.ok else []
-        alerts = alerts_r.json() if alerts_r.ok else []
-        
-        st.metric("🚨 Active Alerts", len(alerts))
-        st.metric("📝 Total Posts", len(posts))
+    # Live stats from the snapshot (last 24h)
+    if stats:
+        st.metric("🚨 Active Alerts", stats["active_alerts"])
+        st.metric("📝 Total Posts", stats["total_posts"])
         
-        if posts:
-            anti_posts = [p for p in posts if p.get('stance') == 'anti']
-            avg_toxicity = sum(p.get('toxicity', 0) for p in posts) / len(posts)
-            st.metric("⚠️ Anti-India Posts", len(anti_posts))
-            st.metric("🧪 Avg Toxicity", f"{avg_toxicity:.2f}")
+        if stats["total_posts"]:
+            st.metric("⚠️ Anti-India Posts", stats["anti_posts"])
+            st.metric("🧪 Avg Toxicity", f"{stats['avg_toxicity']:.2f}")
             
         # Threat Level Indicator
-        threat_level = "🟢 LOW"
-        if len(alerts) > 2:
-            threat_level = "🔴 HIGH"
-        elif len(alerts) > 0:
-            threat_level = "🟡 MEDIUM"
-            
+        threat_level = {"high": "🔴 HIGH", "medium": "🟡 MEDIUM"}.get(stats["threat_level"], "🟢 LOW")
         st.markdown(f"### 🎯 Threat Level\n**{threat_level}**")
-        
-    except Exception as e:
+    else:
         st.error("Unable to connect to backend")
     
-    # Auto-refresh toggle
-    auto_refresh = st.checkbox("🔄 Auto-refresh (30s)")
-    if auto_refresh:
-        time.sleep(30)
-        st.experimental_rerun()
+    # Push updates: new posts stream into the live feed, alert changes refresh the page
+    live_updates = st.checkbox("🔄 Live updates")
 
 tabs = st.tabs(["🚨 Alerts", "📝 Posts", "🔍 Keywords", "🌐 Network", "📈 Analytics", "👥 Influencers", "🤖 Live Monitor"])
 
@@ -112,21 +176,17 @@ with tabs[0]:
     
     col1, col2, col3 = st.columns(3)
     
-    r = requests.get(f"{API_BASE}/alerts/")
-    alerts = r.json() if r.ok else []
+    alert_summary = snapshot.get("alerts", {})
+    alerts = alert_summary.get("active", [])
     
     if alerts:
         # Alert summary metrics
-        high_risk = [a for a in alerts if a['risk_score'] > 80]
-        medium_risk = [a for a in alerts if 50 <= a['risk_score'] <= 80]
-        low_risk = [a for a in alerts if a['risk_score'] < 50]
-        
         with col1:
-            st.metric("🔴 High Risk", len(high_risk), delta=len(high_risk))
+            st.metric("🔴 High Risk", alert_summary["high"], delta=alert_summary["high"])
         with col2:
-            st.metric("🟡 Medium Risk", len(medium_risk), delta=len(medium_risk))
+            st.metric("🟡 Medium Risk", alert_summary["medium"], delta=alert_summary["medium"])
         with col3:
-            st.metric("🟢 Low Risk", len(low_risk), delta=len(low_risk))
+            st.metric("🟢 Low Risk", alert_summary["low"], delta=alert_summary["low"])
         
         st.markdown("---")
         
@@ -164,33 +224,31 @@ with tabs[0]:
 with tabs[1]:
     st.markdown("### 📝 Social Media Posts Analysis")
     
-    r = requests.get(f"{API_BASE}/posts/")
-    posts = r.json() if r.ok else []
-    
-    if posts:
-        # Filter options
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            platform_filter = st.selectbox("🔍 Platform", ["All"] + list(set(p['platform'] for p in posts)))
-        with col2:
-            stance_filter = st.selectbox("🎯 Stance", ["All", "anti", "pro", "neutral"])
-        with col3:
-            min_toxicity = st.slider("🧪 Min Toxicity", 0.0, 1.0, 0.0)
-        with col4:
-            show_count = st.selectbox("📊 Show", [10, 20, 50, 100])
-        
-        # Apply filters
-        filtered_posts = posts
-        if platform_filter != "All":
-            filtered_posts = [p for p in filtered_posts if p['platform'] == platform_filter]
-        if stance_filter != "All":
-            filtered_posts = [p for p in filtered_posts if p['stance'] == stance_filter]
-        filtered_posts = [p for p in filtered_posts if p.get('toxicity', 0) >= min_toxicity]
-        
-        st.markdown(f"**Showing {len(filtered_posts[:show_count])} of {len(filtered_posts)} posts**")
+    # Filter options (applied by the API)
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        platform_filter = st.selectbox("🔍 Platform", ["All", "twitter", "reddit", "youtube"])
+    with col2:
+        stance_filter = st.selectbox("🎯 Stance", ["All", "anti", "pro", "neutral"])
+    with col3:
+        min_toxicity = st.slider("🧪 Min Toxicity", 0.0, 1.0, 0.0)
+    with col4:
+        show_count = st.selectbox("📊 Show", [10, 20, 50, 100])
+
+    params = {"limit": show_count, "fields": "platform,author_handle,stance,text,toxicity,language,hashtags"}
+    if min_toxicity > 0:
+        params["min_toxicity"] = min_toxicity
+    if platform_filter != "All":
+        params["platform"] = platform_filter
+    if stance_filter != "All":
+        params["stance"] = stance_filter
+    filtered_posts = fetch("/posts/", **params) or []
+
+    if filtered_posts:
+        st.markdown(f"**Showing {len(filtered_posts)} newest matching posts**")
         
         # Display posts in cards
-        for i, post in enumerate(filtered_posts[:show_count]):
+        for i, post in enumerate(filtered_posts):
             stance_emoji = {"anti": "🔴", "pro": "🟢", "neutral": "🟡"}.get(post['stance'], "⚪")
             platform_emoji = {"twitter": "🐦", "reddit": "🤖", "youtube": "📺"}.get(post['platform'], "📱")
             
@@ -224,10 +282,10 @@ with tabs[2]:
             r = requests.post(f"{API_BASE}/keywords/", json={"term": term, "category": category, "description": description})
             if r.ok:
                 st.success("Added")
+                fetch_all.clear()
+                kws = fetch("/keywords/")
             else:
                 st.error(r.text)
-    r = requests.get(f"{API_BASE}/keywords/")
-    kws = r.json() if r.ok else []
     if kws:
         for kw in kws:
             st.write(f"**{kw['term']}** ({kw['category']}) - {kw['description']}")
@@ -236,42 +294,28 @@ with tabs[2]:
 
 with tabs[3]:
     st.subheader("Network Overview")
-    r = requests.get(f"{API_BASE}/posts/")
-    posts = r.json() if r.ok else []
-    
-    users = set()
-    hashtags = set()
-    for p in posts:
-        users.add(p.get("author_handle", "anon"))
-        hashtags.update(p.get("hashtags", []))
+    network = snapshot.get("network", {})
+    top_tags = network.get("top_hashtags", [])
     
-    st.write(f"**Users**: {len(users)}")
-    st.write(f"**Hashtags**: {len(hashtags)}")
-    st.write(f"**Posts**: {len(posts)}")
+    st.write(f"**Users**: {network.get('users', 0)}")
+    st.write(f"**Posts**: {stats.get('total_posts', 0)}")
     
-    if hashtags:
-        st.write("**Top Hashtags:**")
-        for tag in list(hashtags)[:10]:
-            st.write(f"- #{tag}")
+    if top_tags:
+        st.write("**Top Hashtags (24h):**")
+        for tag in top_tags:
+            st.write(f"- #{tag['tag']} ({tag['posts']} posts)")
 
 with tabs[4]:
     st.markdown("### 📈 Advanced Analytics Dashboard")
     
-    # Get data
-    trends_r = requests.get(f"{API_BASE}/analytics/trends")
-    posts_r = requests.get(f"{API_BASE}/posts/")
-    trends = trends_r.json() if trends_r.ok else []
-    posts = posts_r.json() if posts_r.ok else []
+    trends = snapshot.get("trends", [])
     
-    if posts:
+    if stats.get("total_posts"):
         col1, col2 = st.columns(2)
         
         # Stance distribution pie chart
         with col1:
-            stance_counts = {}
-            for post in posts:
-                stance = post.get('stance', 'unknown')
-                stance_counts[stance] = stance_counts.get(stance, 0) + 1
+            stance_counts = snapshot["stance"]
             
             fig_pie = px.pie(
                 values=list(stance_counts.values()),
@@ -283,10 +327,7 @@ with tabs[4]:
         
         # Platform distribution
         with col2:
-            platform_counts = {}
-            for post in posts:
-                platform = post.get('platform', 'unknown')
-                platform_counts[platform] = platform_counts.get(platform, 0) + 1
+            platform_counts = snapshot["platforms"]
             
             fig_bar = px.bar(
                 x=list(platform_counts.keys()),
@@ -299,23 +340,19 @@ with tabs[4]:
         
         # Toxicity heatmap
         st.markdown("#### 🧪 Toxicity Analysis")
+        import pandas as pd
         toxicity_data = []
-        for post in posts:
-            toxicity_data.append({
-                'Platform': post.get('platform', 'unknown'),
-                'Stance': post.get('stance', 'unknown'),
-                'Toxicity': post.get('toxicity', 0)
-            })
+        for stance, counts in snapshot.get("toxicity_histogram", {}).items():
+            for i, count in enumerate(counts):
+                toxicity_data.append({'Toxicity': (i + 0.5) / len(counts), 'Stance': stance, 'Posts': count})
         
         if toxicity_data:
-            import pandas as pd
             df = pd.DataFrame(toxicity_data)
             
-            # Toxicity distribution histogram
-            fig_hist = px.histogram(
-                df, x='Toxicity', color='Stance',
+            # Toxicity distribution histogram (pre-binned by the API)
+            fig_hist = px.bar(
+                df, x='Toxicity', y='Posts', color='Stance',
                 title="Distribution of Toxicity Scores",
-                nbins=20,
                 color_discrete_map={'anti': '#FF6B6B', 'pro': '#4ECDC4', 'neutral': '#FFE66D'}
             )
             st.plotly_chart(fig_hist, use_container_width=True)
@@ -353,8 +390,7 @@ with tabs[4]:
 with tabs[5]:
     st.markdown("### 👥 Influencer Analysis")
     
-    r = requests.get(f"{API_BASE}/analytics/influencers")
-    infl = r.json() if r.ok else []
+    infl = snapshot.get("influencers", [])
     
     if infl:
         # Top influencers metrics
@@ -421,24 +457,9 @@ with tabs[6]:
         st.rerun()
     
     # Show recent posts as live feed
-    posts_r = requests.get(f"{API_BASE}/posts/")
-    posts = posts_r.json() if posts_r.ok else []
-    
-    if posts:
-        st.markdown("**Recent Detections:**")
-        for post in sorted(posts, key=lambda x: x['created_at'], reverse=True)[:5]:
-            platform_emoji = {"twitter": "🐦", "reddit": "🤖", "youtube": "📺"}.get(post['platform'], "📱")
-            stance_emoji = {"anti": "🔴", "pro": "🟢", "neutral": "🟡"}.get(post['stance'], "⚪")
-            
-            with st.container():
-                st.markdown(f"""
-                **{datetime.now().strftime('%H:%M:%S')}** | {platform_emoji} **{post['platform'].title()}** | {stance_emoji} **{post['stance'].upper()}**
-                
-                📝 *{post['text'][:150]}{'...' if len(post['text']) > 150 else ''}*
-                
-                🧪 Toxicity: **{post.get('toxicity', 0):.2f}** | 👤 Author: **{post['author_handle']}**
-                """)
-                st.markdown("---")
+    live_posts = deque(snapshot.get("recent_posts", []), maxlen=5)
+    live_feed = st.empty()
+    render_feed(live_feed, live_posts)
     
     # Monitoring controls
     st.markdown("#### ⚙️ Monitoring Controls")
@@ -454,9 +475,21 @@ with tabs[6]:
         threshold = st.slider("🎯 Alert Threshold", 0.0, 1.0, 0.6)
         st.info(f"Current threshold: {threshold}")
         
-        auto_refresh_live = st.checkbox("🔄 Auto-refresh Live Feed")
-        if auto_refresh_live:
-            time.sleep(5)
-            st.rerun()
+        st.caption("Enable 🔄 Live updates in the sidebar to stream new detections as they arrive.")
+
+
+if live_updates:
+    # Runs until the next rerun: posts are rendered incrementally, alert changes refresh the whole page.
+    # On a `dropped` event this client fell behind, so refresh as well.
+    try:
+        for event, data in sse_events(f"{API_BASE}/stream/events", {"types": "post,alert"}):
+            if event == "post":
+                live_posts.appendleft(data)
+                render_feed(live_feed, live_posts)
+            elif event in ("alert", "dropped"):
+                fetch_all.clear()
+                st.rerun()
+    except requests.RequestException:
+        st.sidebar.warning("Live stream disconnected")
 
 